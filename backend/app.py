@@ -6,71 +6,155 @@ This program is a Flask API that connects to a MongoDB database and provides end
 and content search using RapidAPI. The API also implements JWT authentication for secure access to user data.
 """
 
-from flask import Flask, request, jsonify
+# Time every import from here on so slow cold starts are easy to diagnose
+try:
+    from backend.utils.startup import startup_report
+except ImportError:
+    from utils.startup import startup_report
+startup_report.track_imports()
+
+from flask import Flask, Blueprint, request, jsonify, g, current_app
 import http.client
-import json
 import os
 import ssl  # Import ssl module
 from flask_cors import CORS
 from bson.objectid import ObjectId
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from datetime import datetime
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
 import config  # Import config.py
-from pymongo import MongoClient, IndexModel
-from pymongo.server_api import ServerApi
-import bcrypt  # Add bcrypt for password hashing
-import certifi
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, wait
+import contextvars
 import random
+import time
+from urllib.parse import quote, urlparse
+
+# Import the request deadline helpers and the local search index
+try:
+    from backend.utils import deadline
+    from backend.utils.search_index import content_index
+    from backend.utils.search_cache import SearchResultCache
+    from backend.utils.user_cache import UserProfileCache
+    from backend.utils.interactions import InteractionStore
+    from backend.utils.password_hashing import PasswordHasher, PasswordHasherBusy
+    from backend.utils.trending import TrendingStore, merge_ranked_lists
+    from backend.utils.shelves import SHELVES, ShelfStore, paginate, resolve_shelf
+    from backend.utils.catalog import Catalog
+    from backend.utils.catalog_codec import CatalogCodec
+    from backend.utils import database
+    from backend.utils import metrics
+    from backend.utils import tracing
+    from backend.utils.json_provider import FastJSONProvider
+    from backend.utils import upstream
+    from backend.utils.response_cache import ResponseCache
+    from backend.utils.revalidation import DetailsRevalidator, EXPIRED, FRESH, STALE
+    from backend.utils.invalidation import InvalidationBus
+    from backend.utils.ratings import RatingStore
+    from backend.utils import diversity
+except ImportError:
+    from utils import deadline
+    from utils.search_index import content_index
+    from utils.search_cache import SearchResultCache
+    from utils.user_cache import UserProfileCache
+    from utils.interactions import InteractionStore
+    from utils.password_hashing import PasswordHasher, PasswordHasherBusy
+    from utils.trending import TrendingStore, merge_ranked_lists
+    from utils.shelves import SHELVES, ShelfStore, paginate, resolve_shelf
+    from utils.catalog import Catalog
+    from utils.catalog_codec import CatalogCodec
+    from utils import database
+    from utils import metrics
+    from utils import tracing
+    from utils.json_provider import FastJSONProvider
+    from utils import upstream
+    from utils.response_cache import ResponseCache
+    from utils.revalidation import DetailsRevalidator, EXPIRED, FRESH, STALE
+    from utils.invalidation import InvalidationBus
+    from utils.ratings import RatingStore
+    from utils import diversity
+
+startup_report.stop_tracking()
 
 # Create a custom SSL context that doesn't verify certificates
 ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
-# Disable SSL certificate verification for the entire application
-# This is not recommended for production, but can help in development
-import urllib3
-urllib3.disable_warnings()
-
-app = Flask(__name__)
-# Update CORS configuration to properly handle preflight requests
-CORS(app, resources={r"/*": {
-    "origins": ["http://localhost:3000"], 
-    "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    "allow_headers": ["Content-Type", "Authorization"]
-}}, supports_credentials=True)
-
-# Configuration
-app.config["MONGO_URI"] = config.MONGO_URI
-app.config["JWT_SECRET_KEY"] = config.JWT_SECRET_KEY
-app.config["JWT_ERROR_MESSAGE_KEY"] = "error"
-
-# Use pymongo directly
-client = MongoClient(
-    config.MONGO_URI,
-    server_api=ServerApi('1'),
-    tls=True,
-    tlsCAFile=certifi.where()
-)
+# All API routes live on this blueprint; create_app() registers it on the Flask app
+api = Blueprint("api", __name__)
 
-# Replace PyMongo initialization with the new client
-db = client.get_database()  # Ensure db is the correct database object
+# Use the process-wide MongoDB client shared with StreamingService; it is only created
+# when the database is first used, so importing the app doesn't wait on DNS and TLS
+mongo = database.connection
+db = database.db              # User data: primary reads, acknowledged writes
+cache_db = database.cache_db  # Cached upstream data: relaxed read preference and write concern
 
 # Send a ping to confirm a successful connection
 def ensure_mongo_connection():
     try:
-        client.admin.command('ping')
+        mongo.client.admin.command('ping')
         print("Pinged your deployment. You successfully connected to MongoDB!")
         return True
     except Exception as e:
-        app.logger.error(f"Failed to connect to MongoDB: {e}")
+        print(f"Failed to connect to MongoDB: {e}")
         return False
 
-# Initialize JWT after ensuring MongoDB connection
-jwt = JWTManager(app)
+# JWT is bound to the app in create_app()
+jwt = JWTManager()
+
+# Give every request an overall time budget shared by upstream and MongoDB calls
+deadline.MIN_ATTEMPT_SECONDS = config.UPSTREAM_MIN_ATTEMPT_SECONDS
+
+@api.before_app_request
+def start_request_deadline():
+    deadline.start(config.REQUEST_DEADLINE_SECONDS)
+
+@api.teardown_app_request
+def finish_request_deadline(error=None):
+    deadline.finish()
+
+# Record per-route latency; the route template keeps label cardinality bounded
+@api.before_app_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+
+@api.after_app_request
+def record_request_metrics(response):
+    started_at = g.get("request_started_at")
+    if started_at is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.http_request_duration.observe(
+            time.perf_counter() - started_at, route, request.method, str(response.status_code)
+        )
+    return response
+
+# Trace a sample of requests (admins can force a trace or a cProfile dump with headers)
+tracer = tracing.Tracer(
+    tracing.TraceWriter(config.TRACE_FILE, max_bytes=config.TRACE_MAX_BYTES, backup_count=config.TRACE_BACKUP_COUNT),
+    sample_rate=config.TRACE_SAMPLE_RATE,
+    debug_token=config.TRACE_DEBUG_TOKEN,
+    profile_dir=config.PROFILE_DIR
+)
+
+@api.before_app_request
+def start_request_trace():
+    route = request.url_rule.rule if request.url_rule else request.path
+    g.trace_state = tracer.start_request(f"{request.method} {route}", request.headers)
+
+@api.after_app_request
+def finish_request_trace(response):
+    state = g.pop("trace_state", None)
+    if state is not None:
+        response.headers.update(tracer.finish_request(
+            state, method=request.method, path=request.path, status=response.status_code
+        ))
+    return response
+
+@api.teardown_app_request
+def abandon_request_trace(error=None):
+    state = g.pop("trace_state", None)
+    if state is not None:
+        tracer.abandon(state)
 
 # Helper function to validate request data
 def validate_request_data(required_fields):
@@ -92,6 +176,7 @@ def validate_request_data(required_fields):
 # RapidAPI configuration
 RAPIDAPI_KEY = config.RAPIDAPI_KEY
 RAPIDAPI_HOST = config.RAPIDAPI_HOST
+RAPIDAPI_BASE_URL = urlparse(config.RAPIDAPI_BASE_URL)
 
 # Service ID mapping between our system and RapidAPI
 SERVICE_MAPPING = {
@@ -109,43 +194,222 @@ SERVICE_MAPPING = {
 
 REVERSE_SERVICE_MAPPING = {v: k for k, v in SERVICE_MAPPING.items()}
 
+# Canonical store for every title we know about (optionally in the compact encoding)
+catalog_codec = CatalogCodec(SERVICE_MAPPING, compact=config.CATALOG_COMPACT_STORAGE)
+catalog = Catalog(cache_db.catalog, cache_db.catalog_meta, catalog_codec)
+service_bits = catalog_codec.services
+
+# Dedicated bounded pool for bcrypt so login bursts don't starve other endpoints
+password_hasher = PasswordHasher(
+    rounds=config.BCRYPT_ROUNDS,
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    max_queue=config.PASSWORD_HASH_MAX_QUEUE,
+    retry_after=config.PASSWORD_HASH_RETRY_AFTER
+)
+
+# Short-lived cache of projected user profiles for authenticated routes
+user_cache = UserProfileCache(
+    db.users,
+    ttl=config.USER_CACHE_TTL,
+    max_entries=config.USER_CACHE_MAX_ENTRIES
+)
+
+# Likes and dislikes live in their own collection, with per-user seen filters kept in memory
+interaction_store = InteractionStore(db.interactions, seen_ttl=config.SEEN_FILTER_TTL)
+
+# Ratings, with per-title count/sum/sum of squares kept up to date on every rating write
+rating_store = RatingStore(
+    db.ratings,
+    db.rating_aggregates,
+    prior_weight=config.RATING_PRIOR_WEIGHT,
+    prior_mean=config.RATING_PRIOR_MEAN,
+    cache_ttl=config.RATING_CACHE_TTL
+)
+
+# Cache of upstream search results keyed on the normalized query
+search_cache = SearchResultCache(
+    cache_db.search_cache,
+    max_entries=config.SEARCH_CACHE_MAX_ENTRIES,
+    ttl=config.SEARCH_CACHE_TTL,
+    negative_ttl=config.SEARCH_CACHE_NEGATIVE_TTL
+)
+
 # Helper function to create an HTTP connection with SSL context
-def create_api_connection():
+# (plain HTTP is only used when RAPIDAPI_BASE_URL points at a local stand-in)
+def create_api_connection(timeout=8):
+    if RAPIDAPI_BASE_URL.scheme == "http":
+        return http.client.HTTPConnection(RAPIDAPI_BASE_URL.hostname, RAPIDAPI_BASE_URL.port, timeout=timeout)
     return http.client.HTTPSConnection(
-        RAPIDAPI_HOST,
-        context=ssl_context  # Use our custom SSL context
+        RAPIDAPI_BASE_URL.hostname,
+        RAPIDAPI_BASE_URL.port,
+        context=ssl_context,  # Use our custom SSL context
+        timeout=timeout
     )
 
 # Helper function for API requests with retry mechanism
-def make_api_request(path, max_retries=3):
+def make_api_request(path, max_retries=3, timeout=8):
     retries = 0
     while retries < max_retries:
+        # Never let a single attempt outlive the request deadline
+        attempt_timeout = deadline.attempt_timeout(timeout)
+        if attempt_timeout is None:
+            print(f"Request deadline exhausted, skipping upstream call: {path}")
+            break
+        
+        conn = None
+        attempt_started_at = time.perf_counter()
         try:
-            conn = create_api_connection()
+            conn = create_api_connection(timeout=attempt_timeout)
             headers = {
                 'x-rapidapi-key': RAPIDAPI_KEY,
                 'x-rapidapi-host': RAPIDAPI_HOST
             }
             conn.request("GET", path, headers=headers)
             response = conn.getresponse()
-            data = response.read().decode('utf-8')
-            return json.loads(data)
+            # Parsed straight from the bytes into compact records of the fields we use
+            data = response.read()
+            tracing.record_span("upstream", attempt_started_at, family=metrics.endpoint_family(path), status=response.status, bytes=len(data))
+            result = upstream.parse(data, path)
+            metrics.record_upstream(path, response.status, attempt_started_at)
+            return result
         except Exception as e:
+            metrics.record_upstream(path, "timeout" if isinstance(e, TimeoutError) else "error", attempt_started_at)
+            tracing.record_span("upstream", attempt_started_at, error=type(e).__name__, family=metrics.endpoint_family(path))
             print(f"API request failed (attempt {retries+1}/{max_retries}): {str(e)}")
             retries += 1
             if retries < max_retries:
                 # Exponential backoff: wait longer between each retry
-                import time
-                time.sleep(2 ** retries)
+                backoff = 2 ** retries
+                if not deadline.can_retry_after(backoff):
+                    print("Not enough request budget left to retry, falling back to cached data")
+                    break
+                time.sleep(backoff)
         finally:
-            try:
-                conn.close()
-            except:
-                pass
+            if conn:
+                try:
+                    conn.close()
+                except:
+                    pass
     return {}
 
+# Helper function to cache many titles with a single bulk write
+# (service is the RapidAPI service name the items were listed on, if known)
+def cache_content_items(items, service=None):
+    catalog.upsert_summaries(items, service_id=REVERSE_SERVICE_MAPPING.get(service))
+    content_index.add_many(items)
+
+# Helper function to keep only the sources available on the user's services
+# (pass user_mask when filtering many titles for the same user)
+def filter_sources_for_user(sources, user_services, user_mask=None):
+    if not user_services:
+        return sources
+    if user_mask is None:
+        user_mask = service_bits.mask(user_services)
+    return [source for source in sources if service_bits.bit(source.get("source_id", "")) & user_mask]
+
+# Helper function to serve cached content when upstream data is unavailable
+def get_cached_content_fallback(query=None, limit=20):
+    try:
+        return catalog.find(query, limit=limit)
+    except Exception as cache_error:
+        print(f"Error retrieving fallback content: {str(cache_error)}")
+        return []
+
+# Trending lists per service, refreshed in the background and served from memory
+trending_store = TrendingStore(
+    cache_db.trending,
+    fetch=make_api_request,
+    service_mapping=SERVICE_MAPPING,
+    items_per_list=config.TRENDING_ITEMS_PER_LIST,
+    refresh_interval=config.TRENDING_REFRESH_INTERVAL,
+    retry_interval=config.TRENDING_RETRY_INTERVAL,
+    on_refresh=cache_content_items
+)
+
+# Discover category shelves per service, refreshed a few at a time in the background
+shelf_store = ShelfStore(
+    cache_db.shelves,
+    fetch=make_api_request,
+    service_mapping=SERVICE_MAPPING,
+    items_per_shelf=config.SHELF_ITEMS_PER_SHELF,
+    refresh_interval=config.SHELF_REFRESH_INTERVAL,
+    refresh_tick=config.SHELF_REFRESH_TICK,
+    refresh_batch=config.SHELF_REFRESH_BATCH,
+    on_refresh=cache_content_items
+)
+
+# Serialized, pre-compressed bodies of responses many requests share, with ETags
+response_cache = ResponseCache(
+    max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+    min_compress_bytes=config.RESPONSE_CACHE_MIN_COMPRESS_BYTES,
+    gzip_level=config.RESPONSE_GZIP_LEVEL,
+    brotli_quality=config.RESPONSE_BROTLI_QUALITY
+)
+
+# Upstream fetches for batch detail requests share one small pool, so a large batch (or several
+# at once) can't flood RapidAPI
+content_fetch_pool = ThreadPoolExecutor(max_workers=config.CONTENT_BATCH_CONCURRENCY, thread_name_prefix="content-fetch")
+
+# Keeps streaming sources of stored details fresh: stale copies are served while a background
+# pass refetches the most requested and most watchlisted titles within an upstream call budget
+details_revalidator = DetailsRevalidator(
+    catalog,
+    fetch=lambda content_id, content_type: hydrate_content_details(content_id, content_type),
+    watchlist_collection=db.watchlist,
+    max_age=config.CONTENT_DETAILS_MAX_AGE,
+    max_stale=config.CONTENT_DETAILS_MAX_STALE,
+    budget_per_hour=config.REVALIDATION_BUDGET_PER_HOUR,
+    burst=config.REVALIDATION_BURST,
+    tick_interval=config.REVALIDATION_TICK
+)
+
+# Evicts cached users, seen filters and content responses in every worker when any worker
+# (or anything else) writes to the collections behind them
+invalidation_bus = InvalidationBus(
+    db,
+    outbox=db.cache_invalidations,
+    mode=config.INVALIDATION_MODE,
+    poll_interval=config.INVALIDATION_POLL_INTERVAL,
+    outbox_ttl=config.INVALIDATION_OUTBOX_TTL
+)
+invalidation_bus.subscribe("users", lambda user_id: user_cache.invalidate(user_id) if user_id else user_cache.clear())
+# Seen filters only record which titles a user has reacted to, so changing a signal can't stale them
+invalidation_bus.subscribe(
+    "interactions",
+    lambda user_id: interaction_store.invalidate(user_id) if user_id else interaction_store.clear(),
+    key_field="user_id",
+    operations=("insert", "replace", "delete")
+)
+
+def invalidate_content_responses(content_id):
+    # Titles stored before they were keyed on their content id have an ObjectId _id
+    if content_id is None or ObjectId.is_valid(content_id):
+        response_cache.invalidate_route("content")
+    else:
+        response_cache.invalidate_route("content", content_id)
+
+invalidation_bus.subscribe("catalog", invalidate_content_responses)
+# Content responses include the title's rating summary
+invalidation_bus.subscribe(
+    "rating_aggregates",
+    lambda content_id: (rating_store.invalidate(content_id), response_cache.invalidate_route("content", content_id))
+    if content_id else (rating_store.clear(), response_cache.invalidate_route("content"))
+)
+
+@api.before_app_request
+def start_invalidation_bus():
+    invalidation_bus.ensure_started()
+
+# Export cache hit ratios on /metrics (read from the caches' own counters at scrape time)
+metrics.registry.register_collector(metrics.cache_collector({
+    "search": search_cache,
+    "user_profile": user_cache,
+    "response": response_cache,
+    "ratings": rating_store
+}))
+
 # Get list of available streaming services
-@app.route("/api/streaming_services", methods=["GET"])
+@api.route("/api/streaming_services", methods=["GET"])
 def get_streaming_services():
     # Define the top 10 streaming services
     TOP_STREAMING_SERVICES = [
@@ -161,9 +425,21 @@ def get_streaming_services():
         {"source_id": 443, "name": "ESPN+", "type": "sub"}
     ]
     
-    return jsonify(TOP_STREAMING_SERVICES)
+    # Static list: encoded and compressed once, and clients may keep it for a day
+    entry = response_cache.get_or_put(
+        ("streaming_services",),
+        lambda: TOP_STREAMING_SERVICES,
+        cache_control=f"public, max-age={config.STREAMING_SERVICES_MAX_AGE}"
+    )
+    return response_cache.respond(entry)
+
+# Helper function for the response sent when the password hashing pool is saturated
+def password_hasher_busy_response(error):
+    response = jsonify({"error": "Server is busy, please try again shortly"})
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 503
 
-@app.route("/api/register", methods=["POST"])
+@api.route("/api/register", methods=["POST"])
 @validate_request_data(["email", "password"])
 def register():
     print("Register endpoint reached")
@@ -176,8 +452,8 @@ def register():
         if db.users.find_one({"email": email}):
             return jsonify({"error": "User already exists"}), 400
         
-        # Hash the password (store as a string)
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        # Hash the password on the hashing pool (store as a string)
+        hashed_password = password_hasher.hash(password)
         
         # Create user object
         user = {
@@ -185,7 +461,7 @@ def register():
             "password": hashed_password,
             "streaming_services": data.get("streaming_services", []),
             "preferences": data.get("preferences", {}),
-            "created_at": pd.Timestamp.now(),
+            "created_at": datetime.utcnow(),
         }
         
         # Insert user into the database
@@ -196,12 +472,14 @@ def register():
         access_token = create_access_token(identity=user_id)
         
         return jsonify({"message": "User registered successfully", "token": access_token}), 201
-        
+    
+    except PasswordHasherBusy as e:
+        return password_hasher_busy_response(e)
     except Exception as e:
         print(f"Registration error: {str(e)}")
         return jsonify({"error": "Registration failed", "details": str(e)}), 500
 
-@app.route("/api/login", methods=["POST"])
+@api.route("/api/login", methods=["POST"])
 @validate_request_data(["email", "password"])
 def login():
     data = request.get_json()
@@ -214,9 +492,20 @@ def login():
     if not user:
         return jsonify({"error": "User not found"}), 404
     
-    # Verify the password
-    if not bcrypt.checkpw(password.encode('utf-8'), user["password"].encode('utf-8')):
-        return jsonify({"error": "Invalid credentials"}), 401
+    # Verify the password on the hashing pool
+    try:
+        if not password_hasher.verify(password, user["password"]):
+            return jsonify({"error": "Invalid credentials"}), 401
+    except PasswordHasherBusy as e:
+        return password_hasher_busy_response(e)
+    
+    # Upgrade hashes created with an old cost factor without delaying the response
+    if password_hasher.needs_rehash(user["password"]):
+        user_object_id = user["_id"]
+        password_hasher.rehash_in_background(
+            password,
+            lambda new_hash: db.users.update_one({"_id": user_object_id}, {"$set": {"password": new_hash}})
+        )
     
     # Create JWT token
     access_token = create_access_token(identity=str(user["_id"]))
@@ -231,13 +520,13 @@ def login():
     }), 200
 
 # Get user's streaming services
-@app.route("/api/user/streaming_services", methods=["GET"])
+@api.route("/api/user/streaming_services", methods=["GET"])
 @jwt_required()
 def get_user_streaming_services():
     user_id = get_jwt_identity()
     
     try:
-        user = db.users.find_one({"_id": ObjectId(user_id)})
+        user = user_cache.get(user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
             
@@ -246,7 +535,7 @@ def get_user_streaming_services():
         return jsonify({"error": f"Failed to get user streaming services: {str(e)}"}), 500
 
 # Update user streaming services
-@app.route("/api/user/streaming_services", methods=["PUT"])
+@api.route("/api/user/streaming_services", methods=["PUT"])
 @jwt_required()
 @validate_request_data(["streaming_services"])
 def update_streaming_services():
@@ -262,6 +551,8 @@ def update_streaming_services():
         
         if result.matched_count == 0:
             return jsonify({"error": "User not found"}), 404
+        
+        invalidation_bus.publish("users", user_id)
             
         # Import StreamingService here to avoid cyclic imports
         try:
@@ -283,7 +574,7 @@ def update_streaming_services():
         return jsonify({"error": f"Failed to update streaming services: {str(e)}"}), 500
 
 # Update user preferences
-@app.route("/api/user/preferences", methods=["PUT"])
+@api.route("/api/user/preferences", methods=["PUT"])
 @jwt_required()
 def update_user_preferences():
     user_id = get_jwt_identity()
@@ -300,168 +591,220 @@ def update_user_preferences():
         
         if result.matched_count == 0:
             return jsonify({"error": "User not found"}), 404
+        
+        invalidation_bus.publish("users", user_id)
             
         return jsonify({"message": "Preferences updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": f"Failed to update preferences: {str(e)}"}), 500
 
 # Add a simple status endpoint to test connectivity
-@app.route("/api/status", methods=["GET"])
+@api.route("/api/status", methods=["GET"])
 def api_status():
     print("Status endpoint was called!")  # Add this debug line
     return jsonify({"status": "online", "message": "API is running correctly"})
 
+# Expose internal statistics used to tune caches and time budgets (admins only, like profiling)
+@api.route("/api/stats", methods=["GET"])
+def api_stats():
+    if not tracer.is_admin(request.headers):
+        return jsonify({"error": "Admin token required"}), 403
+    return jsonify({
+        "request_deadline": {
+            "budget_seconds": config.REQUEST_DEADLINE_SECONDS,
+            "remaining_budget": deadline.remaining_budget_histogram.snapshot()
+        },
+        "search_cache": search_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "password_hashing": password_hasher.stats(),
+        "trending": trending_store.stats(),
+        "shelves": shelf_store.stats(),
+        "startup": startup_report.as_dict(),
+        "database": database.stats(),
+        "tracing": tracer.stats(),
+        "json": current_app.json.stats(),
+        "upstream": upstream.parser.stats(),
+        "response_cache": response_cache.stats(),
+        "revalidation": details_revalidator.stats(),
+        "invalidation": invalidation_bus.stats(),
+        "ratings": rating_store.stats()
+    })
+
+# Prometheus scrape endpoint
+@api.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return metrics.registry.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
 # Add an OPTIONS route handler to handle preflight requests
-@app.route('/api/<path:path>', methods=['OPTIONS'])
+@api.route('/api/<path:path>', methods=['OPTIONS'])
 def handle_options(path):
     return '', 200
 
-# Search for content using RapidAPI
-@app.route("/api/search", methods=["GET"])
+# Search for content, answering from the local index and falling back to RapidAPI
+@api.route("/api/search", methods=["GET"])
 def search_content():
     query = request.args.get("query", "")
+    # Clients pass more=true to explicitly ask for upstream results
+    fetch_more = request.args.get("more", "").lower() in ("1", "true", "yes")
     
     if not query:
         return jsonify({"error": "Query parameter is required"}), 400
     
-    try:
-        conn = create_api_connection()  # Use helper function
+    # Try the local index first
+    content_index.ensure_built(catalog.search_documents)
+    local_results = content_index.search(query, limit=config.SEARCH_RESULT_LIMIT)
+    if not fetch_more and len(local_results) >= config.SEARCH_LOCAL_MIN_RESULTS:
+        return jsonify(local_results)
+    
+    # Fetch from RapidAPI; returns None when the upstream call failed so it isn't cached
+    def fetch_upstream():
+        # Make API request to search endpoint
+        req_path = f"/search/title?title={quote(query)}&country=us&show_type=all&output_language=en"
+        content_data = make_api_request(req_path)
         
-        headers = {
-            'x-rapidapi-key': RAPIDAPI_KEY,
-            'x-rapidapi-host': RAPIDAPI_HOST
-        }
+        if "result" not in content_data:
+            return None
         
-        # Make API request to search endpoint
-        req_path = f"/search/title?title={query}&country=us&show_type=all&output_language=en"
-        conn.request("GET", req_path, headers=headers)
+        # Transform to match expected format
+        transformed_results = []
+        for item in content_data["result"] or []:
+            if not item.get("imdbId"):
+                continue
+            transformed_results.append({
+                "id": item.get("imdbId"),
+                "title": item.get("title", ""),
+                "year": item.get("year", ""),
+                "poster_url": (item.get("posterURLs", {}).get("original") or 
+                              item.get("posterURLs", {}).get("500", "")),
+                "content_type": "movie" if item.get("type") == "movie" else "show"
+            })
         
-        res = conn.getresponse()
-        data = res.read().decode('utf-8')
+        # Cache results in database with a single bulk write
+        cache_content_items(transformed_results)
+        return transformed_results
+    
+    try:
+        # Identical (normalized) queries share one cache entry and one upstream call
+        results = search_cache.get_or_fetch(query, fetch_upstream)
         
-        try:
-            content_data = json.loads(data)
-            
-            if "result" in content_data:
-                results = content_data["result"]
-                
-                # Transform to match expected format
-                transformed_results = []
-                for item in results:
-                    transformed_item = {
-                        "id": item.get("imdbId"),
-                        "title": item.get("title", ""),
-                        "year": item.get("year", ""),
-                        "poster_url": (item.get("posterURLs", {}).get("original") or 
-                                      item.get("posterURLs", {}).get("500", "")),
-                        "content_type": "movie" if item.get("type") == "movie" else "show"
-                    }
-                    transformed_results.append(transformed_item)
-                    
-                    # Cache results in database
-                    db.content.update_one(
-                        {"id": transformed_item["id"]},
-                        {"$set": transformed_item},
-                        upsert=True
-                    )
-                
-                return jsonify(transformed_results)
-            else:
-                return jsonify([])
-                
-        except Exception as e:
-            print(f"Error parsing search results: {str(e)}")
-            return jsonify({"error": f"Failed to parse search results: {str(e)}"}), 500
+        if results is None:
+            return jsonify(local_results)
+        return jsonify(results)
     
     except Exception as e:
         print(f"Error searching content: {str(e)}")
         return jsonify({"error": f"Failed to search content: {str(e)}"}), 500
 
+# Suggest titles for a partially typed query from the local index
+@api.route("/api/search/autocomplete", methods=["GET"])
+def autocomplete_content():
+    query = request.args.get("query", "")
+    
+    if not query:
+        return jsonify([])
+    
+    content_index.ensure_built(catalog.search_documents)
+    return jsonify(content_index.autocomplete(query, limit=config.AUTOCOMPLETE_LIMIT))
+
+# Helper function to turn an upstream /get response into our content details format
+def transform_content_details(content_id, content_type, content_data):
+    transformed_details = {
+        "id": content_id,
+        "title": content_data.get("title", ""),
+        "year": content_data.get("year", ""),
+        "runtime_minutes": content_data.get("runtime", 0),
+        "us_rating": content_data.get("rating", "Not Rated"),
+        "poster_url": (content_data.get("posterURLs", {}).get("original") or 
+                      content_data.get("posterURLs", {}).get("500", "")),
+        "plot_overview": content_data.get("overview", ""),
+        "genre_names": [genre.get("name", "") for genre in content_data.get("genres", [])],
+        "cast": [cast.get("name", "") for cast in content_data.get("cast", [])],
+        "directors": [director.get("name", "") for director in content_data.get("directors", [])],
+        "sources": [],
+        "details_cached": True,
+        "details_refreshed_at": datetime.utcnow(),
+        "content_type": "movie" if content_type == "movie" else "show"
+    }
+    
+    # Process streaming info (the catalog keeps every source; callers filter per user)
+    streaming_info = content_data.get("streamingInfo", {}).get("us", {})
+    for provider, info in streaming_info.items():
+        source_id = REVERSE_SERVICE_MAPPING.get(provider, "")
+        if source_id:
+            for stream_option in info:
+                transformed_details["sources"].append({
+                    "source_id": source_id,
+                    "name": provider,
+                    "type": stream_option.get("type", ""),
+                    "web_url": stream_option.get("link", "")
+                })
+    return transformed_details
+
 # Get content details with streaming availability
-@app.route("/api/content/<content_id>", methods=["GET"])
+@api.route("/api/content/<content_id>", methods=["GET"])
 @jwt_required()
 def get_content_details(content_id):
     user_id = get_jwt_identity()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id)
     user_services = user.get("streaming_services", []) if user else []
+    details_revalidator.record_access(content_id)
+    
+    # Details filtered for the same set of services are served from the response cache
+    response_key = ("content", content_id, tuple(sorted(str(s) for s in user_services)))
+    entry = response_cache.get(response_key)
+    if entry is not None:
+        return response_cache.respond(entry)
+    content_cache_control = f"private, max-age={config.CONTENT_RESPONSE_MAX_AGE}"
     
-    # Check if we have this cached with recent sources data
-    cached_content = db.content_details.find_one({"id": content_id})
+    # One catalog lookup tells us both whether details are cached and the content type
+    cached_content = catalog.get_details(content_id)
     
-    # If cached, return cached data
-    if cached_content and cached_content.get("details_cached"):
+    # If cached, return cached data (stale copies are refreshed in the background, copies past
+    # the stale window are refetched first and only served if upstream has nothing)
+    freshness = details_revalidator.freshness(cached_content) if cached_content and cached_content.get("details_cached") else None
+    if freshness == EXPIRED:
+        details_revalidator.record_expired_refetch()
+        refreshed_content = hydrate_content_details(content_id, "movie" if cached_content.get("content_type") == "movie" else "series")
+        if refreshed_content:
+            cached_content = refreshed_content
+    elif freshness == STALE:
+        details_revalidator.serve_stale(content_id, cached_content.get("content_type"))
+    
+    if freshness is not None:
         # Ensure we only include sources available on user's services if they have any
-        if user_services and "sources" in cached_content:
-            filtered_sources = [
-                source for source in cached_content["sources"]
-                if str(source.get("source_id", "")) in user_services
-            ]
-            cached_content["sources"] = filtered_sources
+        if "sources" in cached_content:
+            cached_content["sources"] = filter_sources_for_user(cached_content["sources"], user_services)
+        cached_content["user_rating"] = rating_store.get(content_id)
         
-        return jsonify(cached_content)
+        entry = response_cache.put(response_key, cached_content, ttl=config.CONTENT_RESPONSE_TTL, cache_control=content_cache_control)
+        return response_cache.respond(entry)
     
     # Determine content type for API request
-    content_type_check = db.content.find_one({"id": content_id})
-    content_type = "movie" if content_type_check and content_type_check.get("content_type") == "movie" else "series"
+    content_type = "movie" if cached_content and cached_content.get("content_type") == "movie" else "series"
     
     try:
         # Fetch from RapidAPI
-        conn = create_api_connection()  # Use helper function
-        
-        headers = {
-            'x-rapidapi-key': RAPIDAPI_KEY,
-            'x-rapidapi-host': RAPIDAPI_HOST
-        }
-        
-        # Make API request
         req_path = f"/get/{content_type}/id/{content_id}?country=us"
-        conn.request("GET", req_path, headers=headers)
+        content_data = make_api_request(req_path)
         
-        res = conn.getresponse()
-        data = res.read().decode('utf-8')
+        # Fall through to whatever we have cached if upstream gave us nothing in time
+        if not content_data:
+            if cached_content:
+                cached_content["user_rating"] = rating_store.get(content_id)
+                return jsonify(cached_content)
+            return jsonify({"error": "Content details are temporarily unavailable"}), 504
         
         try:
-            content_data = json.loads(data)
+            # Transform to match expected format and cache in the catalog
+            transformed_details = transform_content_details(content_id, content_type, content_data)
+            catalog.upsert_details(transformed_details)
+            content_index.add(transformed_details)
+            invalidation_bus.publish("catalog", content_id)
             
-            # Transform to match expected format
-            transformed_details = {
-                "id": content_id,
-                "title": content_data.get("title", ""),
-                "year": content_data.get("year", ""),
-                "runtime_minutes": content_data.get("runtime", 0),
-                "us_rating": content_data.get("rating", "Not Rated"),
-                "poster_url": (content_data.get("posterURLs", {}).get("original") or 
-                              content_data.get("posterURLs", {}).get("500", "")),
-                "plot_overview": content_data.get("overview", ""),
-                "genre_names": [genre.get("name", "") for genre in content_data.get("genres", [])],
-                "cast": [cast.get("name", "") for cast in content_data.get("cast", [])],
-                "directors": [director.get("name", "") for director in content_data.get("directors", [])],
-                "sources": [],
-                "details_cached": True,
-                "content_type": content_type
-            }
-            
-            # Process streaming info
-            streaming_info = content_data.get("streamingInfo", {}).get("us", {})
-            for provider, info in streaming_info.items():
-                source_id = REVERSE_SERVICE_MAPPING.get(provider, "")
-                if source_id and (not user_services or source_id in user_services):
-                    for stream_option in info:
-                        transformed_details["sources"].append({
-                            "source_id": source_id,
-                            "name": provider,
-                            "type": stream_option.get("type", ""),
-                            "web_url": stream_option.get("link", "")
-                        })
-            
-            # Cache in database
-            db.content_details.update_one(
-                {"id": content_id},
-                {"$set": transformed_details},
-                upsert=True
-            )
-            
-            return jsonify(transformed_details)
+            transformed_details["sources"] = filter_sources_for_user(transformed_details["sources"], user_services)
+            transformed_details["user_rating"] = rating_store.get(content_id)
+            entry = response_cache.put(response_key, transformed_details, ttl=config.CONTENT_RESPONSE_TTL, cache_control=content_cache_control)
+            return response_cache.respond(entry)
             
         except Exception as e:
             print(f"Error parsing content details: {str(e)}")
@@ -471,26 +814,144 @@ def get_content_details(content_id):
         print(f"Error fetching content details: {str(e)}")
         return jsonify({"error": f"Failed to fetch content details: {str(e)}"}), 500
 
+# Helper function to fetch, transform and cache the details of one title (None if upstream had nothing)
+def hydrate_content_details(content_id, content_type):
+    content_data = make_api_request(f"/get/{content_type}/id/{content_id}?country=us")
+    if not content_data:
+        return None
+    transformed_details = transform_content_details(content_id, content_type, content_data)
+    catalog.upsert_details(transformed_details)
+    content_index.add(transformed_details)
+    invalidation_bus.publish("catalog", content_id)
+    return transformed_details
+
+# Helper function to run several upstream searches concurrently; returns each path's results
+# in request order ([] for searches that failed, didn't finish before the request deadline, or
+# came after the first max_searches paths, so list the most important paths first)
+def fetch_ranked_results(req_paths, max_searches=None):
+    if max_searches is None:
+        max_searches = config.MAX_SEARCH_FANOUT
+    futures = [content_fetch_pool.submit(contextvars.copy_context().run, make_api_request, req_path) for req_path in req_paths[:max_searches]]
+    wait(futures, timeout=deadline.remaining())
+    ranked_lists = []
+    for req_path, future in zip(req_paths, futures):
+        data = {}
+        if not future.done():
+            # Don't spend upstream quota on a search nobody is waiting for any more
+            future.cancel()
+            print(f"Search timed out: {req_path}")
+        else:
+            try:
+                data = future.result() or {}
+            except Exception as e:
+                print(f"Error searching {req_path}: {str(e)}")
+        ranked_lists.append([item for item in data.get("results", []) if item.get("imdbId")])
+    ranked_lists.extend([] for _ in req_paths[max_searches:])
+    return ranked_lists
+
+# Helper function to pick the best `limit` candidates of a merged list with a diversity rerank
+def rerank_candidates(candidates, limit, preferred_genres=(), rating_scores=None):
+    return diversity.rerank(
+        candidates,
+        limit,
+        preferred_genres=preferred_genres,
+        rating_scores=rating_scores,
+        diversity=config.RERANK_DIVERSITY,
+        genre_weight=config.RERANK_GENRE_WEIGHT,
+        rating_weight=config.RERANK_RATING_WEIGHT
+    )
+
+# Get content details for many titles in one request
+@api.route("/api/content/batch", methods=["POST"])
+@jwt_required()
+@validate_request_data(["ids"])
+def get_content_details_batch():
+    user_id = get_jwt_identity()
+    user = user_cache.get(user_id)
+    user_services = user.get("streaming_services", []) if user else []
+    
+    content_ids = request.get_json()["ids"]
+    if not isinstance(content_ids, list) or not all(isinstance(content_id, str) and content_id for content_id in content_ids):
+        return jsonify({"error": "ids must be a list of content ids"}), 400
+    if len(content_ids) > config.CONTENT_BATCH_MAX_IDS:
+        return jsonify({"error": f"At most {config.CONTENT_BATCH_MAX_IDS} ids per request"}), 400
+    unique_ids = list(dict.fromkeys(content_ids))
+    for content_id in unique_ids:
+        details_revalidator.record_access(content_id)
+    
+    # One $in query for every title we already know
+    try:
+        stored = catalog.get_many(unique_ids, detail=True)
+    except Exception as e:
+        print(f"Error reading batch from catalog: {str(e)}")
+        stored = {}
+    # Fresh and stale details are served; expired ones are refetched below like misses
+    details = {}
+    for content_id, doc in stored.items():
+        freshness = details_revalidator.freshness(doc) if doc.get("details_cached") else None
+        if freshness == STALE:
+            details_revalidator.serve_stale(content_id, doc.get("content_type"))
+        elif freshness == EXPIRED:
+            details_revalidator.record_expired_refetch()
+        if freshness in (FRESH, STALE):
+            details[content_id] = doc
+    
+    # Fetch the rest from upstream concurrently; each task runs in a copy of this request's
+    # context so it keeps the request deadline and trace
+    misses = [content_id for content_id in unique_ids if content_id not in details]
+    fetched = 0
+    if misses:
+        futures = {}
+        for content_id in misses:
+            summary = stored.get(content_id)
+            content_type = "movie" if summary and summary.get("content_type") == "movie" else "series"
+            future = content_fetch_pool.submit(contextvars.copy_context().run, hydrate_content_details, content_id, content_type)
+            futures[future] = content_id
+        done, _ = wait(futures, timeout=deadline.remaining())
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error fetching details for {futures[future]}: {str(e)}")
+                continue
+            if result:
+                details[futures[future]] = result
+                fetched += 1
+        # Titles still missing fall back to whatever we have stored (expired details or a summary)
+        for content_id in misses:
+            if content_id not in details and content_id in stored:
+                details[content_id] = stored[content_id]
+    
+    # Filter sources with one service mask for the whole batch, and attach rating summaries
+    # read with one query for the titles not cached in memory
+    user_mask = service_bits.mask(user_services) if user_services else None
+    user_ratings = rating_store.get_many(list(details))
+    for content_id, item in details.items():
+        if "sources" in item:
+            item["sources"] = filter_sources_for_user(item["sources"], user_services, user_mask)
+        item["user_rating"] = user_ratings[content_id]
+    
+    print(f"Content batch of {len(unique_ids)}: {len(unique_ids) - len(misses)} cached, {fetched} fetched, {len(unique_ids) - len(details)} unavailable")
+    return jsonify([
+        details.get(content_id) or {"id": content_id, "error": "Content details are temporarily unavailable"}
+        for content_id in content_ids
+    ])
+
 # Helper function to check if content is available on user's streaming services
 def is_available_on_user_services(sources, user_services):
     if not sources or not user_services:
         return False
     
-    # Convert both to strings for comparison
-    user_services = [str(service_id) for service_id in user_services]
-    
-    for source in sources:
-        source_id = str(source.get("source_id", ""))
-        if source_id in user_services:
-            return True
-    return False
+    # Compare service bitmasks instead of lists of id strings
+    source_mask = service_bits.mask(source.get("source_id", "") for source in sources)
+    return bool(source_mask & service_bits.mask(user_services))
 
 # Get personalized recommendations
-@app.route("/api/recommendations", methods=["GET"])
+@api.route("/api/recommendations", methods=["GET"])
 @jwt_required()
 def get_recommendations():
     user_id = get_jwt_identity()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id)
     
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -512,11 +973,19 @@ def get_recommendations():
             except ImportError:
                 from streaming_services import StreamingService
         
-        # Try to get content from cache first
-        cached_content = StreamingService.get_content_for_services(user_services, limit=20)
+        # Get user genre preferences if available
+        genres = []
+        if user.get("preferences") and user["preferences"].get("genres"):
+            genres = user["preferences"]["genres"]
+        
+        # Try to get content from cache first, picking the best 20 of a larger pool
+        cached_content = StreamingService.get_content_for_services(user_services, limit=config.RECOMMENDATION_CANDIDATES)
         
         if cached_content and len(cached_content) >= 10:
             print(f"Using {len(cached_content)} cached items for recommendations")
+            with tracing.span("rerank.recommendations", items=len(cached_content)):
+                rating_scores = rating_store.scores([item["id"] for item in cached_content if item.get("id")])
+                cached_content = rerank_candidates(cached_content, 20, preferred_genres=genres, rating_scores=rating_scores)
             return jsonify(cached_content)
         
         # If not enough cached content, make API requests
@@ -530,57 +999,49 @@ def get_recommendations():
         if not rapidapi_services:
             return jsonify([]), 200
         
-        # Choose a random service
-        selected_service = random.choice(rapidapi_services)
-        
-        # Get user genre preferences if available
-        genres = []
-        if user.get("preferences") and user["preferences"].get("genres"):
-            genres = user["preferences"]["genres"]
-        
-        # If we have genre preferences, use them
-        genre_query = ""
-        if genres:
-            # Randomly select one genre from user preferences
-            selected_genre = random.choice(genres).lower().replace(" ", "-")
-            genre_query = f"&genre={selected_genre}"
-        
-        # Make API request for movies
-        req_path = f"/search/basic?country=us&service={selected_service}&type=movie{genre_query}&page=1&language=en&sort_by=popularity"
-        movie_data = make_api_request(req_path)
-        recommended_movies = movie_data.get("results", [])
-        
-        # Make API request for TV shows
-        req_path = f"/search/basic?country=us&service={selected_service}&type=series{genre_query}&page=1&language=en&sort_by=popularity"
-        show_data = make_api_request(req_path)
-        recommended_shows = show_data.get("results", [])
-        
-        # Combine and shuffle recommendations
-        recommended_content = recommended_movies + recommended_shows
-        random.shuffle(recommended_content)
+        # Popular movies and shows on the user's services (the first MAX_SEARCH_FANOUT searches),
+        # fetched concurrently
+        req_paths = [
+            f"/search/basic?country=us&service={service}&type={content_type}&page=1&language=en&sort_by=popularity"
+            for service in rapidapi_services
+            for content_type in ("movie", "series")
+        ]
+        ranked_lists = fetch_ranked_results(req_paths)
+        
+        # Interleave by rank without duplicates, then rerank for preferred genres, users' rating
+        # scores and variety
+        with tracing.span("rerank.recommendations", lists=len(ranked_lists)):
+            candidates = merge_ranked_lists(ranked_lists, key="imdbId")
+            rating_scores = rating_store.scores([item["imdbId"] for item in candidates])
+            recommended_content = rerank_candidates(candidates, 20, preferred_genres=genres, rating_scores=rating_scores)
         
         # Transform to match expected format
         transformed_recommendations = []
-        for item in recommended_content[:20]:
-            transformed_item = {
-                "id": item.get("imdbId"),
-                "title": item.get("title", ""),
-                "year": item.get("year", ""),
-                "runtime_minutes": item.get("runtime", 0),
-                "us_rating": item.get("rating", "Not Rated"),
-                "poster_url": (item.get("posterURLs", {}).get("original") or 
-                              item.get("posterURLs", {}).get("500", "")),
-                "plot_overview": item.get("overview", ""),
-                "content_type": "movie" if item.get("type") == "movie" else "show"
-            }
-            transformed_recommendations.append(transformed_item)
-            
-            # Cache in database for future use
-            db.content.update_one(
-                {"id": transformed_item["id"]},
-                {"$set": transformed_item},
-                upsert=True
-            )
+        with tracing.span("transform.recommendations", items=len(recommended_content)):
+            for item in recommended_content:
+                transformed_item = {
+                    "id": item.get("imdbId"),
+                    "title": item.get("title", ""),
+                    "year": item.get("year", ""),
+                    "runtime_minutes": item.get("runtime", 0),
+                    "us_rating": item.get("rating", "Not Rated"),
+                    "poster_url": (item.get("posterURLs", {}).get("original") or 
+                                  item.get("posterURLs", {}).get("500", "")),
+                    "plot_overview": item.get("overview", ""),
+                    "content_type": "movie" if item.get("type") == "movie" else "show",
+                    "genre_names": [genre.get("name", "") for genre in item.get("genres") or []]
+                }
+                transformed_recommendations.append(transformed_item)
+        
+        # Cache in database for future use
+        cache_content_items(transformed_recommendations)
+        
+        # Upstream gave us nothing in time, fall through to cached data
+        if not transformed_recommendations:
+            fallback_content = get_cached_content_fallback(limit=20)
+            if fallback_content:
+                print(f"Returning {len(fallback_content)} fallback items from cache")
+                return jsonify(fallback_content)
         
         return jsonify(transformed_recommendations)
         
@@ -588,26 +1049,19 @@ def get_recommendations():
         print(f"Error getting recommendations: {str(e)}")
         
         # Try to get content from cache as fallback
-        try:
-            fallback_content = list(db.content.find(
-                {},  # No filter, get any content
-                {"_id": 0}
-            ).limit(20))
-            
-            if fallback_content:
-                print(f"Returning {len(fallback_content)} fallback items from cache")
-                return jsonify(fallback_content)
-        except Exception as cache_error:
-            print(f"Error retrieving fallback content: {str(cache_error)}")
+        fallback_content = get_cached_content_fallback(limit=20)
+        if fallback_content:
+            print(f"Returning {len(fallback_content)} fallback items from cache")
+            return jsonify(fallback_content)
             
         return jsonify({"error": f"Failed to get recommendations: {str(e)}"}), 500
 
 # Get trending content available on user's services
-@app.route("/api/trending", methods=["GET"])
+@api.route("/api/trending", methods=["GET"])
 @jwt_required()
 def get_trending():
     user_id = get_jwt_identity()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id)
     
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -628,75 +1082,52 @@ def get_trending():
     if not rapidapi_services:
         return jsonify([]), 200
     
-    # Choose a random service to get trending content from
-    selected_service = random.choice(rapidapi_services)
-    
     try:
-        # Use our helper function for API requests
-        req_path = f"/search/basic?country=us&service={selected_service}&type=movie&page=1&language=en&sort_by=popularity"
-        movie_data = make_api_request(req_path)
-        trending_movies = movie_data.get("results", [])
+        # Serve the pre-warmed snapshot for the user's services; no upstream calls here
+        trending_store.ensure_started()
         
-        req_path = f"/search/basic?country=us&service={selected_service}&type=series&page=1&language=en&sort_by=popularity"
-        show_data = make_api_request(req_path)
-        trending_shows = show_data.get("results", [])
+        # The merged list only changes when a snapshot is refreshed, which bumps the store version
+        response_key = ("trending", tuple(sorted(str(s) for s in user_services)), trending_store.version)
+        entry = response_cache.get(response_key)
+        if entry is not None:
+            return response_cache.respond(entry)
         
-        # Combine and shuffle trending content
-        trending_content = trending_movies + trending_shows
-        random.shuffle(trending_content)
+        transformed_trending = trending_store.get_trending(user_services, limit=config.TRENDING_LIMIT)
         
-        # Transform to match expected format
-        transformed_trending = []
-        for item in trending_content[:10]:
-            transformed_item = {
-                "id": item.get("imdbId"),
-                "title": item.get("title", ""),
-                "year": item.get("year", ""),
-                "runtime_minutes": item.get("runtime", 0),
-                "us_rating": item.get("rating", "Not Rated"),
-                "poster_url": (item.get("posterURLs", {}).get("original") or 
-                              item.get("posterURLs", {}).get("500", "")),
-                "plot_overview": item.get("overview", ""),
-                "content_type": "movie" if item.get("type") == "movie" else "show"
-            }
-            transformed_trending.append(transformed_item)
-            
-            # Cache in database for future use
-            db.content.update_one(
-                {"id": transformed_item["id"]},
-                {"$set": transformed_item},
-                upsert=True
-            )
+        # Snapshot not warmed up yet, fall through to cached data
+        if not transformed_trending:
+            cached_content = get_cached_content_fallback({"content_type": {"$in": ["movie", "show"]}}, limit=10)
+            if cached_content:
+                print(f"Returning {len(cached_content)} cached items as fallback")
+                return jsonify(cached_content)
         
         # Log response for debugging
         print(f"Returning {len(transformed_trending)} trending items")
         
-        return jsonify(transformed_trending)
+        if not transformed_trending:
+            return jsonify(transformed_trending)
+        entry = response_cache.put(
+            response_key, transformed_trending, cache_control=f"private, max-age={config.TRENDING_RESPONSE_MAX_AGE}"
+        )
+        return response_cache.respond(entry)
         
     except Exception as e:
         print(f"Error getting trending content: {str(e)}")
         
         # If we get an error, try to pull from cache as a fallback
-        try:
-            cached_content = list(db.content.find(
-                {"content_type": {"$in": ["movie", "show"]}},
-                {"_id": 0}
-            ).limit(10))
-            
-            if cached_content:
-                print(f"Returning {len(cached_content)} cached items as fallback")
-                return jsonify(cached_content)
-        except Exception as cache_error:
-            print(f"Error retrieving cached content: {str(cache_error)}")
+        cached_content = get_cached_content_fallback({"content_type": {"$in": ["movie", "show"]}}, limit=10)
+        if cached_content:
+            print(f"Returning {len(cached_content)} cached items as fallback")
+            return jsonify(cached_content)
         
         return jsonify({"error": f"Failed to get trending content: {str(e)}"}), 500
 
 # API endpoints for the discover page
-@app.route("/api/discover/categories", methods=["GET"])
+@api.route("/api/discover/categories", methods=["GET"])
 @jwt_required()
 def get_discover_categories():
     user_id = get_jwt_identity()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id)
     
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -713,9 +1144,6 @@ def get_discover_categories():
     if not rapidapi_services:
         return jsonify({}), 200  # Return empty object if no valid services
     
-    # Choose a random service from the user's services
-    selected_service = random.choice(rapidapi_services)
-    
     # Prepare content categories
     categories = {
         "Movies": [],
@@ -726,58 +1154,39 @@ def get_discover_categories():
         "Family": []
     }
     
+    # Use the precomputed shelves when every category is warm for the user's services
+    shelf_store.ensure_started()
+    for category in categories:
+        categories[category] = shelf_store.get_shelf(
+            user["streaming_services"], resolve_shelf(category), limit=10
+        )
+    if all(categories.values()):
+        return jsonify(categories)
+    
+    # Fetch the categories that aren't warm yet from all of the user's services at once
+    cold_categories = [category for category, items in categories.items() if not items]
+    
     try:
-        conn = create_api_connection()  # Use helper function
-        
-        headers = {
-            'x-rapidapi-key': RAPIDAPI_KEY,
-            'x-rapidapi-host': RAPIDAPI_HOST
-        }
-        
-        # Get movies for the selected service
-        req_path = f"/search/basic?country=us&service={selected_service}&type=movie&page=1&language=en&sort_by=popularity"
-        conn.request("GET", req_path, headers=headers)
-        res = conn.getresponse()
-        data = res.read().decode('utf-8')
-        content_data = json.loads(data)
-        categories["Movies"] = transform_content_items(content_data.get("results", [])[:10])
-        
-        # Get TV shows for the selected service
-        req_path = f"/search/basic?country=us&service={selected_service}&type=series&page=1&language=en&sort_by=popularity"
-        conn.request("GET", req_path, headers=headers)
-        res = conn.getresponse()
-        data = res.read().decode('utf-8')
-        content_data = json.loads(data)
-        categories["TV Shows"] = transform_content_items(content_data.get("results", [])[:10])
-        
-        # Get content for specific genres
-        genre_mappings = {
-            "Action & Adventure": "action",
-            "Comedy": "comedy",
-            "Drama": "drama",
-            "Family": "family"
-        }
-        
-        for category, genre in genre_mappings.items():
-            # Get movies in this genre
-            req_path = f"/search/basic?country=us&service={selected_service}&type=movie&page=1&language=en&genre={genre}&sort_by=popularity"
-            conn.request("GET", req_path, headers=headers)
-            res = conn.getresponse()
-            data = res.read().decode('utf-8')
-            content_data = json.loads(data)
-            movies = content_data.get("results", [])[:5]
-            
-            # Get shows in this genre
-            req_path = f"/search/basic?country=us&service={selected_service}&type=series&page=1&language=en&genre={genre}&sort_by=popularity"
-            conn.request("GET", req_path, headers=headers)
-            res = conn.getresponse()
-            data = res.read().decode('utf-8')
-            content_data = json.loads(data)
-            shows = content_data.get("results", [])[:5]
-            
-            # Combine movies and shows for this genre
-            combined = movies + shows
-            categories[category] = transform_content_items(combined)
+        # Service by service, so the first MAX_SEARCH_FANOUT searches cover every category
+        req_paths = []
+        path_categories = []
+        for service in rapidapi_services:
+            for category in cold_categories:
+                content_types, genre = SHELVES[resolve_shelf(category)]
+                genre_query = f"&genre={genre}" if genre else ""
+                for content_type in content_types:
+                    req_paths.append(f"/search/basic?country=us&service={service}&type={content_type}&page=1&language=en{genre_query}&sort_by=popularity")
+                    path_categories.append(category)
+        ranked_lists = fetch_ranked_results(req_paths)
+        
+        # Merge each category across services and content types, then rerank it for variety
+        with tracing.span("rerank.categories", categories=len(cold_categories)):
+            for category in cold_categories:
+                candidates = merge_ranked_lists(
+                    [results for results_category, results in zip(path_categories, ranked_lists) if results_category == category],
+                    key="imdbId"
+                )
+                categories[category] = transform_content_items(rerank_candidates(candidates, 10))
         
         return jsonify(categories)
         
@@ -798,24 +1207,21 @@ def transform_content_items(items):
             "poster_url": (item.get("posterURLs", {}).get("original") or 
                           item.get("posterURLs", {}).get("500", "")),
             "plot_overview": item.get("overview", ""),
-            "content_type": "movie" if item.get("type") == "movie" else "show"
+            "content_type": "movie" if item.get("type") == "movie" else "show",
+            "genre_names": [genre.get("name", "") for genre in item.get("genres") or []]
         }
         transformed_items.append(transformed_item)
-        
-        # Cache in database for future use
-        db.content.update_one(
-            {"id": transformed_item["id"]},
-            {"$set": transformed_item},
-            upsert=True
-        )
+    
+    # Cache in database for future use
+    cache_content_items(transformed_items)
     
     return transformed_items
 
-@app.route("/api/discover/category/<category_name>", methods=["GET"])
+@api.route("/api/discover/category/<category_name>", methods=["GET"])
 @jwt_required()
 def get_category_content(category_name):
     user_id = get_jwt_identity()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id)
     
     if not user or not user.get("streaming_services"):
         return jsonify({"error": "User streaming services not set"}), 400
@@ -829,89 +1235,62 @@ def get_category_content(category_name):
     if not rapidapi_services:
         return jsonify({"error": "No valid streaming services configured"}), 400
     
-    # Choose a random service from the user's services
-    selected_service = random.choice(rapidapi_services)
+    shelf = resolve_shelf(category_name)
+    if not shelf:
+        return jsonify({"error": f"Unknown category: {category_name}"}), 400
     
+    # Serve the precomputed shelf merged across all of the user's services
+    shelf_store.ensure_started()
+    # The whole shelf unless the client pages with limit or cursor. Zero or negative limits
+    # would give an empty warm page and fall through to upstream
+    if "limit" in request.args or "cursor" in request.args:
+        page_size = max(1, min(request.args.get("limit", config.SHELF_PAGE_SIZE, type=int), config.SHELF_ITEMS_PER_SHELF))
+    else:
+        page_size = config.SHELF_ITEMS_PER_SHELF
+    items, next_cursor = shelf_store.get_page(
+        user["streaming_services"], shelf, cursor=request.args.get("cursor"), page_size=page_size
+    )
+    if items:
+        response = jsonify(items)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
+    
+    # Shelf isn't warm yet (the refresher has been asked to fetch it), so query the user's
+    # services directly, all at once
     try:
-        conn = create_api_connection()  # Use helper function
+        # Use the shelf definition to decide which content types and genre to query
+        content_types, genre = SHELVES[shelf]
+        genre_query = f"&genre={genre}" if genre else ""
         
-        headers = {
-            'x-rapidapi-key': RAPIDAPI_KEY,
-            'x-rapidapi-host': RAPIDAPI_HOST
-        }
+        ranked_lists = fetch_ranked_results([
+            f"/search/basic?country=us&service={service}&type={content_type}&page=1&language=en{genre_query}&sort_by=popularity"
+            for service in rapidapi_services
+            for content_type in content_types
+        ])
         
-        content_type = None
-        genre = None
+        # Merge across services without duplicates and rerank for variety
+        with tracing.span("rerank.category", lists=len(ranked_lists)):
+            candidates = merge_ranked_lists(ranked_lists, key="imdbId")
+            results = rerank_candidates(candidates, config.SHELF_ITEMS_PER_SHELF)
         
-        # Map category name to the appropriate parameters
-        if category_name.lower() == "movies":
-            content_type = "movie"
-        elif category_name.lower() in ["tv", "tv shows", "shows"]:
-            content_type = "series"
-        else:
-            # Try to map category to a genre
-            genre_mappings = {
-                "action & adventure": "action",
-                "action": "action",
-                "adventure": "adventure",
-                "comedy": "comedy",
-                "drama": "drama",
-                "family": "family",
-                "sci-fi": "sci-fi",
-                "thriller": "thriller",
-                "horror": "horror",
-                "romance": "romance",
-                "documentary": "documentary",
-                "animation": "animation"
-            }
-            genre = genre_mappings.get(category_name.lower())
-            
-            if not genre:
-                return jsonify({"error": f"Unknown category: {category_name}"}), 400
-        
-        results = []
-        
-        # If we have a specific content type (movie or series)
-        if content_type:
-            req_path = f"/search/basic?country=us&service={selected_service}&type={content_type}&page=1&language=en&sort_by=popularity"
-            conn.request("GET", req_path, headers=headers)
-            res = conn.getresponse()
-            data = res.read().decode('utf-8')
-            content_data = json.loads(data)
-            results = content_data.get("results", [])
-        
-        # If we have a specific genre
-        elif genre:
-            # Get movies in this genre
-            req_path = f"/search/basic?country=us&service={selected_service}&type=movie&page=1&language=en&genre={genre}&sort_by=popularity"
-            conn.request("GET", req_path, headers=headers)
-            res = conn.getresponse()
-            data = res.read().decode('utf-8')
-            content_data = json.loads(data)
-            movies = content_data.get("results", [])
-            
-            # Get shows in this genre
-            req_path = f"/search/basic?country=us&service={selected_service}&type=series&page=1&language=en&genre={genre}&sort_by=popularity"
-            conn.request("GET", req_path, headers=headers)
-            res = conn.getresponse()
-            data = res.read().decode('utf-8')
-            content_data = json.loads(data)
-            shows = content_data.get("results", [])
-            
-            # Combine movies and shows for this genre
-            results = movies + shows
+        # Page the reranked shelf the same way as a warm one
+        page, next_cursor = paginate(results, shelf, cursor=request.args.get("cursor"), page_size=page_size)
         
         # Transform the results to our format
-        transformed_results = transform_content_items(results)
+        transformed_results = transform_content_items(page)
         
-        return jsonify(transformed_results)
+        response = jsonify(transformed_results)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return response
         
     except Exception as e:
         print(f"Error getting category content: {str(e)}")
         return jsonify({"error": f"Failed to get category content: {str(e)}"}), 500
 
 # Add content to watchlist
-@app.route("/api/watchlist", methods=["POST"])
+@api.route("/api/watchlist", methods=["POST"])
 @jwt_required()
 def add_to_watchlist():
     user_id = get_jwt_identity()
@@ -920,7 +1299,7 @@ def add_to_watchlist():
     watchlist_item = {
         "user_id": user_id,
         "content_id": data["content_id"],
-        "added_date": pd.Timestamp.now()
+        "added_date": datetime.utcnow()
     }
     
     db.watchlist.insert_one(watchlist_item)
@@ -928,17 +1307,18 @@ def add_to_watchlist():
     return jsonify({"message": "Added to watchlist successfully"}), 201
 
 # Get user's watchlist
-@app.route("/api/watchlist", methods=["GET"])
+@api.route("/api/watchlist", methods=["GET"])
 @jwt_required()
 def get_watchlist():
     user_id = get_jwt_identity()
     
     watchlist = list(db.watchlist.find({"user_id": user_id}))
     
-    # Get details for each item
+    # Get details for every item with a single catalog query
+    contents = catalog.get_many([item["content_id"] for item in watchlist], detail=True)
     watchlist_with_details = []
     for item in watchlist:
-        content = db.content_details.find_one({"id": item["content_id"]})
+        content = contents.get(item["content_id"])
         if content:
             watchlist_with_details.append({
                 "watchlist_id": str(item["_id"]),
@@ -949,31 +1329,24 @@ def get_watchlist():
     return jsonify(watchlist_with_details)
 
 # Add rating for content
-@app.route("/api/ratings", methods=["POST"])
+@api.route("/api/ratings", methods=["POST"])
 @jwt_required()
+@validate_request_data(["content_id", "rating"])
 def add_rating():
     user_id = get_jwt_identity()
     data = request.get_json()
     
-    rating_item = {
-        "user_id": user_id,
-        "content_id": data["content_id"],
-        "rating": data["rating"],  # 1-5 scale
-        "review": data.get("review", ""),
-        "date": pd.Timestamp.now()
-    }
-    
-    # Update if exists, otherwise insert
-    db.ratings.update_one(
-        {"user_id": user_id, "content_id": data["content_id"]},
-        {"$set": rating_item},
-        upsert=True
-    )
+    # Update if exists, otherwise insert; the title's aggregate is adjusted by the difference
+    try:
+        rating_store.record(user_id, data["content_id"], data["rating"], review=data.get("review", ""))  # 1-5 scale
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    invalidation_bus.publish("rating_aggregates", data["content_id"])
     
-    return jsonify({"message": "Rating added successfully"}), 201
+    return jsonify({"message": "Rating added successfully", "user_rating": rating_store.get(data["content_id"])}), 201
 
 # Get rating for a specific content
-@app.route("/api/ratings/<content_id>", methods=["GET"])
+@api.route("/api/ratings/<content_id>", methods=["GET"])
 @jwt_required()
 def get_rating(content_id):
     user_id = get_jwt_identity()
@@ -986,19 +1359,17 @@ def get_rating(content_id):
     if not rating:
         return jsonify({"error": "Rating not found"}), 404
     
-    # Convert ObjectId to string for JSON serialization
-    rating["_id"] = str(rating["_id"])
-    
+    # The JSON provider encodes the ObjectId and date
     return jsonify(rating)
 
 # Get current user information
-@app.route("/api/user", methods=["GET"])
+@api.route("/api/user", methods=["GET"])
 @jwt_required()
 def get_current_user():
     user_id = get_jwt_identity()
     
     try:
-        user = db.users.find_one({"_id": ObjectId(user_id)})
+        user = user_cache.get(user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
             
@@ -1014,18 +1385,16 @@ def get_current_user():
         return jsonify({"error": f"Failed to get user data: {str(e)}"}), 500
 
 # Add new endpoints for discovery preferences
-@app.route("/api/discover/next", methods=["GET"])
+@api.route("/api/discover/next", methods=["GET"])
 @jwt_required()
 def get_next_content():
     user_id = get_jwt_identity()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
-    
-    # Get user's preferences directly from user document
-    liked_content = set(user.get('liked_content', []) if user else [])
-    disliked_content = set(user.get('disliked_content', []) if user else [])
-    seen_content = liked_content.union(disliked_content)
+    user = user_cache.get(user_id)
     
     try:
+        # Compact in-memory filter of everything the user already liked or disliked
+        seen_content = interaction_store.seen_filter(user_id)
+        
         # Import the StreamingService class
         try:
             from backend.utils.streaming_services import StreamingService
@@ -1060,19 +1429,16 @@ def get_next_content():
         
         # Try to get any content from the db as a fallback
         try:
-            fallback_content = db.content_cache.find_one(
-                {"id": {"$exists": True, "$ne": "last_update"}},
-                {"_id": 0}
-            )
+            fallback_content = catalog.find(limit=1)
             
             if fallback_content:
-                return jsonify(fallback_content)
+                return jsonify(fallback_content[0])
         except Exception:
             pass
             
         return jsonify({"error": "Failed to get next content. Please try again."}), 500
 
-@app.route("/api/discover/preference", methods=["POST"])
+@api.route("/api/discover/preference", methods=["POST"])
 @jwt_required()
 def record_preference():
     user_id = get_jwt_identity()
@@ -1084,40 +1450,58 @@ def record_preference():
     content_id = data["content_id"]
     preference = data["preference"]  # "like" or "dislike"
     
+    if preference not in ("like", "dislike"):
+        return jsonify({"error": "Invalid preference value"}), 400
+    
     try:
-        # Update the user document directly
-        if preference == "like":
-            # Add to liked_content and remove from disliked_content if present
-            db.users.update_one(
-                {"_id": ObjectId(user_id)},
-                {
-                    "$addToSet": {"liked_content": content_id},
-                    "$pull": {"disliked_content": content_id}
-                }
-            )
-        elif preference == "dislike":
-            # Add to disliked_content and remove from liked_content if present
-            db.users.update_one(
-                {"_id": ObjectId(user_id)},
-                {
-                    "$addToSet": {"disliked_content": content_id},
-                    "$pull": {"liked_content": content_id}
-                }
-            )
-        else:
-            return jsonify({"error": "Invalid preference value"}), 400
+        # A new signal for the same title replaces the previous one
+        interaction_store.record(user_id, content_id, preference)
+        
+        user_cache.invalidate(user_id)
+        
+        # This worker's seen filter already has the title; other workers drop theirs
+        invalidation_bus.publish("interactions", user_id, apply_locally=False)
         
         return jsonify({"message": "Preference recorded successfully"}), 201
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Record several like/dislike signals at once
+@api.route("/api/discover/preferences", methods=["POST"])
+@jwt_required()
+def record_preferences():
+    user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get("preferences"), list):
+        return jsonify({"error": "Missing preferences list"}), 400
+    
+    interactions = []
+    for item in data["preferences"]:
+        if not isinstance(item, dict) or "content_id" not in item or "preference" not in item:
+            return jsonify({"error": "Each preference needs content_id and preference"}), 400
+        if item["preference"] not in ("like", "dislike"):
+            return jsonify({"error": f"Invalid preference value: {item['preference']}"}), 400
+        interactions.append((item["content_id"], item["preference"]))
+    
+    try:
+        recorded = interaction_store.record_many(user_id, interactions)
+        
+        user_cache.invalidate(user_id)
+        invalidation_bus.publish("interactions", user_id, apply_locally=False)
+        
+        return jsonify({"message": "Preferences recorded successfully", "recorded": recorded}), 201
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # Add fallback API endpoint for streaming content
-@app.route("/api/fallback/streaming", methods=["GET"])
+@api.route("/api/fallback/streaming", methods=["GET"])
 @jwt_required()
 def get_fallback_streaming_content():
     user_id = get_jwt_identity()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    user = user_cache.get(user_id)
     
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -1127,13 +1511,6 @@ def get_fallback_streaming_content():
         genres = ["action", "comedy", "drama", "thriller", "sci-fi", "romance"]
         selected_genre = random.choice(genres)
         
-        conn = create_api_connection()  # Use helper function
-        
-        headers = {
-            'x-rapidapi-key': RAPIDAPI_KEY,
-            'x-rapidapi-host': RAPIDAPI_HOST
-        }
-        
         # Get user streaming services to filter content
         user_services = user.get("streaming_services", [])
         
@@ -1153,13 +1530,8 @@ def get_fallback_streaming_content():
         # Format the URL for the API request
         req_path = f"/search/basic?country=us&service={selected_service}&type=movie&genre={selected_genre}&page=1&language=en"
         
-        conn.request("GET", req_path, headers=headers)
-        
-        res = conn.getresponse()
-        data = res.read().decode("utf-8")
-        
-        # Parse the JSON response
-        result = json.loads(data)
+        # Make the request (parses the JSON response)
+        result = make_api_request(req_path)
         
         # Check if we got results
         if "results" in result and len(result["results"]) > 0:
@@ -1188,8 +1560,43 @@ def invalid_token_callback(error):
 def missing_token_callback(error):
     return jsonify({"error": "Missing authentication token", "code": "missing_token"}), 401
 
+# Application factory; the routes above are registered through the api blueprint
+def create_app():
+    with startup_report.phase("create_app"):
+        app = Flask(__name__)
+        # Update CORS configuration to properly handle preflight requests
+        CORS(app, resources={r"/*": {
+            "origins": ["http://localhost:3000"], 
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["X-Next-Cursor"]
+        }}, supports_credentials=True)
+
+        # Configuration
+        app.config["MONGO_URI"] = config.MONGO_URI
+        app.config["JWT_SECRET_KEY"] = config.JWT_SECRET_KEY
+        app.config["JWT_ERROR_MESSAGE_KEY"] = "error"
+
+        # orjson-backed encoder that also handles ObjectId, datetimes and pandas values
+        app.json = FastJSONProvider(
+            app,
+            stream_min_items=config.JSON_STREAM_MIN_ITEMS,
+            stream_chunk_items=config.JSON_STREAM_CHUNK_ITEMS
+        )
+
+        jwt.init_app(app)
+        app.register_blueprint(api)
+    return app
+
+app = create_app()
+startup_report.finish()
+startup_report.print_report()
+
 if __name__ == "__main__":
     if ensure_mongo_connection():
+        # Start warming trending lists before the first request comes in
+        trending_store.ensure_started()
+        shelf_store.ensure_started()
         # Make sure we're using port 5000 to match what the frontend expects
         app.run(debug=True, port=5000, host='0.0.0.0')
     else:
@@ -0,0 +1,113 @@
+"""
+Darick Le
+October 19 2026
+Helpers shared by the benchmark scripts: latency percentiles, the JSON results file and the
+comparison against a saved baseline that makes a run fail when something got slower.
+"""
+
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list (pct in 0-100)."""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def summarize_latencies(latencies_ms):
+    """p50/p95/p99, mean and max of a list of latencies in milliseconds."""
+    values = sorted(latencies_ms)
+    if not values:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3)
+    }
+
+
+def environment():
+    """Where the numbers came from, stored next to them in the results file."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "recorded_at": datetime.now().isoformat(timespec="seconds")
+    }
+
+
+def save_results(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {path}")
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current, baseline, checks, tolerance):
+    """
+    Compare two results dicts.
+
+    checks is a list of (label, path, direction) or (label, path, direction, floor): path is a
+    tuple of keys into both dicts and direction is "lower" when smaller values are better
+    (latency, memory) or "higher" when larger values are better (throughput). A check regresses
+    when the current value is worse than the baseline by more than tolerance (a fraction, e.g.
+    0.15 for 15%). Checks missing from either side, or whose baseline is below floor (values
+    too small to compare reliably), are skipped.
+
+    Returns a list of (label, baseline value, current value, change) for every regression.
+    """
+    regressions = []
+    for label, path, direction, *floor in checks:
+        old, new = _lookup(baseline, path), _lookup(current, path)
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or old <= 0:
+            continue
+        if floor and old < floor[0]:
+            continue
+        change = (new - old) / old
+        if (direction == "lower" and change > tolerance) or (direction == "higher" and change < -tolerance):
+            regressions.append((label, old, new, change))
+    return regressions
+
+
+def report_regressions(regressions):
+    """Print the regressions and return the process exit code."""
+    if not regressions:
+        print("No regressions against the baseline")
+        return 0
+    print(f"{len(regressions)} regression(s) against the baseline:")
+    for label, old, new, change in regressions:
+        print(f"  {label}: {old:g} -> {new:g} ({change:+.1%})")
+    return 1
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
@@ -0,0 +1,338 @@
+"""
+Darick Le
+October 19 2026
+Microbenchmarks for utils/data_processing.py at catalog scale.
+A seeded generator builds a synthetic catalog (genre mix, release decades, runtimes and
+ratings skewed the way a streaming catalog is) and every data_processing function is run on
+it at each requested size. For each function the benchmark records:
+    wall time       min and median over --repeat runs (cheap calls are looped per run)
+    peak RSS        highest resident set size while the call ran, and its increase
+    allocations     peak and retained Python allocations traced with tracemalloc
+Timing, RSS and tracemalloc are measured in separate passes so tracing doesn't slow the
+timed runs.
+
+Run from the backend directory:
+    python -m benchmarks.data_processing_bench --sizes 10k,100k --output benchmarks/results/data_processing.json
+    python -m benchmarks.data_processing_bench --baseline benchmarks/results/data_processing.json
+    python -m benchmarks.data_processing_bench --sizes 1m --repeat 1     (needs a few GB of memory)
+"""
+
+import argparse
+import gc
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    from backend.benchmarks.common import compare, environment, load_results, report_regressions, save_results
+    from backend.utils import data_processing
+except ImportError:
+    from benchmarks.common import compare, environment, load_results, report_regressions, save_results
+    from utils import data_processing
+
+# Share of titles tagged with each genre (titles carry 1-3 genres)
+GENRE_WEIGHTS = {
+    "Drama": 0.24, "Comedy": 0.17, "Thriller": 0.09, "Action": 0.09, "Romance": 0.07,
+    "Horror": 0.06, "Documentary": 0.06, "Crime": 0.05, "Adventure": 0.04, "Family": 0.03,
+    "Animation": 0.03, "Sci-Fi": 0.03, "Fantasy": 0.02, "Mystery": 0.02
+}
+GENRE_COUNT_WEIGHTS = {1: 0.45, 2: 0.35, 3: 0.20}
+
+# Catalogs are dominated by recent releases
+DECADE_WEIGHTS = {
+    1920: 0.005, 1930: 0.01, 1940: 0.015, 1950: 0.02, 1960: 0.03, 1970: 0.04,
+    1980: 0.06, 1990: 0.09, 2000: 0.17, 2010: 0.33, 2020: 0.23
+}
+PLATFORMS = ["netflix", "prime", "disney", "hulu", "hbo", "paramount", "peacock", "apple"]
+
+ACTOR_POOL = 20000
+DIRECTOR_POOL = 5000
+MISSING_RATE = 0.02           # Share of titles missing each optional field
+USER_RATINGS = 200            # Ratings per user for process_user_ratings
+
+# Cheap calls are repeated until one timed run takes at least this long
+MIN_RUN_SECONDS = 0.05
+
+SIZE_SUFFIXES = {"k": 1000, "m": 1000000}
+DEFAULT_SIZES = "10k,100k"
+
+FUNCTIONS = [
+    "preprocess_movie_data", "extract_features", "normalize_features",
+    "user_feature_vector", "calculate_similarity", "process_user_ratings"
+]
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def size_label(size):
+    if size % 1000000 == 0:
+        return f"{size // 1000000}m"
+    if size % 1000 == 0:
+        return f"{size // 1000}k"
+    return str(size)
+
+
+def _weighted(rng, weights, count):
+    keys = list(weights)
+    probabilities = np.array([weights[key] for key in keys], dtype=float)
+    return np.array(keys)[rng.choice(len(keys), size=count, p=probabilities / probabilities.sum())]
+
+
+def generate_catalog(size, seed=42):
+    """Build `size` movie documents in the shape preprocess_movie_data() expects."""
+    rng = np.random.default_rng(seed)
+    genre_names = np.array(list(GENRE_WEIGHTS))
+    genre_p = np.array(list(GENRE_WEIGHTS.values()))
+
+    genre_counts = _weighted(rng, GENRE_COUNT_WEIGHTS, size)
+    # Weighted sampling without replacement for every title at once: keys u^(1/w), highest first
+    genre_order = np.argsort(-rng.random((size, len(genre_names))) ** (1 / genre_p), axis=1)
+    decades = _weighted(rng, DECADE_WEIGHTS, size)
+    years = np.minimum(decades + rng.integers(0, 10, size), 2026)
+    # Mostly feature-length, with a tail of shorts and long epics
+    runtimes = np.where(
+        rng.random(size) < 0.1,
+        rng.normal(70, 12, size),
+        rng.normal(106, 21, size)
+    ).clip(20, 240).astype(int)
+    ratings = rng.normal(6.3, 1.1, size).clip(1, 10).round(1)
+    actors = rng.integers(0, ACTOR_POOL, (size, 6))
+    actor_counts = rng.integers(3, 7, size)
+    directors = rng.integers(0, DIRECTOR_POOL, (size, 2))
+    director_counts = rng.integers(1, 3, size)
+    platform_order = np.argsort(rng.random((size, len(PLATFORMS))), axis=1)
+    platform_counts = rng.integers(0, 4, size)
+    missing = rng.random((size, 4)) < MISSING_RATE
+
+    genre_names = genre_names.tolist()
+    movies = []
+    for i in range(size):
+        movies.append({
+            "id": f"tt{i:07d}",
+            "title": f"Title {i}",
+            "overview": None if missing[i, 0] else f"Synthetic overview for title {i}.",
+            "release_year": None if missing[i, 1] else int(years[i]),
+            "runtime": None if missing[i, 2] else int(runtimes[i]),
+            "rating": None if missing[i, 3] else float(ratings[i]),
+            "genres": [genre_names[g] for g in genre_order[i, :genre_counts[i]].tolist()],
+            "actors": [f"Actor {n}" for n in actors[i, :actor_counts[i]].tolist()],
+            "directors": [f"Director {n}" for n in directors[i, :director_counts[i]].tolist()],
+            "streaming_platforms": [PLATFORMS[n] for n in platform_order[i, :platform_counts[i]].tolist()]
+        })
+    return movies
+
+
+def generate_user(movie_ids, seed=42):
+    """Preferences and ratings for one synthetic user."""
+    rng = np.random.default_rng(seed + 1)
+    preferences = {
+        "genres": [str(genre) for genre in rng.choice(list(GENRE_WEIGHTS), 3, replace=False)],
+        "decades": [1990, 2010],
+        "runtime": "medium"
+    }
+    rated = rng.choice(len(movie_ids), min(USER_RATINGS, len(movie_ids)), replace=False)
+    ratings = {movie_ids[i]: int(rng.integers(1, 6)) for i in rated}
+    return preferences, ratings
+
+
+class RssSampler:
+    """Samples resident set size from a background thread while a call runs."""
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.available = os.path.exists("/proc/self/statm")
+        self._stop = threading.Event()
+        self._thread = None
+        self.start_bytes = 0
+        self.peak_bytes = 0
+
+    def _read(self):
+        if self.available:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self.page_size
+        # Peak since the process started; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, self._read())
+
+    def __enter__(self):
+        self.start_bytes = self.peak_bytes = self._read()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_bytes = max(self.peak_bytes, self._read())
+        return False
+
+
+def _mb(num_bytes):
+    return round(num_bytes / (1024 * 1024), 3)
+
+
+def measure(func, make_args, repeat, reusable_args):
+    """Time, RSS and allocation figures for one function."""
+    # Wall time; arguments are rebuilt outside the timed region for functions that mutate them
+    calls = 1
+    if reusable_args:
+        args = make_args()
+        started = time.perf_counter()
+        func(*args)
+        single = time.perf_counter() - started
+        calls = max(1, int(MIN_RUN_SECONDS / max(single, 1e-7)))
+    timings = []
+    for _ in range(repeat):
+        args = make_args()
+        gc.collect()
+        started = time.perf_counter()
+        for _ in range(calls):
+            func(*args)
+        timings.append((time.perf_counter() - started) / calls * 1000)
+        del args
+    timings.sort()
+
+    # Peak RSS
+    args = make_args()
+    gc.collect()
+    with RssSampler() as rss:
+        result = func(*args)
+    del result, args
+
+    # Python allocations
+    args = make_args()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result, args
+
+    return {
+        "wall_ms": {
+            "min": round(timings[0], 4),
+            "median": round(timings[len(timings) // 2], 4),
+            "repeats": repeat,
+            "calls_per_repeat": calls
+        },
+        "peak_rss_mb": _mb(rss.peak_bytes),
+        "rss_increase_mb": _mb(rss.peak_bytes - rss.start_bytes),
+        "alloc_peak_mb": _mb(peak - before),
+        "alloc_retained_mb": _mb(current - before)
+    }
+
+
+def run_size(size, seed, repeat, only=None):
+    print(f"Generating {size_label(size)} titles...")
+    started = time.perf_counter()
+    movies = generate_catalog(size, seed)
+    movie_ids = [movie["id"] for movie in movies]
+    preferences, ratings = generate_user(movie_ids, seed)
+    generated_s = time.perf_counter() - started
+
+    # Each stage's output is the next stage's input, built once outside the measurements
+    df = data_processing.preprocess_movie_data(movies)
+    feature_df = data_processing.extract_features(df.copy())
+    features = data_processing.normalize_features(feature_df)
+    user_vector = data_processing.user_feature_vector(preferences, feature_df)
+
+    cases = {
+        # name: (function, argument factory, whether arguments can be reused across calls)
+        "preprocess_movie_data": (data_processing.preprocess_movie_data, lambda: (movies,), True),
+        "extract_features": (data_processing.extract_features, lambda: (df.copy(),), False),
+        "normalize_features": (data_processing.normalize_features, lambda: (feature_df,), True),
+        "user_feature_vector": (data_processing.user_feature_vector, lambda: (preferences, feature_df), True),
+        "calculate_similarity": (data_processing.calculate_similarity, lambda: (user_vector, features), True),
+        "process_user_ratings": (data_processing.process_user_ratings, lambda: (ratings, movie_ids), True)
+    }
+    results = {
+        "_catalog": {
+            "titles": size,
+            "features": int(feature_df.shape[1]),
+            "generate_s": round(generated_s, 2)
+        }
+    }
+    for name in FUNCTIONS:
+        if only and name not in only:
+            continue
+        func, make_args, reusable = cases[name]
+        results[name] = measure(func, make_args, repeat, reusable)
+        row = results[name]
+        print(f"  {name:<24}{row['wall_ms']['median']:>12.3f} ms{row['rss_increase_mb']:>11.1f} MB"
+              f"{row['alloc_peak_mb']:>11.1f} MB")
+    return results
+
+
+def regression_checks(results, memory=False):
+    checks = []
+    for label, functions in results["sizes"].items():
+        for name in functions:
+            if name.startswith("_"):
+                continue
+            if memory:
+                # Small figures are dominated by noise, so only compare from 1 MB up
+                checks.append((f"{label} {name} alloc peak (MB)", ("sizes", label, name, "alloc_peak_mb"), "lower", 1.0))
+                checks.append((f"{label} {name} RSS increase (MB)", ("sizes", label, name, "rss_increase_mb"), "lower", 16.0))
+            else:
+                checks.append((f"{label} {name} median (ms)", ("sizes", label, name, "wall_ms", "median"), "lower", 0.05))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark utils/data_processing.py on synthetic catalogs")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated catalog sizes (default {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per function")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="Comma-separated function names to run")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Results file to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed wall time regression (default 0.2)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.1, help="Allowed memory regression (default 0.1)")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+    only = set(args.only.split(",")) if args.only else None
+    if only and only - set(FUNCTIONS):
+        parser.error(f"unknown function(s): {', '.join(sorted(only - set(FUNCTIONS)))}")
+
+    print(f"{'':<26}{'median':>12}{'RSS +':>14}{'alloc peak':>14}")
+    results = {
+        "benchmark": "data_processing",
+        "config": {"sizes": [size_label(size) for size in sizes], "repeat": args.repeat, "seed": args.seed},
+        "environment": environment(),
+        "sizes": {}
+    }
+    for size in sizes:
+        results["sizes"][size_label(size)] = run_size(size, args.seed, args.repeat, only)
+        gc.collect()
+
+    if args.output:
+        save_results(args.output, results)
+
+    exit_code = 0
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        regressions = compare(results, baseline, regression_checks(results), args.tolerance)
+        regressions += compare(results, baseline, regression_checks(results, memory=True), args.memory_tolerance)
+        exit_code = report_regressions(regressions)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
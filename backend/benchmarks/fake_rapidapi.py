@@ -0,0 +1,283 @@
+"""
+Darick Le
+October 19 2026
+Local stand-in for the Streaming Availability API on RapidAPI.
+Serves /search/basic, /search/title and /get/{movie|series}/id/{imdb id} over plain HTTP with
+a configurable latency and error rate, so the backend can be load-tested without spending API
+quota or depending on RapidAPI's response times. Point the backend at it with
+RAPIDAPI_BASE_URL=http://127.0.0.1:<port>.
+
+Responses are replayed from a fixtures file when one is given: a JSON object mapping an
+endpoint family ("/search/basic", "/search/title", "/get") to a list of recorded response
+bodies, in the shapes the backend parses (search pages under "results", title matches under
+"result", /get items unwrapped). /get responses are matched by imdbId and the search families
+are replayed in order. Anything without a fixture is synthesized deterministically.
+
+Run standalone:
+    python -m benchmarks.fake_rapidapi --port 8765 --latency-ms 150 --error-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = ["action", "adventure", "animation", "comedy", "crime", "documentary", "drama", "family",
+          "fantasy", "horror", "mystery", "romance", "scifi", "thriller", "war", "western"]
+SERVICES = ["netflix", "prime", "disney", "hulu", "hbo", "paramount", "peacock", "apple"]
+TITLE_WORDS = ["Star", "Moon", "River", "Night", "City", "Storm", "Garden", "Shadow", "Empire",
+               "Winter", "Signal", "Harbor", "Echo", "Frontier", "Glass", "Summer", "Iron", "Ghost"]
+NAMES = ["Alex Moreno", "Sam Patel", "Jordan Lee", "Riley Chen", "Casey Brooks", "Morgan Diaz",
+         "Taylor Kim", "Jamie Novak", "Avery Singh", "Quinn Walsh"]
+
+# Real responses list every audio track and subtitle per streaming option, which makes up
+# most of their size
+AUDIO_LANGUAGES = ["eng", "spa", "fra", "deu", "ita", "por"]
+SUBTITLE_LANGUAGES = ["eng", "spa", "fra", "deu", "ita", "por", "jpn", "kor", "zho", "ara", "hin", "pol"]
+
+SEARCH_PAGE_SIZE = 25
+TITLE_RESULTS = 10
+CATALOG_SIZE = 50000
+
+
+def _seed(*parts):
+    return zlib.crc32("|".join(str(part) for part in parts).encode("utf-8"))
+
+
+def synthetic_item(index, content_type="movie"):
+    """A deterministic item shaped like a Streaming Availability API result."""
+    rnd = random.Random(index)
+    services = rnd.sample(SERVICES, rnd.randint(1, 3))
+    genres = rnd.sample(GENRES, rnd.randint(1, 3))
+    title = f"{rnd.choice(TITLE_WORDS)} {rnd.choice(TITLE_WORDS)} {index}"
+    item = {
+        "type": content_type,
+        "title": title,
+        "originalTitle": title,
+        "imdbId": f"tt{index:07d}",
+        "tmdbId": index,
+        "year": 1970 + index % 55,
+        "overview": " ".join(rnd.choice(TITLE_WORDS).lower() for _ in range(40)).capitalize() + ".",
+        "genres": [{"id": GENRES.index(genre) + 1, "name": genre.title()} for genre in genres],
+        "cast": [{"name": name} for name in rnd.sample(NAMES, 4)],
+        "directors": [{"name": name} for name in rnd.sample(NAMES, 1)],
+        "rating": rnd.choice(["G", "PG", "PG-13", "R", "TV-14", "TV-MA"]),
+        "imdbRating": rnd.randint(40, 95),
+        "imdbVoteCount": rnd.randint(100, 500000),
+        "tmdbRating": rnd.randint(40, 95),
+        "originalLanguage": "en",
+        "posterURLs": {
+            size: f"https://images.example.com/{size}/{index}.jpg"
+            for size in ("92", "154", "185", "342", "500", "780", "original")
+        },
+        "backdropURLs": {
+            size: f"https://images.example.com/backdrop/{size}/{index}.jpg"
+            for size in ("300", "780", "1280", "original")
+        },
+        "tagline": " ".join(rnd.choice(TITLE_WORDS) for _ in range(6)) + ".",
+        "youtubeTrailerVideoId": f"yt{index:09d}",
+        "youtubeTrailerVideoLink": f"https://www.youtube.com/watch?v=yt{index:09d}",
+        "advisedMinimumAudienceAge": rnd.choice([0, 7, 13, 16, 18]),
+        "streamingInfo": {
+            "us": {
+                service: [{
+                    "type": "subscription",
+                    "quality": "hd",
+                    "addOn": "",
+                    "link": f"https://www.{service}.example.com/title/{index}",
+                    "watchLink": f"https://www.{service}.example.com/watch/{index}",
+                    "audios": [{"language": language, "region": ""} for language in AUDIO_LANGUAGES],
+                    "subtitles": [
+                        {"locale": {"language": language, "region": ""}, "closedCaptions": language == "eng"}
+                        for language in SUBTITLE_LANGUAGES
+                    ],
+                    "price": None,
+                    "leaving": 0,
+                    "availableSince": 1600000000 + index
+                }]
+                for service in services
+            }
+        }
+    }
+    if content_type == "series":
+        item["seasons"] = rnd.randint(1, 8)
+        item["episodes"] = item["seasons"] * rnd.randint(6, 12)
+    else:
+        item["runtime"] = rnd.randint(80, 170)
+    return item
+
+
+class FakeRapidAPI:
+    """Threaded HTTP server answering like RapidAPI; start() returns its base URL."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 fixtures=None, seed=0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self.fixtures = fixtures or {}
+        self._fixtures_by_id = {
+            item.get("imdbId"): item for item in self.fixtures.get("/get", []) if isinstance(item, dict)
+        }
+        self._replay_positions = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.errors = 0
+        self._server = None
+        self._thread = None
+
+    @classmethod
+    def from_fixtures_file(cls, path, **kwargs):
+        with open(path) as f:
+            return cls(fixtures=json.load(f), **kwargs)
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def start(self):
+        server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        server.daemon_threads = True
+        server.fake = self
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, name="fake-rapidapi", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def stats(self):
+        with self._lock:
+            return {"calls": dict(self.calls), "errors": self.errors}
+
+    def _delay_and_fail(self):
+        """Sleep for the configured latency; returns True when this call should fail."""
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self._random.random() < self.error_rate
+        delay = max(0.0, self.latency_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def respond(self, path):
+        """Return (status, body) for a request path."""
+        url = urlparse(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        family = "/get" if parts[:1] == ["get"] else "/" + "/".join(parts[:2])
+
+        with self._lock:
+            self.calls[family] = self.calls.get(family, 0) + 1
+        if self._delay_and_fail():
+            with self._lock:
+                self.errors += 1
+            return 500, {"message": "Simulated upstream error"}
+
+        if family == "/search/basic":
+            return 200, self._search_basic(query)
+        if family == "/search/title":
+            return 200, self._search_title(query)
+        if family == "/get" and len(parts) >= 4:
+            return 200, self._get(parts[1], parts[3])
+        return 404, {"message": "Endpoint does not exist"}
+
+    def _replay(self, family):
+        recorded = self.fixtures.get(family)
+        if not recorded:
+            return None
+        with self._lock:
+            position = self._replay_positions.get(family, 0)
+            self._replay_positions[family] = position + 1
+        return recorded[position % len(recorded)]
+
+    def _search_basic(self, query):
+        recorded = self._replay("/search/basic")
+        if recorded is not None:
+            return recorded
+        content_type = query.get("type", "movie")
+        # The same service/type/genre/page always returns the same page
+        start = _seed(self.seed, query.get("service"), content_type, query.get("genre"), query.get("page")) % CATALOG_SIZE
+        return {
+            "results": [synthetic_item((start + i) % CATALOG_SIZE, content_type) for i in range(SEARCH_PAGE_SIZE)],
+            "total_pages": 20
+        }
+
+    def _search_title(self, query):
+        recorded = self._replay("/search/title")
+        if recorded is not None:
+            return recorded
+        title = query.get("title", "").strip().lower()
+        if not title:
+            return {"result": []}
+        start = _seed(self.seed, title) % CATALOG_SIZE
+        return {
+            "result": [
+                synthetic_item((start + i) % CATALOG_SIZE, "movie" if i % 3 else "series")
+                for i in range(TITLE_RESULTS)
+            ]
+        }
+
+    def _get(self, content_type, content_id):
+        if content_id in self._fixtures_by_id:
+            return self._fixtures_by_id[content_id]
+        try:
+            index = int(content_id.lstrip("t"))
+        except ValueError:
+            index = _seed(self.seed, content_id) % CATALOG_SIZE
+        return synthetic_item(index, content_type)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        status, body = self.server.fake.respond(self.path)
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # One line per request would dominate a load test's output
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the RapidAPI streaming availability API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Latency varies by up to +/- this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--fixtures", help="JSON file of recorded responses to replay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    options = dict(host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                   error_rate=args.error_rate, seed=args.seed)
+    fake = FakeRapidAPI.from_fixtures_file(args.fixtures, **options) if args.fixtures else FakeRapidAPI(**options)
+    print(f"Fake RapidAPI listening on {fake.start()}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Darick Le
+October 19 2026
+Serialization benchmark for API responses.
+Encodes watchlist-shaped responses of 20, 100 and 1000 items (catalog documents with an
+ObjectId, datetimes and nested sources, the shape get_watchlist returns) three ways:
+    flask_default    Flask's DefaultJSONProvider after converting ObjectIds by hand, as the
+                     routes had to before the custom provider
+    provider         FastJSONProvider with orjson on the raw documents
+    provider_stdlib  FastJSONProvider's standard library fallback (no orjson)
+Times cover building the complete response body, so streamed responses are fully consumed.
+
+Run from the backend directory:
+    python -m benchmarks.json_bench --output benchmarks/results/json.json
+    python -m benchmarks.json_bench --baseline benchmarks/results/json.json
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from flask import Flask
+
+try:
+    from backend import config
+    from backend.benchmarks.common import compare, environment, load_results, report_regressions, save_results
+    from backend.benchmarks.fake_rapidapi import synthetic_item
+    from backend.utils import json_provider
+except ImportError:
+    import config
+    from benchmarks.common import compare, environment, load_results, report_regressions, save_results
+    from benchmarks.fake_rapidapi import synthetic_item
+    from utils import json_provider
+
+DEFAULT_SIZES = "20,100,1000"
+MIN_RUN_SECONDS = 0.1
+
+
+def catalog_document(index, now):
+    """A stored catalog document with details, as get_watchlist reads it."""
+    item = synthetic_item(index, "movie" if index % 3 else "series")
+    services = item["streamingInfo"]["us"]
+    return {
+        "_id": ObjectId(),
+        "id": item["imdbId"],
+        "title": item["title"],
+        "year": item["year"],
+        "content_type": "movie" if item["type"] == "movie" else "show",
+        "poster_url": item["posterURLs"]["original"],
+        "plot_overview": item["overview"],
+        "genre_names": [genre["name"] for genre in item["genres"]],
+        "runtime_minutes": item.get("runtime", 0),
+        "us_rating": item["rating"],
+        "cast": [cast["name"] for cast in item["cast"]],
+        "directors": [director["name"] for director in item["directors"]],
+        "sources": [
+            {"source_id": 203, "name": service, "type": "sub", "web_url": entries[0]["link"]}
+            for service, entries in services.items()
+        ],
+        "service_ids": ["203", "26"],
+        "cached_at": now - timedelta(hours=index % 48),
+        "details_cached": True
+    }
+
+
+def watchlist_response(size, seed=7):
+    rng = random.Random(seed)
+    now = datetime(2026, 10, 19, 12, 0, 0)
+    return [
+        {
+            "_id": ObjectId(),
+            "added_date": now - timedelta(minutes=rng.randint(0, 100000)),
+            "content": catalog_document(rng.randint(0, 50000), now)
+        }
+        for _ in range(size)
+    ]
+
+
+def convert_by_hand(items):
+    """What routes did before the provider: copy each document and stringify its ObjectIds."""
+    converted = []
+    for item in items:
+        content = dict(item["content"])
+        content["_id"] = str(content["_id"])
+        converted.append({"watchlist_id": str(item["_id"]), "added_date": item["added_date"], "content": content})
+    return converted
+
+
+def make_app(provider):
+    app = Flask("json_bench")
+    if provider is not None:
+        app.json = provider(app)
+    return app
+
+
+def body_bytes(response):
+    return b"".join(response.iter_encoded())
+
+
+def time_encoder(encode, repeat):
+    # Loop cheap encodes so each timed run lasts long enough to measure
+    started = time.perf_counter()
+    encode()
+    calls = max(1, int(MIN_RUN_SECONDS / max(time.perf_counter() - started, 1e-7)))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            encode()
+        timings.append((time.perf_counter() - started) / calls * 1000)
+    timings.sort()
+    return {"min": round(timings[0], 4), "median": round(timings[len(timings) // 2], 4), "calls_per_repeat": calls}
+
+
+def run(sizes, repeat):
+    default_app = make_app(None)
+    fast_app = make_app(lambda app: json_provider.FastJSONProvider(
+        app, stream_min_items=config.JSON_STREAM_MIN_ITEMS, stream_chunk_items=config.JSON_STREAM_CHUNK_ITEMS
+    ))
+    results = {}
+    for size in sizes:
+        items = watchlist_response(size)
+
+        def flask_default():
+            with default_app.app_context():
+                return body_bytes(default_app.json.response(convert_by_hand(items)))
+
+        def provider():
+            with fast_app.app_context():
+                return body_bytes(fast_app.json.response(items))
+
+        def provider_stdlib():
+            saved, json_provider.orjson = json_provider.orjson, None
+            try:
+                return provider()
+            finally:
+                json_provider.orjson = saved
+
+        row = {}
+        for name, encode in (("flask_default", flask_default), ("provider", provider), ("provider_stdlib", provider_stdlib)):
+            if name == "provider" and json_provider.orjson is None:
+                continue
+            row[name] = {**time_encoder(encode, repeat), "bytes": len(encode())}
+        baseline_ms = row["flask_default"]["median"]
+        for name, figures in row.items():
+            figures["speedup"] = round(baseline_ms / figures["median"], 2) if figures["median"] else 0.0
+        results[str(size)] = row
+        streamed = size >= config.JSON_STREAM_MIN_ITEMS > 0
+        print(f"{size} items{' (streamed)' if streamed else ''}:")
+        for name, figures in row.items():
+            print(f"  {name:<18}{figures['median']:>10.3f} ms{figures['bytes']:>10} bytes{figures['speedup']:>8.2f}x")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding of API responses")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated item counts (default {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Results file to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = {
+        "benchmark": "json",
+        "config": {
+            "sizes": sizes,
+            "repeat": args.repeat,
+            "encoder": "orjson" if json_provider.orjson else "json",
+            "stream_min_items": config.JSON_STREAM_MIN_ITEMS
+        },
+        "environment": environment(),
+        "sizes": run(sizes, args.repeat)
+    }
+    if args.output:
+        save_results(args.output, results)
+
+    exit_code = 0
+    if args.baseline:
+        checks = [
+            (f"{size} items {name} median (ms)", ("sizes", size, name, "median"), "lower", 0.01)
+            for size, row in results["sizes"].items() for name in row if name != "flask_default"
+        ]
+        exit_code = report_regressions(compare(results, load_results(args.baseline), checks, args.tolerance))
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Darick Le
+October 19 2026
+Load test for the backend's hot paths.
+Starts the Flask app in-process against the local RapidAPI stand-in (benchmarks.fake_rapidapi)
+and mongomock, or a local MongoDB with --mongo-uri, registers a pool of virtual users and then
+drives a weighted mix of /api/discover/next, /api/recommendations, /api/search and
+/api/watchlist traffic from concurrent clients. Throughput and p50/p95/p99 latency are
+reported overall and per endpoint; requests made during the warm-up are not counted.
+
+Results can be saved with --output and compared with a saved run with --baseline, in which
+case the run exits with status 1 when throughput or latency regressed by more than
+--tolerance.
+
+Run from the backend directory:
+    python -m benchmarks.load_test --duration 30 --concurrency 16 --upstream-latency-ms 150
+    python -m benchmarks.load_test --output benchmarks/results/load.json
+    python -m benchmarks.load_test --baseline benchmarks/results/load.json --tolerance 0.2
+
+--target http://host:port sends the traffic to a server that is already running instead
+(start it with RAPIDAPI_BASE_URL pointing at `python -m benchmarks.fake_rapidapi`).
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import quote, urlparse
+
+try:
+    from backend.benchmarks.common import compare, environment, load_results, report_regressions, save_results, summarize_latencies
+    from backend.benchmarks.fake_rapidapi import TITLE_WORDS, FakeRapidAPI
+except ImportError:
+    from benchmarks.common import compare, environment, load_results, report_regressions, save_results, summarize_latencies
+    from benchmarks.fake_rapidapi import TITLE_WORDS, FakeRapidAPI
+
+# Share of requests per endpoint in the default traffic mix
+DEFAULT_MIX = "discover=35,recommendations=20,search=30,watchlist=15"
+
+# Streaming service source ids users pick from when they register
+USER_SERVICES = ["203", "26", "372", "157", "387", "444"]
+USER_GENRES = ["Action", "Comedy", "Drama", "Thriller", "Family", "Horror"]
+
+REQUEST_TIMEOUT = 30
+MOCK_MONGO_URI = "mongodb://localhost:27017/media_recommender_benchmark"
+
+
+class VirtualUser:
+    def __init__(self, email, token):
+        self.email = email
+        self.token = token
+        self.content_ids = []   # ids seen in responses, used for watchlist adds
+
+    def remember(self, content_id):
+        if content_id and len(self.content_ids) < 200:
+            self.content_ids.append(content_id)
+
+
+class Client:
+    """Minimal HTTP client; each worker thread has its own."""
+
+    def __init__(self, base_url):
+        url = urlparse(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+
+    def request(self, method, path, token=None, body=None):
+        headers = {"Connection": "close"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        data = None
+        if body is not None:
+            data = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+            return response.status, payload
+        finally:
+            conn.close()
+
+
+def _json(payload):
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+# Endpoint operations: each makes one request and returns its status code
+
+def op_discover(client, user, rng):
+    status, payload = client.request("GET", "/api/discover/next", user.token)
+    if status == 200:
+        item = _json(payload)
+        if isinstance(item, dict):
+            user.remember(item.get("id"))
+    return status
+
+
+def op_recommendations(client, user, rng):
+    status, _ = client.request("GET", "/api/recommendations", user.token)
+    return status
+
+
+def op_search(client, user, rng):
+    query = rng.choice(TITLE_WORDS) if rng.random() < 0.7 else f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)}"
+    status, payload = client.request("GET", f"/api/search?query={quote(query)}", user.token)
+    if status == 200:
+        results = _json(payload)
+        if isinstance(results, list) and results:
+            user.remember(rng.choice(results).get("id"))
+    return status
+
+
+def op_watchlist(client, user, rng):
+    # Half adds, half reads once the user has seen some content
+    if user.content_ids and rng.random() < 0.5:
+        status, _ = client.request("POST", "/api/watchlist", user.token, {"content_id": rng.choice(user.content_ids)})
+    else:
+        status, _ = client.request("GET", "/api/watchlist", user.token)
+    return status
+
+
+OPERATIONS = {
+    "discover": op_discover,
+    "recommendations": op_recommendations,
+    "search": op_search,
+    "watchlist": op_watchlist
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown endpoint '{name}' in --mix (expected one of {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _copy_mongomock_projections(mongomock):
+    """
+    mongomock edits projection dicts in place while applying them. pymongo doesn't, so the app
+    reuses module-level projections across threads, which makes concurrent mongomock finds
+    return _id or fail; give mongomock its own copy instead.
+    """
+    find = mongomock.collection.Collection.find
+
+    def find_with_copied_projection(self, filter=None, projection=None, *args, **kwargs):
+        if isinstance(projection, dict):
+            projection = dict(projection)
+        if isinstance(kwargs.get("projection"), dict):
+            kwargs["projection"] = dict(kwargs["projection"])
+        return find(self, filter, projection, *args, **kwargs)
+
+    mongomock.collection.Collection.find = find_with_copied_projection
+
+
+def start_local_app(args):
+    """Start the fake upstream and the app in this process; returns (base_url, fake, server)."""
+    options = dict(
+        latency_ms=args.upstream_latency_ms, jitter_ms=args.upstream_jitter_ms,
+        error_rate=args.upstream_error_rate, seed=args.seed
+    )
+    fake = FakeRapidAPI.from_fixtures_file(args.fixtures, **options) if args.fixtures else FakeRapidAPI(**options)
+    upstream_url = fake.start()
+
+    # Configuration has to be in place before config.py is imported
+    os.environ["RAPIDAPI_BASE_URL"] = upstream_url
+    os.environ["BCRYPT_ROUNDS"] = "4"
+    os.environ["TRACE_SAMPLE_RATE"] = "0"
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+        os.environ.setdefault("MONGO_TLS", "false")
+
+    from utils import database
+    if not args.mongo_uri:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("mongomock is not installed; install it or pass --mongo-uri for a local MongoDB")
+        _copy_mongomock_projections(mongomock)
+        database.connection.factory = lambda: mongomock.MongoClient(MOCK_MONGO_URI)
+
+    from werkzeug.serving import make_server
+    import app as app_module
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="load-test-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", fake, server
+
+
+def register_users(base_url, count, seed):
+    """Register virtual users one at a time (the bcrypt pool rejects bursts)."""
+    rng = random.Random(seed)
+    client = Client(base_url)
+    run_id = uuid.uuid4().hex[:8]
+    users = []
+    for i in range(count):
+        email = f"loadtest-{run_id}-{i}@example.com"
+        body = {
+            "email": email,
+            "password": "load-test-password",
+            "streaming_services": rng.sample(USER_SERVICES, rng.randint(1, 3)),
+            "preferences": {"genres": rng.sample(USER_GENRES, 2)}
+        }
+        for _ in range(5):
+            status, payload = client.request("POST", "/api/register", body=body)
+            if status != 503:
+                break
+            time.sleep(0.5)
+        data = _json(payload) or {}
+        if status != 201 or "token" not in data:
+            sys.exit(f"Registering {email} failed with status {status}: {payload[:200]!r}")
+        users.append(VirtualUser(email, data["token"]))
+    return users
+
+
+def run_workers(base_url, users, mix, concurrency, warmup, duration, seed):
+    """Drive traffic from `concurrency` threads; returns per-endpoint samples and the measured time."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = [dict((name, {"latencies": [], "statuses": {}}) for name in names) for _ in range(concurrency)]
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = Client(base_url)
+        own = samples[index]
+        while True:
+            request_started = time.perf_counter()
+            if request_started >= deadline:
+                return
+            name = rng.choices(names, weights)[0]
+            try:
+                status = OPERATIONS[name](client, rng.choice(users), rng)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed_ms = (time.perf_counter() - request_started) * 1000
+            if request_started >= measure_from:
+                own[name]["latencies"].append(elapsed_ms)
+                own[name]["statuses"][status] = own[name]["statuses"].get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"load-test-{i}") for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merged = {name: {"latencies": [], "statuses": {}} for name in names}
+    for own in samples:
+        for name, sample in own.items():
+            merged[name]["latencies"].extend(sample["latencies"])
+            for status, count in sample["statuses"].items():
+                merged[name]["statuses"][status] = merged[name]["statuses"].get(status, 0) + count
+    measured = max(time.perf_counter() - measure_from, 1e-9)
+    return merged, measured
+
+
+def _is_error(status):
+    # Exceptions are recorded by name; any 5xx counts as an error, 4xx are expected answers
+    return not isinstance(status, int) or status >= 500
+
+
+def build_results(merged, measured, args, mix, upstream_stats):
+    endpoints = {}
+    all_latencies = []
+    total_errors = 0
+    for name, sample in merged.items():
+        latencies = sample["latencies"]
+        errors = sum(count for status, count in sample["statuses"].items() if _is_error(status))
+        total_errors += errors
+        all_latencies.extend(latencies)
+        endpoints[name] = {
+            **summarize_latencies(latencies),
+            "throughput_rps": round(len(latencies) / measured, 2),
+            "errors": errors,
+            "statuses": {str(status): count for status, count in sorted(sample["statuses"].items(), key=str)}
+        }
+    total = len(all_latencies)
+    return {
+        "benchmark": "load_test",
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "users": args.users,
+            "mix": mix,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "upstream_error_rate": args.upstream_error_rate,
+            "mongo": args.mongo_uri and "mongodb" or ("server's own" if args.target else "mongomock"),
+            "target": args.target or "in-process"
+        },
+        "environment": environment(),
+        "overall": {
+            **summarize_latencies(all_latencies),
+            "requests": total,
+            "errors": total_errors,
+            "error_rate": round(total_errors / total, 4) if total else 0.0,
+            "throughput_rps": round(total / measured, 2)
+        },
+        "endpoints": endpoints,
+        "upstream": upstream_stats
+    }
+
+
+def regression_checks(results):
+    checks = [
+        ("overall throughput (req/s)", ("overall", "throughput_rps"), "higher"),
+        ("overall p95 (ms)", ("overall", "p95_ms"), "lower"),
+        ("overall p99 (ms)", ("overall", "p99_ms"), "lower")
+    ]
+    for name in results["endpoints"]:
+        checks.append((f"{name} p50 (ms)", ("endpoints", name, "p50_ms"), "lower"))
+        checks.append((f"{name} p95 (ms)", ("endpoints", name, "p95_ms"), "lower"))
+    return checks
+
+
+def print_results(results):
+    overall = results["overall"]
+    print(f"\n{overall['requests']} requests in {results['config']['duration_s']}s "
+          f"({overall['throughput_rps']} req/s), {overall['errors']} errors")
+    print(f"{'endpoint':<16}{'requests':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    rows = list(results["endpoints"].items()) + [("overall", overall)]
+    for name, row in rows:
+        print(f"{name:<16}{row['count']:>10}{row['throughput_rps']:>9}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}{row['errors']:>8}")
+    if results["upstream"]:
+        print(f"Upstream calls: {results['upstream']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend against a local RapidAPI stand-in")
+    parser.add_argument("--duration", type=float, default=20, help="Measured seconds of traffic")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of traffic before measuring")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--users", type=int, default=20, help="Virtual users to register")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Traffic weights per endpoint (default {DEFAULT_MIX})")
+    parser.add_argument("--upstream-latency-ms", type=float, default=100.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=30.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--fixtures", help="Recorded RapidAPI responses for the stand-in to replay")
+    parser.add_argument("--mongo-uri", help="Use this MongoDB instead of mongomock")
+    parser.add_argument("--target", help="Base URL of an already running server to test instead")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Results file to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression as a fraction (default 0.2)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's own output during the run")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    fake = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        base_url, fake, _ = start_local_app(args)
+    print(f"Testing {base_url} with {args.concurrency} clients for {args.duration}s (+{args.warmup}s warm-up)")
+
+    # The app prints diagnostics for most requests; keep them out of the report unless asked
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    with (contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext()):
+        users = register_users(base_url, args.users, args.seed)
+        merged, measured = run_workers(base_url, users, mix, args.concurrency, args.warmup, args.duration, args.seed)
+    if quiet:
+        quiet.close()
+
+    results = build_results(merged, measured, args, mix, fake.stats() if fake else {})
+    print_results(results)
+    if args.output:
+        save_results(args.output, results)
+
+    exit_code = 0
+    if args.baseline:
+        regressions = compare(results, load_results(args.baseline), regression_checks(results), args.tolerance)
+        exit_code = report_regressions(regressions)
+    if fake:
+        fake.stop()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
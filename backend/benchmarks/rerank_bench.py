@@ -0,0 +1,147 @@
+"""
+Darick Le
+October 19 2026
+Benchmark for merging and diversity reranking recommendation candidates.
+Builds ranked search result lists like the ones fetch_ranked_results returns for a user's
+services (movies and shows per service, with titles shared between services), then times
+merging them without duplicates and picking the top 20 with MMR (utils.diversity) for 100,
+300 and 1000 candidates:
+    merge           merge_ranked_lists on imdbId alone
+    merge_rerank    merging plus the vectorized MMR rerank, what the routes run
+    python_mmr      the same MMR written as a plain Python loop over genre sets, for reference
+
+Run from the backend directory:
+    python -m benchmarks.rerank_bench --output benchmarks/results/rerank.json
+    python -m benchmarks.rerank_bench --baseline benchmarks/results/rerank.json
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+
+try:
+    from backend.benchmarks.common import compare, environment, load_results, report_regressions, save_results
+    from backend.benchmarks.fake_rapidapi import synthetic_item
+    from backend.utils import diversity
+    from backend.utils.trending import merge_ranked_lists
+except ImportError:
+    from benchmarks.common import compare, environment, load_results, report_regressions, save_results
+    from benchmarks.fake_rapidapi import synthetic_item
+    from utils import diversity
+    from utils.trending import merge_ranked_lists
+
+DEFAULT_SIZES = "100,300,1000"
+LISTS = 6  # Three services, movies and shows
+TOP = 20
+DIVERSITY = 0.3
+MIN_RUN_SECONDS = 0.1
+
+
+def ranked_lists(candidates, seed=3):
+    """LISTS ranked lists holding about `candidates` distinct titles, a fifth of them on two lists."""
+    rng = random.Random(seed)
+    per_list = math.ceil(candidates * 1.2 / LISTS)
+    pool = [synthetic_item(index, "movie" if index % 2 else "series") for index in range(candidates)]
+    lists = [pool[i::LISTS] for i in range(LISTS)]
+    for items in lists:
+        items.extend(rng.sample(pool, per_list - len(items)))
+        rng.shuffle(items)
+    return lists
+
+
+def python_mmr(items, limit, diversity_weight):
+    """MMR with set-based cosine similarity, one candidate at a time."""
+    features = [set(diversity.item_genres(item)) | {"type:" + diversity.item_type(item)} for item in items]
+    n = len(items)
+    relevance = [1.0 - i / n for i in range(n)]
+    chosen = []
+    max_similarity = [0.0] * n
+    available = set(range(n))
+    for _ in range(min(limit, n)):
+        pick = max(available, key=lambda i: (1 - diversity_weight) * relevance[i] - diversity_weight * max_similarity[i])
+        chosen.append(pick)
+        available.discard(pick)
+        for i in available:
+            shared = len(features[i] & features[pick])
+            similarity = shared / math.sqrt(len(features[i]) * len(features[pick]))
+            if similarity > max_similarity[i]:
+                max_similarity[i] = similarity
+    return [items[i] for i in chosen]
+
+
+def time_call(call, repeat):
+    started = time.perf_counter()
+    call()
+    calls = max(1, int(MIN_RUN_SECONDS / max(time.perf_counter() - started, 1e-7)))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            call()
+        timings.append((time.perf_counter() - started) / calls * 1000)
+    timings.sort()
+    return {"min": round(timings[0], 4), "median": round(timings[len(timings) // 2], 4), "calls_per_repeat": calls}
+
+
+def run(sizes, repeat):
+    results = {}
+    for size in sizes:
+        lists = ranked_lists(size)
+        candidates = merge_ranked_lists(lists, key="imdbId")
+        preferred = ["Action", "Comedy"]
+
+        def merge():
+            return merge_ranked_lists(lists, key="imdbId")
+
+        def merge_rerank():
+            return diversity.rerank(merge(), TOP, preferred_genres=preferred, diversity=DIVERSITY)
+
+        def reference():
+            return python_mmr(merge(), TOP, DIVERSITY)
+
+        row = {name: time_call(call, repeat) for name, call in (("merge", merge), ("merge_rerank", merge_rerank), ("python_mmr", reference))}
+        row["candidates"] = len(candidates)
+        top = merge_rerank()
+        row["distinct_genre_sets_in_top"] = len({tuple(sorted(diversity.item_genres(item))) for item in top})
+        row["movies_in_top"] = sum(1 for item in top if diversity.item_type(item) == "movie")
+        results[str(size)] = row
+        print(f"{row['candidates']} candidates from {LISTS} lists:")
+        for name in ("merge", "merge_rerank", "python_mmr"):
+            print(f"  {name:<14}{row[name]['median']:>10.3f} ms")
+        print(f"  top {TOP}: {row['distinct_genre_sets_in_top']} distinct genre sets, {row['movies_in_top']} movies")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merging and diversity reranking of candidates")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated candidate counts (default {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Results file to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = {
+        "benchmark": "rerank",
+        "config": {"sizes": sizes, "repeat": args.repeat, "lists": LISTS, "top": TOP, "diversity": DIVERSITY},
+        "environment": environment(),
+        "sizes": run(sizes, args.repeat)
+    }
+    if args.output:
+        save_results(args.output, results)
+
+    exit_code = 0
+    if args.baseline:
+        checks = [
+            (f"{size} candidates merge_rerank median (ms)", ("sizes", size, "merge_rerank", "median"), "lower", 0.01)
+            for size in results["sizes"]
+        ]
+        exit_code = report_regressions(compare(results, load_results(args.baseline), checks, args.tolerance))
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+Darick Le
+October 19 2026
+WSGI module for load testing the production server without MongoDB: the app from wsgi.py
+with its database swapped for mongomock, to be served by gunicorn and driven by load_test.py.
+Each worker process gets its own in-memory database, so only single-worker runs give
+meaningful results (users registered through one worker don't exist in the others).
+
+Run from the backend directory:
+    python -m benchmarks.fake_rapidapi --port 8765 --latency-ms 100 &
+    RAPIDAPI_BASE_URL=http://127.0.0.1:8765 BCRYPT_ROUNDS=4 TRACE_SAMPLE_RATE=0 GUNICORN_WORKERS=1 \
+        gunicorn -c gunicorn.conf.py benchmarks.serve_mock:application
+    python -m benchmarks.load_test --target http://127.0.0.1:5000
+"""
+
+import mongomock
+
+try:
+    from backend.benchmarks.load_test import MOCK_MONGO_URI, _copy_mongomock_projections
+    from backend.utils import database
+except ImportError:
+    from benchmarks.load_test import MOCK_MONGO_URI, _copy_mongomock_projections
+    from utils import database
+
+_copy_mongomock_projections(mongomock)
+# One client for the whole process, so the data survives reset_after_fork() in the worker
+_client = mongomock.MongoClient(MOCK_MONGO_URI)
+database.connection.factory = lambda: _client
+
+from wsgi import application, init_worker, preload, shutdown_worker  # noqa: E402,F401
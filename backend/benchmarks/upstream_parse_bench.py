@@ -0,0 +1,113 @@
+"""
+Darick Le
+October 19 2026
+Parsing benchmark for RapidAPI responses.
+Compares the previous path (decode the body to a str, then json.loads the whole document)
+with utils.upstream (parse the bytes and keep compact records) on /search/basic pages built by
+the RapidAPI stand-in. Records the median parse time, the tracemalloc peak while parsing and
+the memory still held by the parsed result.
+
+Run from the backend directory:
+    python -m benchmarks.upstream_parse_bench --output benchmarks/results/upstream_parse.json
+    python -m benchmarks.upstream_parse_bench --baseline benchmarks/results/upstream_parse.json
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    from backend.benchmarks.common import compare, environment, load_results, report_regressions, save_results
+    from backend.benchmarks.fake_rapidapi import synthetic_item
+    from backend.utils import upstream
+except ImportError:
+    from benchmarks.common import compare, environment, load_results, report_regressions, save_results
+    from benchmarks.fake_rapidapi import synthetic_item
+    from utils import upstream
+
+DEFAULT_SIZES = "25,100,500"
+MIN_RUN_SECONDS = 0.1
+PATH = "/search/basic?country=us&service=netflix&type=movie&page=1"
+
+
+def search_page(items):
+    return json.dumps({"results": [synthetic_item(i * 7919 % 50000) for i in range(items)], "total_pages": 20}).encode("utf-8")
+
+
+def full_parse(body):
+    return json.loads(body.decode("utf-8"))
+
+
+def selective_parse(body):
+    return upstream.parse(body, PATH)
+
+
+def measure(parse, body, repeat):
+    started = time.perf_counter()
+    parse(body)
+    calls = max(1, int(MIN_RUN_SECONDS / max(time.perf_counter() - started, 1e-7)))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            parse(body)
+        timings.append((time.perf_counter() - started) / calls * 1000)
+    timings.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = parse(body)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "median_ms": round(timings[len(timings) // 2], 4),
+        "alloc_peak_kb": round((peak - before) / 1024, 1),
+        "retained_kb": round((retained - before) / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing of RapidAPI search pages")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated titles per page (default {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Results file to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {
+        "benchmark": "upstream_parse",
+        "config": {"sizes": args.sizes, "repeat": args.repeat, "parser": "orjson" if upstream.orjson else "json"},
+        "environment": environment(),
+        "sizes": {}
+    }
+    print(f"{'':<22}{'median':>12}{'alloc peak':>14}{'retained':>12}")
+    for size in [int(size) for size in args.sizes.split(",") if size.strip()]:
+        body = search_page(size)
+        row = {"bytes": len(body)}
+        print(f"{size} titles ({len(body) // 1024} KB):")
+        for name, parse in (("full_parse", full_parse), ("selective_parse", selective_parse)):
+            row[name] = measure(parse, body, args.repeat)
+            figures = row[name]
+            print(f"  {name:<20}{figures['median_ms']:>9.3f} ms{figures['alloc_peak_kb']:>11.0f} KB{figures['retained_kb']:>9.0f} KB")
+        results["sizes"][str(size)] = row
+    if args.output:
+        save_results(args.output, results)
+
+    exit_code = 0
+    if args.baseline:
+        checks = []
+        for size in results["sizes"]:
+            checks.append((f"{size} titles median (ms)", ("sizes", size, "selective_parse", "median_ms"), "lower", 0.05))
+            checks.append((f"{size} titles alloc peak (KB)", ("sizes", size, "selective_parse", "alloc_peak_kb"), "lower", 64))
+        exit_code = report_regressions(compare(results, load_results(args.baseline), checks, args.tolerance))
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
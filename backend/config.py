@@ -14,10 +14,20 @@ load_dotenv()
 # Database configuration
 MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/media_recommender')
 MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'media_recommender')
+MONGO_TLS = os.environ.get('MONGO_TLS', 'true').lower() == 'true'
+MONGO_APP_NAME = os.environ.get('MONGO_APP_NAME', 'media-recommender-api')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 20))  # Connections per worker process
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000))  # Close pooled connections idle for a minute
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 2000))  # Give up waiting for a pooled connection
+MONGO_CACHE_READ_PREFERENCE = os.environ.get('MONGO_CACHE_READ_PREFERENCE', 'secondaryPreferred')  # For catalog, trending, shelf and search cache reads
+MONGO_CACHE_WRITE_CONCERN = os.environ.get('MONGO_CACHE_WRITE_CONCERN', '1')  # For cache upserts ('0', '1' or 'majority')
 
 # API configuration
 RAPIDAPI_KEY = os.environ.get('RAPIDAPI_KEY', '995e2c999cmsh5914690d2b1359ep10b499jsn0f6ec0e74ced')
 RAPIDAPI_HOST = os.environ.get('RAPIDAPI_HOST', 'streaming-availability.p.rapidapi.com')
+RAPIDAPI_BASE_URL = os.environ.get('RAPIDAPI_BASE_URL', f'https://{RAPIDAPI_HOST}')  # Point at a local stand-in (http://...) for benchmarks
+UPSTREAM_TRACK_ALLOCATIONS = os.environ.get('UPSTREAM_TRACK_ALLOCATIONS', 'false').lower() == 'true'  # tracemalloc peak per parsed response (diagnostics only, slows every allocation)
 
 # Recommendation system configuration
 CONTENT_RECOMMENDER_WEIGHT = float(os.environ.get('CONTENT_RECOMMENDER_WEIGHT', 0.5))
@@ -28,4 +38,104 @@ DEFAULT_RECOMMENDATION_LIMIT = int(os.environ.get('DEFAULT_RECOMMENDATION_LIMIT'
 DATA_REFRESH_INTERVAL = int(os.environ.get('DATA_REFRESH_INTERVAL', 86400))  # 24 hours in seconds
 
 # JWT configuration
-JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'default-secret-key')
\ No newline at end of file
+JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'default-secret-key')
+
+# Request deadline configuration
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', 6.0))  # Overall budget per API request
+UPSTREAM_MIN_ATTEMPT_SECONDS = float(os.environ.get('UPSTREAM_MIN_ATTEMPT_SECONDS', 1.0))  # Skip upstream attempts with less time left
+
+# Search configuration
+SEARCH_RESULT_LIMIT = int(os.environ.get('SEARCH_RESULT_LIMIT', 20))
+SEARCH_LOCAL_MIN_RESULTS = int(os.environ.get('SEARCH_LOCAL_MIN_RESULTS', 3))  # Go upstream when the local index has fewer hits
+AUTOCOMPLETE_LIMIT = int(os.environ.get('AUTOCOMPLETE_LIMIT', 8))
+SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 3600))  # 1 hour in seconds
+SEARCH_CACHE_NEGATIVE_TTL = int(os.environ.get('SEARCH_CACHE_NEGATIVE_TTL', 300))  # Empty results expire after 5 minutes
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 1000))
+
+# User profile cache configuration
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))  # Seconds a cached profile stays valid
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+
+# Interaction history configuration
+SEEN_FILTER_TTL = int(os.environ.get('SEEN_FILTER_TTL', 300))  # Seconds a user's seen-content filter stays in memory
+
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))  # Changing this re-hashes passwords on next login
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 16))  # Queued operations before answering 503
+PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 2))  # Retry-After seconds on 503
+
+# Trending configuration
+TRENDING_REFRESH_INTERVAL = int(os.environ.get('TRENDING_REFRESH_INTERVAL', 21600))  # 6 hours in seconds
+TRENDING_RETRY_INTERVAL = int(os.environ.get('TRENDING_RETRY_INTERVAL', 300))  # Seconds before a list that failed to refresh is tried again
+TRENDING_ITEMS_PER_LIST = int(os.environ.get('TRENDING_ITEMS_PER_LIST', 20))  # Items kept per service and content type
+TRENDING_LIMIT = int(os.environ.get('TRENDING_LIMIT', 10))  # Items returned by /api/trending
+
+# Discover shelf configuration
+SHELF_REFRESH_INTERVAL = int(os.environ.get('SHELF_REFRESH_INTERVAL', 43200))  # 12 hours in seconds
+SHELF_REFRESH_TICK = int(os.environ.get('SHELF_REFRESH_TICK', 60))  # Seconds between incremental refresh batches
+SHELF_REFRESH_BATCH = int(os.environ.get('SHELF_REFRESH_BATCH', 4))  # Shelves refreshed per batch
+SHELF_ITEMS_PER_SHELF = int(os.environ.get('SHELF_ITEMS_PER_SHELF', 50))
+SHELF_PAGE_SIZE = int(os.environ.get('SHELF_PAGE_SIZE', 20))
+
+# Catalog storage configuration
+CATALOG_COMPACT_STORAGE = os.environ.get('CATALOG_COMPACT_STORAGE', 'false').lower() == 'true'  # Short field names and a service bitmask; run 'python -m utils.catalog recode' after changing
+
+# Tracing and profiling configuration
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.01))  # Fraction of requests traced
+TRACE_FILE = os.environ.get('TRACE_FILE', 'logs/traces.jsonl')
+TRACE_MAX_BYTES = int(os.environ.get('TRACE_MAX_BYTES', 10 * 1024 * 1024))  # Rotate the trace file at 10 MB
+TRACE_BACKUP_COUNT = int(os.environ.get('TRACE_BACKUP_COUNT', 5))
+TRACE_DEBUG_TOKEN = os.environ.get('TRACE_DEBUG_TOKEN', '')  # Sent as X-Debug-Token to force traces or cProfile; empty disables
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'logs/profiles')
+
+# JSON response configuration
+JSON_STREAM_MIN_ITEMS = int(os.environ.get('JSON_STREAM_MIN_ITEMS', 1000))  # Lists this long are encoded in chunks while sending; 0 disables
+JSON_STREAM_CHUNK_ITEMS = int(os.environ.get('JSON_STREAM_CHUNK_ITEMS', 200))
+
+# Content details configuration
+CONTENT_BATCH_MAX_IDS = int(os.environ.get('CONTENT_BATCH_MAX_IDS', 50))  # Ids accepted by POST /api/content/batch
+CONTENT_BATCH_CONCURRENCY = int(os.environ.get('CONTENT_BATCH_CONCURRENCY', 4))  # Upstream calls in flight per worker process for batch details and multi-service searches
+MAX_SEARCH_FANOUT = int(os.environ.get('MAX_SEARCH_FANOUT', 8))  # Upstream searches one cold recommendations or categories request may start
+CONTENT_DETAILS_MAX_AGE = int(os.environ.get('CONTENT_DETAILS_MAX_AGE', 86400))  # Sources older than this are served stale and revalidated
+CONTENT_DETAILS_MAX_STALE = int(os.environ.get('CONTENT_DETAILS_MAX_STALE', 7 * 86400))  # Older than this, details are refetched before serving
+REVALIDATION_BUDGET_PER_HOUR = int(os.environ.get('REVALIDATION_BUDGET_PER_HOUR', 120))  # Upstream calls per worker process for background revalidation; 0 disables
+REVALIDATION_BURST = int(os.environ.get('REVALIDATION_BURST', 10))  # Most calls spent in one pass
+REVALIDATION_TICK = int(os.environ.get('REVALIDATION_TICK', 60))  # Seconds between revalidation passes
+
+# Response cache configuration
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))  # Serialized bodies plus compressed variants
+RESPONSE_CACHE_MIN_COMPRESS_BYTES = int(os.environ.get('RESPONSE_CACHE_MIN_COMPRESS_BYTES', 512))  # Smaller bodies are only sent uncompressed
+RESPONSE_GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', 6))
+RESPONSE_BROTLI_QUALITY = int(os.environ.get('RESPONSE_BROTLI_QUALITY', 5))  # Used when the brotli package is installed
+STREAMING_SERVICES_MAX_AGE = int(os.environ.get('STREAMING_SERVICES_MAX_AGE', 86400))  # Cache-Control max-age for the static service list
+TRENDING_RESPONSE_MAX_AGE = int(os.environ.get('TRENDING_RESPONSE_MAX_AGE', 300))  # Seconds clients may reuse a trending list
+CONTENT_RESPONSE_TTL = int(os.environ.get('CONTENT_RESPONSE_TTL', 600))  # Seconds cached content details are served from the response cache
+CONTENT_RESPONSE_MAX_AGE = int(os.environ.get('CONTENT_RESPONSE_MAX_AGE', 60))
+
+# Cross-worker invalidation configuration
+INVALIDATION_MODE = os.environ.get('INVALIDATION_MODE', 'auto')  # 'auto', 'change_stream' (needs a replica set), 'polling' or 'off'
+INVALIDATION_POLL_INTERVAL = float(os.environ.get('INVALIDATION_POLL_INTERVAL', 1.0))  # Seconds between outbox polls in polling mode
+INVALIDATION_OUTBOX_TTL = int(os.environ.get('INVALIDATION_OUTBOX_TTL', 3600))  # Seconds outbox entries are kept
+
+# Production serving configuration (gunicorn.conf.py)
+GUNICORN_BIND = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', (os.cpu_count() or 1) * 2 + 1))  # Worker processes
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))  # Request threads per worker; requests mostly wait on RapidAPI and MongoDB
+GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', 30))  # Workers silent for longer are restarted
+GUNICORN_GRACEFUL_TIMEOUT = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))  # Time to finish in-flight requests on reload or shutdown
+GUNICORN_KEEPALIVE = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+GUNICORN_MAX_REQUESTS = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))  # Recycle a worker after this many requests; 0 disables
+GUNICORN_PRELOAD = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'  # Import the app and load shared data once, before forking
+GUNICORN_PIDFILE = os.environ.get('GUNICORN_PIDFILE', 'logs/gunicorn.pid')
+
+# Rating aggregate configuration
+RATING_PRIOR_WEIGHT = float(os.environ.get('RATING_PRIOR_WEIGHT', 10))  # Ratings' worth of the prior mean in each title's Bayesian score
+RATING_PRIOR_MEAN = float(os.environ.get('RATING_PRIOR_MEAN', 3.0))  # Prior mean until there are enough ratings to use the global mean
+RATING_CACHE_TTL = int(os.environ.get('RATING_CACHE_TTL', 300))  # Seconds rating summaries and the global mean are kept in memory
+
+# Recommendation merging and diversity reranking
+RERANK_DIVERSITY = float(os.environ.get('RERANK_DIVERSITY', 0.3))  # 0 ranks on relevance alone; higher values favor titles unlike those already picked
+RERANK_GENRE_WEIGHT = float(os.environ.get('RERANK_GENRE_WEIGHT', 0.3))  # Relevance weight of the user's preferred genres
+RERANK_RATING_WEIGHT = float(os.environ.get('RERANK_RATING_WEIGHT', 0.2))  # Relevance weight of users' Bayesian rating scores
+RECOMMENDATION_CANDIDATES = int(os.environ.get('RECOMMENDATION_CANDIDATES', 100))  # Cached titles the 20 recommendations are picked from
@@ -0,0 +1,55 @@
+"""
+Darick Le
+October 19 2026
+Gunicorn settings for production serving; values come from config.py (environment variables).
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Workers use the gthread worker class: GUNICORN_WORKERS processes, each serving
+GUNICORN_THREADS requests at a time, since most of a request is spent waiting on RapidAPI and
+MongoDB. Reloading without dropping requests:
+    kill -HUP <master pid>     new workers with the current settings; old workers finish their
+                               requests first (with preloading, the code is not re-imported)
+    kill -USR2 <master pid>    start a second master running the new code next to the old one;
+                               then kill -TERM the old master once the new one is serving
+The master's pid is written to GUNICORN_PIDFILE (the old master's to <pidfile>.2 during USR2).
+"""
+
+import os
+
+# Not imported as `config`, which gunicorn would read as its own config file setting
+import config as settings
+
+bind = settings.GUNICORN_BIND
+workers = settings.GUNICORN_WORKERS
+worker_class = "gthread"
+threads = settings.GUNICORN_THREADS
+timeout = settings.GUNICORN_TIMEOUT
+graceful_timeout = settings.GUNICORN_GRACEFUL_TIMEOUT
+keepalive = settings.GUNICORN_KEEPALIVE
+max_requests = settings.GUNICORN_MAX_REQUESTS
+max_requests_jitter = settings.GUNICORN_MAX_REQUESTS // 10
+preload_app = settings.GUNICORN_PRELOAD
+pidfile = settings.GUNICORN_PIDFILE
+accesslog = "-"
+
+if os.path.dirname(pidfile):
+    os.makedirs(os.path.dirname(pidfile), exist_ok=True)
+
+
+def when_ready(server):
+    # With preload_app the master has already imported the app; load shared data before forking
+    if preload_app:
+        import wsgi
+        wsgi.preload()
+
+
+def post_fork(server, worker):
+    import wsgi
+    wsgi.init_worker()
+    server.log.info(f"Worker {worker.pid} initialized")
+
+
+def worker_exit(server, worker):
+    import wsgi
+    wsgi.shutdown_worker()
@@ -0,0 +1,69 @@
+"""
+Darick Le
+October 19 2026
+Shared test fixtures. Tests run from the backend directory with `python -m pytest`; MongoDB is
+replaced by mongomock and RapidAPI by the local stand-in from benchmarks.fake_rapidapi, so no
+server or API key is needed.
+"""
+
+import os
+
+import mongomock
+import pytest
+
+from benchmarks.fake_rapidapi import FakeRapidAPI
+
+# Configuration has to be in place before config.py is imported
+fake_rapidapi = FakeRapidAPI()
+os.environ["RAPIDAPI_BASE_URL"] = fake_rapidapi.start()
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["TRACE_SAMPLE_RATE"] = "0"
+os.environ["MONGO_TLS"] = "false"
+os.environ["JWT_SECRET_KEY"] = "test-secret-key-that-is-long-enough-for-hs256"
+
+from utils import database  # noqa: E402
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """Point the shared connection at a fresh in-memory database for one test."""
+    client = mongomock.MongoClient("mongodb://localhost:27017/media_recommender")
+    database.connection.reset()
+    monkeypatch.setattr(database.connection, "factory", lambda: client)
+    yield client
+    database.connection.reset()
+
+
+@pytest.fixture
+def mongo_db(mongo_client):
+    return mongo_client.get_database("media_recommender")
+
+
+@pytest.fixture
+def app_module(mongo_client):
+    """The app module with every in-process cache emptied, on a fresh database."""
+    import app as app_module
+
+    app_module.user_cache.clear()
+    app_module.interaction_store.clear()
+    app_module.rating_store.clear()
+    app_module.response_cache.clear()
+    app_module.search_cache._entries.clear()
+    app_module.content_index.clear()
+    app_module.content_index._built = False
+    # Indexes were created on the previous test's database
+    for store in (app_module.catalog, app_module.interaction_store, app_module.rating_store):
+        store._indexes_ready = False
+    return app_module
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def register(client, email="user@example.com", password="correct-horse", **fields):
+    """Register a user and return the Authorization header for them."""
+    response = client.post("/api/register", json=dict(fields, email=email, password=password))
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return {"Authorization": f"Bearer {response.get_json()['token']}"}
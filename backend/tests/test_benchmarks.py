@@ -0,0 +1,62 @@
+import json
+import urllib.request
+
+import pytest
+
+from benchmarks.common import compare, percentile, summarize_latencies
+from benchmarks.fake_rapidapi import FakeRapidAPI
+
+
+def test_percentiles_interpolate():
+    assert percentile([], 50) == 0.0
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    summary = summarize_latencies([3.0, 1.0, 2.0])
+    assert summary["count"] == 3 and summary["p50_ms"] == 2.0 and summary["max_ms"] == 3.0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"latency": {"p95_ms": 100.0}, "throughput": 50.0, "tiny": 0.001}
+    current = {"latency": {"p95_ms": 120.0}, "throughput": 48.0, "tiny": 0.01}
+    checks = [
+        ("p95", ("latency", "p95_ms"), "lower"),
+        ("rps", ("throughput",), "higher"),
+        ("tiny", ("tiny",), "lower", 0.01),
+        ("missing", ("nowhere",), "lower")
+    ]
+    assert [label for label, *_ in compare(current, baseline, checks, tolerance=0.15)] == ["p95"]
+    assert compare(current, baseline, checks, tolerance=0.25) == []
+
+
+def test_fake_rapidapi_is_deterministic_and_counts_calls():
+    fake = FakeRapidAPI(fixtures={"/get": [{"imdbId": "tt7777777", "title": "Recorded"}]})
+    base_url = fake.start()
+    try:
+        def get(path):
+            with urllib.request.urlopen(base_url + path) as response:
+                return json.load(response)
+
+        first = get("/search/basic?service=netflix&type=movie&page=1")
+        assert len(first["results"]) == 25
+        assert get("/search/basic?service=netflix&type=movie&page=1") == first
+        assert get("/get/movie/id/tt7777777")["title"] == "Recorded"
+        assert get("/get/series/id/tt0000042")["imdbId"] == "tt0000042"
+        assert fake.stats()["calls"] == {"/search/basic": 2, "/get": 2}
+    finally:
+        fake.stop()
+
+
+def test_data_processing_bench_runs_on_a_small_catalog():
+    data_processing_bench = pytest.importorskip("benchmarks.data_processing_bench")
+    assert data_processing_bench.parse_size("10k") == 10000
+    assert data_processing_bench.size_label(1000000) == "1m"
+
+    movies = data_processing_bench.generate_catalog(50, seed=1)
+    assert movies == data_processing_bench.generate_catalog(50, seed=1)
+    assert all(movie["genres"] for movie in movies)
+
+    results = data_processing_bench.run_size(200, seed=1, repeat=1, only={"preprocess_movie_data", "process_user_ratings"})
+    assert set(results) == {"_catalog", "preprocess_movie_data", "process_user_ratings"}
+    assert results["preprocess_movie_data"]["wall_ms"]["median"] > 0
+    checks = data_processing_bench.regression_checks({"sizes": {"200": results}})
+    assert [label for label, *_ in checks] == ["200 preprocess_movie_data median (ms)", "200 process_user_ratings median (ms)"]
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.catalog import Catalog
+from utils.catalog_codec import CatalogCodec
+from utils.streaming_services import SERVICE_MAPPING
+
+NETFLIX = "203"
+PRIME = "26"
+
+
+@pytest.fixture
+def catalog(mongo_db):
+    return Catalog(mongo_db.catalog, mongo_db.catalog_meta, codec=CatalogCodec(SERVICE_MAPPING))
+
+
+def details(content_id, **fields):
+    return dict({"id": content_id, "title": "Heat", "content_type": "movie", "cast": ["Al Pacino"], "sources": [{"source_id": NETFLIX}]}, **fields)
+
+
+def test_summaries_never_wipe_out_details(catalog):
+    catalog.upsert_details(details("tt1"))
+    catalog.upsert_summary({"id": "tt1", "title": "Heat (1995)", "cast": None}, service_id=PRIME)
+    stored = catalog.get_details("tt1")
+    assert stored["title"] == "Heat (1995)" and stored["cast"] == ["Al Pacino"] and stored["details_cached"]
+    assert stored["service_ids"] == [PRIME]
+    # Summary reads leave the detail-only fields out
+    assert "cast" not in catalog.get_summary("tt1") and "sources" not in catalog.get_summary("tt1")
+
+
+def test_service_ids_accumulate(catalog):
+    catalog.upsert_summaries([{"id": "tt1", "title": "Heat"}], service_id=NETFLIX)
+    catalog.upsert_summaries([{"id": "tt1", "title": "Heat"}, {"id": "tt2", "title": "Ronin"}], service_id=PRIME)
+    assert set(catalog.get_summary("tt1")["service_ids"]) == {NETFLIX, PRIME}
+    assert [item["id"] for item in catalog.find_for_services([NETFLIX])] == ["tt1"]
+    assert sorted(item["id"] for item in catalog.find_for_services([PRIME])) == ["tt1", "tt2"]
+
+
+def test_get_many_fetches_only_known_titles(catalog):
+    catalog.upsert_summaries([{"id": f"tt{index}", "title": f"Title {index}"} for index in range(3)])
+    assert sorted(catalog.get_many(["tt0", "tt2", "tt9"])) == ["tt0", "tt2"]
+    assert catalog.get_many([]) == {}
+
+
+def test_stale_details_are_listed_oldest_first(catalog):
+    now = datetime.utcnow()
+    catalog.upsert_details(details("tt1", details_refreshed_at=now - timedelta(days=2)))
+    catalog.upsert_details(details("tt2", details_refreshed_at=now - timedelta(days=5)))
+    catalog.upsert_details(details("tt3", details_refreshed_at=now))
+    catalog.upsert_summary({"id": "tt4", "title": "No details yet"})
+    assert [item["id"] for item in catalog.find_stale_details(now - timedelta(days=1))] == ["tt2", "tt1"]
+
+
+def test_migration_merges_the_legacy_collections(catalog, mongo_db):
+    mongo_db.content.insert_many([
+        {"id": "tt1", "title": "Old title", "year": 1995},
+        {"id": "tt2", "title": "Ronin"},
+        {"title": "No id"}
+    ])
+    mongo_db.content_cache.insert_many([
+        {"id": "tt1", "title": "Cached title", "service_ids": [NETFLIX]},
+        {"type": "last_update", "timestamp": datetime(2026, 10, 1)}
+    ])
+    mongo_db.content_details.insert_one({"id": "tt1", "title": "Heat", "cast": ["Al Pacino"]})
+
+    assert catalog.migrate(mongo_db) == {"content": 2, "content_cache": 1, "content_details": 1}
+    heat = catalog.get_details("tt1")
+    # The most detailed collection wins, fields only the others have are kept
+    assert heat["title"] == "Heat" and heat["year"] == 1995 and heat["cast"] == ["Al Pacino"]
+    assert heat["details_cached"] and heat["service_ids"] == [NETFLIX]
+    assert catalog.get_meta("last_update") == datetime(2026, 10, 1)
+
+    # Re-running is harmless, and drop removes the old collections
+    catalog.migrate(mongo_db, drop=True)
+    assert mongo_db.catalog.count_documents({}) == 2
+    assert not {"content", "content_cache", "content_details"} & set(mongo_db.list_collection_names())
+
+
+def test_search_documents_carry_the_indexed_fields(catalog):
+    catalog.upsert_details(details("tt1"))
+    assert list(catalog.search_documents()) == [{"id": "tt1", "title": "Heat", "content_type": "movie", "cast": ["Al Pacino"]}]
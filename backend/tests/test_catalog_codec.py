@@ -0,0 +1,100 @@
+from datetime import datetime
+
+import bson
+import pytest
+
+from utils.catalog import SUMMARY_PROJECTION, Catalog
+from utils.catalog_codec import FIELD_CODES, CatalogCodec, ServiceBitmask
+from utils.streaming_services import SERVICE_MAPPING
+
+NETFLIX = "203"
+PRIME = "26"
+
+
+def document():
+    return {
+        "id": "tt0113277",
+        "title": "Heat",
+        "year": 1995,
+        "content_type": "movie",
+        "runtime_minutes": 170,
+        "us_rating": "R",
+        "poster_url": "https://example.com/heat.jpg",
+        "plot_overview": "A group of professional bank robbers...",
+        "service_ids": [NETFLIX, PRIME],
+        "genre_names": ["Crime", "Thriller"],
+        "cast": ["Al Pacino", "Robert De Niro"],
+        "directors": ["Michael Mann"],
+        "sources": [
+            {"source_id": NETFLIX, "name": SERVICE_MAPPING[NETFLIX], "type": "sub", "web_url": "https://netflix.com/heat"},
+            {"source_id": PRIME, "name": SERVICE_MAPPING[PRIME], "type": "rent", "web_url": "https://amazon.com/heat"}
+        ],
+        "details_cached": True,
+        "details_refreshed_at": datetime(2026, 10, 19, 12)
+    }
+
+
+@pytest.fixture
+def codec():
+    return CatalogCodec(SERVICE_MAPPING, compact=True)
+
+
+def test_compact_documents_round_trip(codec):
+    stored = codec.encode(document())
+    assert set(stored) <= set(FIELD_CODES.values()) | {"id"}
+    assert stored["sm"] == codec.services.mask([NETFLIX, PRIME])
+    # Provider names are rebuilt from the source id, so they aren't stored
+    assert stored["src"][0] == {"s": NETFLIX, "ty": "sub", "u": "https://netflix.com/heat"}
+
+    decoded = codec.decode(stored)
+    expected = document()
+    assert sorted(decoded.pop("service_ids")) == sorted(expected.pop("service_ids"))
+    assert decoded == expected
+
+
+def test_compact_documents_are_smaller(codec):
+    assert len(bson.encode(codec.encode(document()))) < 0.85 * len(bson.encode(document()))
+
+
+def test_long_key_documents_pass_through(codec):
+    assert codec.decode(document())["sources"] == document()["sources"]
+    plain = CatalogCodec(SERVICE_MAPPING)
+    assert plain.encode(document()) == document() and plain.decode(document()) == document()
+
+
+def test_bitmask_follows_the_service_order():
+    services = ServiceBitmask({"1": "a", "2": "b", "3": "c"})
+    assert services.mask(["1", "3", "unknown"]) == 0b101
+    assert services.service_ids(0b110) == ["2", "3"]
+    assert services.mask(None) == 0
+
+
+def test_queries_and_projections_use_stored_keys(codec):
+    assert codec.encode_query({"content_type": "movie", "id": "tt1"}) == {"ct": "movie", "id": "tt1"}
+    assert codec.service_query([NETFLIX]) == {"sm": {"$bitsAnySet": codec.services.bit(NETFLIX)}}
+    assert codec.encode_query({"service_ids": NETFLIX}) == {"sm": {"$bitsAnySet": codec.services.bit(NETFLIX)}}
+    assert codec.encode_projection(SUMMARY_PROJECTION) == {"_id": 0, "c": 0, "d": 0, "src": 0, "dc": 0, "dr": 0}
+
+
+def test_summary_updates_set_service_bits(codec):
+    update = codec.summary_update({"id": "tt1", "title": "Heat", "year": None, "service_ids": [PRIME]}, service_id=NETFLIX)
+    assert update["$set"] == {"id": "tt1", "t": "Heat"}
+    assert update["$bit"] == {"sm": {"or": codec.services.mask([NETFLIX, PRIME])}}
+    assert "$addToSet" not in update
+
+
+def test_recode_converts_both_ways(mongo_db):
+    long_catalog = Catalog(mongo_db.catalog, codec=CatalogCodec(SERVICE_MAPPING))
+    long_catalog.upsert_summary({"id": "tt0113277", "title": "Heat", "service_ids": [NETFLIX, PRIME]})
+    long_catalog.upsert_details(document())
+
+    compact_catalog = Catalog(mongo_db.catalog, codec=CatalogCodec(SERVICE_MAPPING, compact=True))
+    assert compact_catalog.recode() == 1
+    stored = mongo_db.catalog.find_one()
+    assert "t" in stored and "title" not in stored
+    assert stored["sm"] == compact_catalog.codec.services.mask([NETFLIX, PRIME])
+    assert compact_catalog.get_details("tt0113277")["cast"] == document()["cast"]
+
+    assert long_catalog.recode() == 1
+    assert mongo_db.catalog.find_one({}, {"_id": 0})["title"] == "Heat"
+    assert sorted(long_catalog.get_details("tt0113277")["service_ids"]) == sorted([NETFLIX, PRIME])
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from conftest import fake_rapidapi, register
+
+
+def get_calls():
+    return fake_rapidapi.stats()["calls"].get("/get", 0)
+
+
+def test_batch_keeps_request_order_and_fetches_each_title_once(client, app_module):
+    headers = register(client)
+    before = get_calls()
+    response = client.post("/api/content/batch", json={"ids": ["tt0000011", "tt0000012", "tt0000011"]}, headers=headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.get_json()] == ["tt0000011", "tt0000012", "tt0000011"]
+    assert get_calls() - before == 2
+    assert app_module.catalog.get_details("tt0000012")["details_cached"]
+
+
+def test_stored_details_are_served_without_upstream_calls(client, app_module):
+    headers = register(client)
+    app_module.catalog.upsert_details({"id": "tt0000021", "title": "Stored", "content_type": "movie", "sources": [], "details_refreshed_at": datetime.utcnow()})
+    before = get_calls()
+    items = client.post("/api/content/batch", json={"ids": ["tt0000021"]}, headers=headers).get_json()
+    assert get_calls() == before
+    assert items[0]["title"] == "Stored"
+    assert items[0]["user_rating"]["count"] == 0
+
+
+def test_invalid_batches_are_rejected(client, app_module, monkeypatch):
+    headers = register(client)
+    assert client.post("/api/content/batch", json={"ids": "tt0000001"}, headers=headers).status_code == 400
+    assert client.post("/api/content/batch", json={"ids": ["tt0000001", ""]}, headers=headers).status_code == 400
+    monkeypatch.setattr(app_module.config, "CONTENT_BATCH_MAX_IDS", 2)
+    assert client.post("/api/content/batch", json={"ids": ["a", "b", "c"]}, headers=headers).status_code == 400
+
@@ -0,0 +1,27 @@
+import pytest
+from pymongo.errors import ConfigurationError
+
+import config
+from utils import database
+
+
+@pytest.mark.parametrize("tls", [False, True])
+def test_create_client_with_and_without_tls(monkeypatch, tls):
+    monkeypatch.setattr(config, "MONGO_URI", "mongodb://localhost:27017/media_recommender")
+    monkeypatch.setattr(config, "MONGO_TLS", tls)
+    try:
+        client = database.create_client()
+    except ConfigurationError as e:
+        pytest.fail(f"create_client() rejected its own options: {e}")
+    try:
+        assert client.options.pool_options.max_pool_size == config.MONGO_MAX_POOL_SIZE
+        assert (client.options.pool_options._ssl_context is not None) == tls
+    finally:
+        client.close()
+
+
+def test_lazy_connection_creates_one_client(mongo_client):
+    database.db.users.insert_one({"username": "a"})
+    assert database.db.users.count_documents({}) == 1
+    assert database.connection.client is mongo_client
+    assert database.connection.created >= 1
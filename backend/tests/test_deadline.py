@@ -0,0 +1,95 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import deadline
+
+
+@pytest.fixture
+def request_deadline():
+    """deadline.start for the test, finished afterwards even if the test fails."""
+    yield deadline.start
+    deadline.finish()
+
+
+def test_attempt_timeouts_are_clipped_to_the_budget(request_deadline):
+    assert deadline.attempt_timeout(8) == 8
+    request_deadline(3)
+    assert 2.5 < deadline.attempt_timeout(8) <= 3
+    assert deadline.attempt_timeout(1.5) == 1.5
+
+
+def test_no_attempt_or_retry_without_enough_budget(request_deadline, monkeypatch):
+    monkeypatch.setattr(deadline, "MIN_ATTEMPT_SECONDS", 1.0)
+    deadline.remaining_budget_histogram.reset()
+    request_deadline(0.5)
+    assert deadline.attempt_timeout(8) is None
+    assert not deadline.can_retry_after(2)
+    snapshot = deadline.remaining_budget_histogram.snapshot()
+    assert snapshot["skipped_upstream_calls"] == 1 and snapshot["skipped_retries"] == 1
+
+
+def test_finish_records_the_remaining_budget():
+    deadline.remaining_budget_histogram.reset()
+    deadline.start(5)
+    assert deadline.current() is not None
+    finished = deadline.finish()
+    assert deadline.current() is None
+    snapshot = deadline.remaining_budget_histogram.snapshot()
+    assert snapshot["count"] == 1 and snapshot["buckets"]["5.0"] == 1
+    assert 4.5 < finished.remaining() <= 5
+    assert deadline.finish() is None
+
+
+def test_worker_threads_inherit_the_deadline(request_deadline):
+    started = request_deadline(4)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # The app submits upstream calls with the request's context
+        inherited = pool.submit(contextvars.copy_context().run, deadline.current).result()
+        bare = pool.submit(deadline.current).result()
+    assert inherited is started
+    assert bare is None
+
+
+def test_upstream_retries_stop_at_the_deadline(app_module, monkeypatch):
+    attempts = []
+    sleeps = []
+
+    def failing_connection(timeout):
+        attempts.append(timeout)
+        raise TimeoutError("upstream timed out")
+
+    monkeypatch.setattr(app_module, "create_api_connection", failing_connection)
+    monkeypatch.setattr(app_module.time, "sleep", sleeps.append)
+    monkeypatch.setattr(deadline, "MIN_ATTEMPT_SECONDS", 1.0)
+
+    deadline.start(20)
+    try:
+        assert app_module.make_api_request("/shows/tt1", timeout=8) == {}
+    finally:
+        deadline.finish()
+    assert attempts == [8, 8, 8] and sleeps == [2, 4]
+
+    attempts.clear()
+    sleeps.clear()
+    deadline.start(2.5)
+    try:
+        assert app_module.make_api_request("/shows/tt1", timeout=8) == {}
+    finally:
+        deadline.finish()
+    # One attempt clipped to the budget; waiting 2s would leave less than a full attempt
+    assert len(attempts) == 1 and attempts[0] <= 2.5
+    assert sleeps == []
+
+
+def test_stats_are_admin_only(client, app_module, monkeypatch):
+    assert client.get("/api/stats").status_code == 403
+    monkeypatch.setattr(app_module.tracer, "debug_token", "admin-token")
+    assert client.get("/api/stats", headers={"X-Debug-Token": "wrong"}).status_code == 403
+
+    response = client.get("/api/stats", headers={"X-Debug-Token": "admin-token"})
+    assert response.status_code == 200
+    stats = response.get_json()
+    assert stats["request_deadline"]["remaining_budget"]["count"] >= 1
+    assert "response_cache" in stats and "startup" in stats
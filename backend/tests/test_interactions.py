@@ -0,0 +1,115 @@
+import pytest
+
+from conftest import register
+from utils.interactions import BloomFilter, InteractionStore
+
+
+@pytest.fixture
+def store(mongo_db):
+    return InteractionStore(mongo_db.interactions)
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    ids = [f"tt{index:07d}" for index in range(1000)]
+    bloom = BloomFilter.from_ids(ids, error_rate=0.01)
+    assert all(content_id in bloom for content_id in ids)
+    false_positives = sum(f"nm{index:07d}" in bloom for index in range(10000))
+    assert false_positives < 300
+
+
+def test_a_new_signal_replaces_the_old_one(store, mongo_db):
+    store.record("u1", "tt1", "like")
+    store.record("u1", "tt1", "dislike")
+    store.record("u1", "tt2", "like")
+    assert mongo_db.interactions.count_documents({"user_id": "u1"}) == 2
+    assert store.get_content_ids("u1", signal="dislike") == ["tt1"]
+    with pytest.raises(ValueError):
+        store.record("u1", "tt3", "love")
+
+
+def test_record_many_rejects_the_whole_batch_on_a_bad_signal(store, mongo_db):
+    with pytest.raises(ValueError):
+        store.record_many("u1", [("tt1", "like"), ("tt2", "meh")])
+    assert mongo_db.interactions.count_documents({}) == 0
+    assert store.record_many("u1", [("tt1", "like"), ("tt2", "dislike")]) == 2
+    assert sorted(store.get_content_ids("u1")) == ["tt1", "tt2"]
+
+
+def test_seen_filter_follows_this_workers_writes(store):
+    store.record("u1", "tt1", "like")
+    seen = store.seen_filter("u1")
+    assert store.has_seen("u1", "tt1") and not store.has_seen("u1", "tt2")
+    store.record("u1", "tt2", "dislike")
+    # Updated in place rather than reloaded
+    assert store.seen_filter("u1") is seen and store.has_seen("u1", "tt2")
+
+
+def test_seen_filter_is_reloaded_after_invalidation(store, mongo_db):
+    store.seen_filter("u1")
+    # Written by another worker
+    mongo_db.interactions.insert_one({"user_id": "u1", "content_id": "tt9", "signal": "like"})
+    assert not store.has_seen("u1", "tt9")
+    store.invalidate("u1")
+    assert store.has_seen("u1", "tt9")
+
+
+def legacy_users(mongo_db):
+    return mongo_db.users.insert_many([
+        {"email": "a@example.com", "liked_content": ["tt1", "tt2"], "disliked_content": ["tt2", "tt3"]},
+        {"email": "b@example.com", "disliked_content": ["tt4"]},
+        {"email": "c@example.com"}
+    ]).inserted_ids
+
+
+def test_migration_moves_the_legacy_arrays(store, mongo_db):
+    a, b, _ = legacy_users(mongo_db)
+    assert store.migrate_user_arrays(mongo_db.users) == {"users": 2, "interactions": 4}
+    # A title in both arrays counts as liked
+    assert sorted(store.get_content_ids(str(a), signal="like")) == ["tt1", "tt2"]
+    assert store.get_content_ids(str(a), signal="dislike") == ["tt3"]
+    assert store.get_content_ids(str(b)) == ["tt4"]
+    # The arrays stay until the migration is run with unset
+    assert mongo_db.users.find_one({"_id": a})["liked_content"] == ["tt1", "tt2"]
+
+
+def test_migration_is_rerunnable_and_never_overwrites(store, mongo_db):
+    a, _, _ = legacy_users(mongo_db)
+    store.record(str(a), "tt1", "dislike")
+    store.migrate_user_arrays(mongo_db.users)
+    store.migrate_user_arrays(mongo_db.users, batch_size=1, unset=True)
+    assert mongo_db.interactions.count_documents({}) == 4
+    # tt1 keeps the dislike recorded before the migration
+    assert sorted(store.get_content_ids(str(a), signal="dislike")) == ["tt1", "tt3"]
+    assert mongo_db.users.count_documents({"liked_content": {"$exists": True}}) == 0
+    assert mongo_db.users.count_documents({"disliked_content": {"$exists": True}}) == 0
+    assert store.migrate_user_arrays(mongo_db.users) == {"users": 0, "interactions": 0}
+
+
+def test_failed_batch_keeps_the_users_arrays(store, mongo_db, monkeypatch):
+    legacy_users(mongo_db)
+
+    def failing_bulk_write(*args, **kwargs):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(store, "collection", type("Interactions", (), {
+        "bulk_write": staticmethod(failing_bulk_write),
+        "create_indexes": mongo_db.interactions.create_indexes
+    })())
+    with pytest.raises(RuntimeError):
+        store.migrate_user_arrays(mongo_db.users, unset=True)
+    assert mongo_db.users.count_documents({"liked_content": {"$exists": True}}) == 1
+
+
+def test_preference_routes_record_interactions(client, app_module):
+    headers = register(client)
+    assert client.post("/api/discover/preference", json={"content_id": "tt1", "preference": "like"}, headers=headers).status_code == 201
+    assert client.post("/api/discover/preference", json={"content_id": "tt1", "preference": "love"}, headers=headers).status_code == 400
+    response = client.post("/api/discover/preferences", json={"preferences": [
+        {"content_id": "tt2", "preference": "dislike"},
+        {"content_id": "tt3", "preference": "like"}
+    ]}, headers=headers)
+    assert response.status_code == 201 and response.get_json()["recorded"] == 2
+
+    user_id = str(app_module.db.users.find_one()["_id"])
+    assert sorted(app_module.interaction_store.get_content_ids(user_id)) == ["tt1", "tt2", "tt3"]
+    assert "liked_content" not in app_module.db.users.find_one()
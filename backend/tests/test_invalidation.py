@@ -0,0 +1,122 @@
+import time
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+
+from utils.catalog import Catalog
+from utils.catalog_codec import CatalogCodec
+from utils.invalidation import InvalidationBus
+from utils.streaming_services import SERVICE_MAPPING
+
+
+def change(collection, operation, **fields):
+    return dict(fields, operationType=operation, ns={"db": "media_recommender", "coll": collection}, wallTime=datetime.utcnow())
+
+
+@pytest.fixture
+def bus(mongo_db):
+    bus = InvalidationBus(mongo_db, outbox=mongo_db.cache_invalidations, mode="polling", poll_interval=0.02)
+    yield bus
+    bus.stop()
+
+
+def recorder(bus, collection, **kwargs):
+    keys = []
+    bus.subscribe(collection, keys.append, **kwargs)
+    return keys
+
+
+def test_change_stream_does_not_look_up_documents(bus):
+    recorder(bus, "catalog")
+    recorder(bus, "interactions", key_field="user_id")
+    watched = {}
+
+    class Stream:
+        alive = False
+        resume_token = None
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    def watch(pipeline, **kwargs):
+        watched.update(kwargs, pipeline=pipeline)
+        return Stream()
+
+    bus.database = type("Database", (), {"watch": staticmethod(watch)})()
+    bus._follow_change_stream()
+    assert "full_document" not in watched
+    projection = watched["pipeline"][1]["$project"]
+    assert projection["fullDocument.user_id"] == 1
+    assert not any(field.startswith("fullDocument") and field != "fullDocument.user_id" for field in projection)
+
+
+def test_keys_come_from_the_event(bus):
+    catalog_keys = recorder(bus, "catalog")
+    interaction_keys = recorder(bus, "interactions", key_field="user_id", operations=("insert", "replace", "delete"))
+
+    bus._handle_change(change("catalog", "update", documentKey={"_id": "tt0000001"}, updateDescription={"updatedFields": {"title": "New"}}))
+    bus._handle_change(change("catalog", "delete", documentKey={"_id": "tt0000002"}))
+    bus._handle_change(change("interactions", "insert", documentKey={"_id": ObjectId()}, fullDocument={"user_id": "u1"}))
+    # Changing a signal doesn't change which titles the user has seen
+    bus._handle_change(change("interactions", "update", documentKey={"_id": ObjectId()}, updateDescription={"updatedFields": {"signal": "like"}}))
+    # A delete only carries the _id, so every user's filter goes
+    bus._handle_change(change("interactions", "delete", documentKey={"_id": ObjectId()}))
+    bus._handle_change(change("catalog", "drop"))
+
+    assert catalog_keys == ["tt0000001", "tt0000002", None]
+    assert interaction_keys == ["u1", None]
+
+
+def test_polling_applies_other_workers_writes(bus, mongo_db):
+    keys = recorder(bus, "users")
+    bus.ensure_started()
+    deadline = time.monotonic() + 2
+    while bus.active != "polling" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # Written by a worker in another process
+    mongo_db.cache_invalidations.insert_one({"collection": "users", "key": "u2", "at": datetime.utcnow(), "origin": "other:1"})
+    # Published here: applied at once and skipped when polled
+    bus.publish("users", "u1")
+    while len(keys) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert keys == ["u1", "u2"]
+    assert bus.stats()["active"] == "polling"
+
+
+def test_catalog_documents_are_keyed_on_the_content_id(mongo_db):
+    catalog = Catalog(mongo_db.catalog, codec=CatalogCodec(SERVICE_MAPPING))
+    catalog.upsert_summaries([{"id": "tt0000001", "title": "One"}], service_id="203")
+    catalog.upsert_summary({"id": "tt0000002", "title": "Two"})
+    catalog.upsert_details({"id": "tt0000003", "title": "Three", "cast": []})
+    catalog.upsert_summary({"id": "tt0000001", "title": "One again"})
+    assert sorted(doc["_id"] for doc in mongo_db.catalog.find()) == ["tt0000001", "tt0000002", "tt0000003"]
+
+
+def test_recode_moves_legacy_documents_to_the_content_id(mongo_db):
+    mongo_db.catalog.insert_many([
+        {"id": "tt0000001", "title": "Legacy", "service_ids": ["203"]},
+        {"_id": "tt0000002", "id": "tt0000002", "title": "Current"}
+    ])
+    catalog = Catalog(mongo_db.catalog, codec=CatalogCodec(SERVICE_MAPPING))
+    assert catalog.recode(batch_size=1) == 2
+    assert sorted(doc["_id"] for doc in mongo_db.catalog.find()) == ["tt0000001", "tt0000002"]
+    assert catalog.get_summary("tt0000001")["service_ids"] == ["203"]
+
+
+def test_catalog_changes_evict_that_titles_responses(app_module):
+    cache = app_module.response_cache
+    with app_module.app.app_context():
+        for key in (("content", "tt0000001", ("203",)), ("content", "tt0000001", ()), ("content", "tt0000002", ()), ("trending", (), 1)):
+            cache.put(key, {"key": list(map(str, key))})
+
+    app_module.invalidate_content_responses("tt0000001")
+    assert list(cache._entries) == [("content", "tt0000002", ()), ("trending", (), 1)]
+    # Older titles are keyed on an ObjectId, which can't say which title changed
+    app_module.invalidate_content_responses(str(ObjectId()))
+    assert list(cache._entries) == [("trending", (), 1)]
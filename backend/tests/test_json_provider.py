@@ -0,0 +1,87 @@
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from bson.objectid import ObjectId
+from flask import Flask
+
+from conftest import register
+from utils import json_provider
+
+
+@pytest.fixture(params=["orjson", "json"])
+def provider(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(json_provider, "orjson", None)
+    elif json_provider.orjson is None:
+        pytest.skip("orjson is not installed")
+    app = Flask(__name__)
+    app.json = json_provider.FastJSONProvider(app, stream_min_items=3, stream_chunk_items=2)
+    # The provider only holds a weak reference to its app
+    yield app.json
+
+
+def test_encodes_mongo_and_python_values(provider):
+    object_id = ObjectId()
+    value = {
+        "_id": object_id,
+        "day": date(2026, 10, 19),
+        "price": Decimal("1.50"),
+        "key": uuid.UUID(int=1),
+        "tags": {"a"}
+    }
+    assert provider.loads(provider.dumps(value)) == {
+        "_id": str(object_id),
+        "day": "2026-10-19",
+        "price": "1.50",
+        "key": str(uuid.UUID(int=1)),
+        "tags": ["a"]
+    }
+
+
+def test_datetimes_are_written_as_utc(provider):
+    value = {
+        "naive": datetime(2026, 10, 19, 12, 0, 0, 500),
+        "utc": datetime(2026, 10, 19, 12, tzinfo=timezone.utc),
+        "offset": datetime(2026, 10, 19, 12, tzinfo=timezone(timedelta(hours=2)))
+    }
+    assert provider.loads(provider.dumps(value)) == {
+        "naive": "2026-10-19T12:00:00.000500Z",
+        "utc": "2026-10-19T12:00:00Z",
+        "offset": "2026-10-19T12:00:00+02:00"
+    }
+
+
+def test_large_lists_are_streamed(provider):
+    with provider._app.app_context():
+        response = provider.response([{"n": n} for n in range(5)])
+        assert response.is_streamed
+        assert provider.loads(b"".join(response.response)) == [{"n": n} for n in range(5)]
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """Run a test in a timezone far from UTC, as a server configured for local time would."""
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset() is not available")
+    monkeypatch.setenv("TZ", "America/Los_Angeles")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_stored_timestamps_are_utc(client, app_module, local_timezone):
+    headers = register(client)
+    assert client.post("/api/watchlist", json={"content_id": "tt0000001"}, headers=headers).status_code == 201
+    assert client.post("/api/ratings", json={"content_id": "tt0000001", "rating": 4}, headers=headers).status_code == 201
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    stored = [
+        app_module.db.users.find_one()["created_at"],
+        app_module.db.watchlist.find_one()["added_date"],
+        app_module.db.ratings.find_one()["date"]
+    ]
+    assert all(abs((now - value).total_seconds()) < 60 for value in stored)
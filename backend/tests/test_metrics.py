@@ -0,0 +1,62 @@
+import threading
+
+from utils import metrics
+
+
+def test_histograms_merge_thread_shards_and_render_cumulative_buckets():
+    registry = metrics.Registry()
+    histogram = registry.histogram("job_seconds", "Job latency.", ("job",), buckets=(0.1, 1.0))
+
+    def work():
+        histogram.observe(0.05, "a")
+        histogram.observe(0.5, "a")
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    histogram.observe(5, "a")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE job_seconds histogram" in lines
+    assert 'job_seconds_bucket{job="a",le="0.1"} 3' in lines
+    assert 'job_seconds_bucket{job="a",le="1"} 6' in lines
+    assert 'job_seconds_bucket{job="a",le="+Inf"} 7' in lines
+    assert 'job_seconds_count{job="a"} 7' in lines
+    assert 'job_seconds_sum{job="a"} 6.65' in lines
+
+
+def test_counters_escape_label_values():
+    registry = metrics.Registry()
+    counter = registry.counter("events_total", "Events.", ("name",))
+    counter.inc('say "hi"\n')
+    counter.inc('say "hi"\n', amount=2)
+    assert 'events_total{name="say \\"hi\\"\\n"} 3' in registry.render().splitlines()
+
+
+def test_failing_collectors_do_not_break_the_scrape():
+    registry = metrics.Registry()
+    registry.register_collector(lambda: 1 / 0)
+    registry.register_collector(lambda: [("queue_depth", "gauge", "Queued jobs.", [({"queue": "q"}, 4)])])
+    assert 'queue_depth{queue="q"} 4' in registry.render().splitlines()
+
+
+def test_upstream_paths_group_into_families():
+    assert metrics.endpoint_family("/search/basic?country=us&service=netflix") == "/search/basic"
+    assert metrics.endpoint_family("/get/movie/id/tt0113277") == "/get"
+    assert metrics.endpoint_family("/") == "/"
+
+
+def test_metrics_endpoint_reports_routes_by_template(client):
+    client.get("/api/content/tt1")
+    client.get("/api/content/tt2")
+    client.get("/api/status")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+    body = response.get_data(as_text=True)
+    # One series per route template, not per content id
+    assert 'route="/api/content/<content_id>"' in body and 'route="/api/content/tt1"' not in body
+    assert 'route="/api/status",method="GET",status="200"' in body
+    assert 'cache_hit_ratio{cache="search"}' in body
@@ -0,0 +1,101 @@
+import threading
+
+import bcrypt
+import pytest
+
+from conftest import register
+from utils import deadline
+from utils.password_hashing import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def hasher():
+    return PasswordHasher(rounds=4, max_workers=1, max_queue=1, retry_after=3)
+
+
+def block_pool(hasher):
+    """Fill every admission slot with work that waits for the returned event."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+
+    futures = [hasher._submit("hash", blocked) for _ in range(hasher.max_pending)]
+    started.wait(2)
+    return release, futures
+
+
+def test_hash_and_verify(hasher):
+    hashed = hasher.hash("correct-horse")
+    assert hashed.startswith("$2b$04$")
+    assert hasher.verify("correct-horse", hashed)
+    assert not hasher.verify("wrong", hashed)
+    stats = hasher.stats()
+    assert stats["latency"]["hash"]["count"] == 1 and stats["latency"]["verify"]["count"] == 2
+    assert stats["pending"] == 0
+
+
+def test_saturated_pool_rejects_immediately(hasher):
+    release, futures = block_pool(hasher)
+    try:
+        with pytest.raises(PasswordHasherBusy) as busy:
+            hasher.hash("correct-horse")
+        assert busy.value.retry_after == 3
+        assert hasher.stats()["rejected"] == 1 and hasher.stats()["pending"] == 2
+    finally:
+        release.set()
+    for future in futures:
+        future.result(2)
+    # Slots are given back once the work finishes
+    assert hasher.verify("correct-horse", hasher.hash("correct-horse"))
+
+
+def test_work_that_would_outlive_the_deadline_is_busy(hasher):
+    release = threading.Event()
+    # The only worker is busy, so the hash waits in the queue past the deadline
+    blocked = hasher._submit("hash", lambda: release.wait(5))
+    deadline.start(0.05)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash("correct-horse")
+    finally:
+        deadline.finish()
+        release.set()
+    blocked.result(2)
+
+
+def test_outdated_hashes_are_upgraded(hasher):
+    old = bcrypt.hashpw(b"correct-horse", bcrypt.gensalt(rounds=5)).decode("utf-8")
+    assert hasher.needs_rehash(old) and hasher.needs_rehash("plaintext")
+    assert not hasher.needs_rehash(hasher.hash("x"))
+
+    upgraded = []
+    hasher.rehash_in_background("correct-horse", upgraded.append).result(2)
+    assert not hasher.needs_rehash(upgraded[0]) and hasher.verify("correct-horse", upgraded[0])
+    assert hasher.stats()["rehashed"] == 1
+
+
+def test_background_rehash_is_skipped_when_busy(hasher):
+    release, _ = block_pool(hasher)
+    try:
+        assert hasher.rehash_in_background("correct-horse", lambda new_hash: None) is None
+    finally:
+        release.set()
+
+
+def test_login_answers_503_when_hashing_is_saturated(client, app_module, monkeypatch):
+    register(client)
+    assert client.post("/api/login", json={"email": "user@example.com", "password": "wrong"}).status_code == 401
+    assert client.post("/api/login", json={"email": "user@example.com", "password": "correct-horse"}).status_code == 200
+
+    def busy(*args):
+        raise PasswordHasherBusy(7)
+
+    monkeypatch.setattr(app_module.password_hasher, "verify", busy)
+    monkeypatch.setattr(app_module.password_hasher, "hash", busy)
+    response = client.post("/api/login", json={"email": "user@example.com", "password": "correct-horse"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "7"
+    response = client.post("/api/register", json={"email": "other@example.com", "password": "correct-horse"})
+    assert response.status_code == 503
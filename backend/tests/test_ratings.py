@@ -0,0 +1,148 @@
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from conftest import register
+from utils.ratings import GLOBAL_ID, RatingStore
+
+
+class RacingCollection:
+    """Wraps a collection so another request's write lands just before this one's."""
+
+    def __init__(self, collection, method, concurrent_write, error):
+        self.collection = collection
+        self.method = method
+        self.concurrent_write = concurrent_write
+        self.error = error
+
+    def __getattr__(self, name):
+        attribute = getattr(self.collection, name)
+        if name != self.method or self.concurrent_write is None:
+            return attribute
+
+        def racing(*args, **kwargs):
+            concurrent_write, self.concurrent_write = self.concurrent_write, None
+            concurrent_write()
+            raise self.error
+        return racing
+
+
+@pytest.fixture
+def store(mongo_db):
+    store = RatingStore(mongo_db.ratings, mongo_db.rating_aggregates, prior_weight=10.0, prior_mean=3.0)
+    store.ensure_indexes()
+    return store
+
+
+def aggregate(mongo_db, content_id):
+    doc = mongo_db.rating_aggregates.find_one({"_id": content_id}) or {}
+    return {key: doc.get(key, 0) for key in ("count", "sum", "sum_sq")}
+
+
+def test_new_and_changed_ratings_update_the_aggregate(store, mongo_db):
+    assert store.record("u1", "tt1", 4) is True
+    assert store.record("u2", "tt1", 2) is True
+    assert store.record("u1", "tt1", 5) is False
+    assert aggregate(mongo_db, "tt1") == {"count": 2, "sum": 7, "sum_sq": 29}
+    assert aggregate(mongo_db, GLOBAL_ID) == {"count": 2, "sum": 7, "sum_sq": 29}
+
+    summary = store.get("tt1")
+    assert summary["count"] == 2 and summary["average"] == 3.5 and summary["stddev"] == 1.5
+    # Two ratings barely move the score off the prior
+    assert summary["score"] == round((10 * 3.0 + 7) / 12, 4)
+    assert store.get("tt2") == {"count": 0, "average": None, "stddev": None, "score": 3.0}
+    with pytest.raises(ValueError):
+        store.record("u1", "tt1", 6)
+
+
+def test_cached_summaries_are_invalidated_by_writes(store):
+    store.record("u1", "tt1", 4)
+    assert store.get("tt1")["count"] == 1
+    store.record("u2", "tt1", 2)
+    assert store.get("tt1")["count"] == 2
+
+
+def test_concurrent_first_rating_by_the_same_user(store, mongo_db):
+    def other_request():
+        mongo_db.ratings.insert_one({"user_id": "u1", "content_id": "tt1", "rating": 2})
+        mongo_db.rating_aggregates.insert_one({"_id": "tt1", "count": 1, "sum": 2, "sum_sq": 4})
+
+    store.collection = RacingCollection(mongo_db.ratings, "find_one_and_update", other_request, DuplicateKeyError("E11000 duplicate key"))
+    # The other request's rating was stored first, so this one changes it
+    assert store.record("u1", "tt1", 5) is False
+    assert mongo_db.ratings.count_documents({}) == 1
+    assert mongo_db.ratings.find_one()["rating"] == 5
+    assert aggregate(mongo_db, "tt1") == {"count": 1, "sum": 5, "sum_sq": 25}
+
+
+class LostTitleUpsert:
+    """Aggregates whose first bulk write loses the title's upsert to another request's insert."""
+
+    def __init__(self, collection, other_request):
+        self.collection = collection
+        self.other_request = other_request
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def bulk_write(self, operations, ordered=True):
+        if self.other_request is None:
+            return self.collection.bulk_write(operations, ordered=ordered)
+        other_request, self.other_request = self.other_request, None
+        other_request()
+        # Unordered, so the global totals are still incremented
+        self.collection.bulk_write(operations[1:], ordered=ordered)
+        raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}]})
+
+
+def test_concurrent_first_ratings_of_a_title(store, mongo_db):
+    def other_request():
+        mongo_db.rating_aggregates.insert_one({"_id": "tt1", "count": 1, "sum": 3, "sum_sq": 9})
+
+    store.aggregates = LostTitleUpsert(mongo_db.rating_aggregates, other_request)
+    assert store.record("u1", "tt1", 5) is True
+    assert aggregate(mongo_db, "tt1") == {"count": 2, "sum": 8, "sum_sq": 34}
+    assert aggregate(mongo_db, GLOBAL_ID) == {"count": 1, "sum": 5, "sum_sq": 25}
+    assert store.stats()["errors"] == 0 and store.stats()["pending_repairs"] == 0
+
+
+def test_failed_aggregate_update_is_repaired_on_read(store, mongo_db, monkeypatch):
+    store.record("u1", "tt1", 4)
+
+    def failing_bulk_write(*args, **kwargs):
+        raise BulkWriteError({"writeErrors": [{"index": 0, "code": 91, "errmsg": "shutdown in progress"}]})
+
+    monkeypatch.setattr(store, "aggregates", type("Aggregates", (), {"bulk_write": staticmethod(failing_bulk_write)})())
+    store.record("u2", "tt1", 2)
+    assert store.stats()["pending_repairs"] == 1
+    monkeypatch.undo()
+
+    assert store.get("tt1")["count"] == 2
+    assert aggregate(mongo_db, "tt1") == {"count": 2, "sum": 6, "sum_sq": 20}
+    assert aggregate(mongo_db, GLOBAL_ID) == {"count": 2, "sum": 6, "sum_sq": 20}
+    assert store.stats()["repairs"] == 1 and store.stats()["pending_repairs"] == 0
+
+
+def test_rebuild_recomputes_and_removes_stale_aggregates(store, mongo_db):
+    mongo_db.ratings.insert_many([
+        {"user_id": "u1", "content_id": "tt1", "rating": 5},
+        {"user_id": "u2", "content_id": "tt1", "rating": 3},
+        {"user_id": "u1", "content_id": "tt2", "rating": 1},
+        {"user_id": "u3", "content_id": "tt2", "rating": 9}
+    ])
+    mongo_db.rating_aggregates.insert_one({"_id": "tt3", "count": 4, "sum": 12, "sum_sq": 40})
+
+    assert store.rebuild() == {"titles": 2, "ratings": 3, "removed": 1}
+    assert aggregate(mongo_db, "tt1") == {"count": 2, "sum": 8, "sum_sq": 34}
+    assert aggregate(mongo_db, "tt2") == {"count": 1, "sum": 1, "sum_sq": 1}
+    assert aggregate(mongo_db, GLOBAL_ID) == {"count": 3, "sum": 9, "sum_sq": 35}
+    assert mongo_db.rating_aggregates.find_one({"_id": "tt3"}) is None
+
+
+def test_rating_route_returns_the_titles_summary(client):
+    first = register(client, email="first@example.com")
+    second = register(client, email="second@example.com")
+    assert client.post("/api/ratings", json={"content_id": "tt1", "rating": 4}, headers=first).status_code == 201
+    response = client.post("/api/ratings", json={"content_id": "tt1", "rating": 2}, headers=second)
+    assert response.status_code == 201
+    assert response.get_json()["user_rating"]["count"] == 2
+    assert client.post("/api/ratings", json={"content_id": "tt1", "rating": 0}, headers=first).status_code == 400
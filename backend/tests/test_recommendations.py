@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from conftest import register
+from utils import diversity
+from utils.catalog import Catalog
+from utils.catalog_codec import CatalogCodec
+from utils.streaming_services import SERVICE_MAPPING, StreamingService
+
+NETFLIX = "203"
+
+
+def summaries(start, count, genre, content_type="movie"):
+    return [
+        {
+            "id": f"tt{index:07d}",
+            "title": f"{genre} title {index}",
+            "year": 2000 + index % 20,
+            "content_type": content_type,
+            "genre_names": [genre]
+        }
+        for index in range(start, start + count)
+    ]
+
+
+def test_rerank_moves_preferred_genres_up():
+    items = summaries(0, 10, "Comedy") + summaries(10, 10, "Horror")
+    plain = diversity.rerank(items, 10, diversity=0.0)
+    preferred = diversity.rerank(items, 10, preferred_genres=["horror"], diversity=0.0, genre_weight=1.0)
+    assert all(item["genre_names"] == ["Comedy"] for item in plain)
+    assert all(item["genre_names"] == ["Horror"] for item in preferred)
+
+
+def test_rerank_breaks_up_runs_of_one_genre():
+    items = summaries(0, 10, "Comedy") + summaries(10, 10, "Horror")
+    top = diversity.rerank(items, 4, diversity=0.5)
+    assert {item["genre_names"][0] for item in top} == {"Comedy", "Horror"}
+
+
+def test_rerank_uses_rating_scores():
+    items = summaries(0, 5, "Drama")
+    top = diversity.rerank(items, 1, rating_scores={items[4]["id"]: 5.0}, diversity=0.0, rating_weight=5.0)
+    assert top[0]["id"] == items[4]["id"]
+
+
+def test_summaries_keep_genre_names(mongo_db):
+    catalog = Catalog(mongo_db.catalog, codec=CatalogCodec(SERVICE_MAPPING))
+    catalog.upsert_summaries(summaries(0, 3, "Horror"), service_id=NETFLIX)
+    found = catalog.find_for_services([NETFLIX])
+    assert [item["genre_names"] for item in found] == [["Horror"]] * 3
+    assert "cast" not in found[0]
+
+
+def test_compact_summary_projection_keeps_genre_names(mongo_db):
+    catalog = Catalog(mongo_db.catalog, codec=CatalogCodec(SERVICE_MAPPING, compact=True))
+    excluded = {key for key, value in catalog._summary_projection.items() if value == 0}
+    assert catalog.codec.field("genre_names") not in excluded
+    assert catalog.codec.field("cast") in excluded
+
+
+def test_cached_recommendations_follow_genre_preference(client, app_module):
+    # Comedies are listed first, so without a preference they would fill the top of the list
+    app_module.catalog.upsert_summaries(summaries(0, 30, "Comedy") + summaries(30, 30, "Horror"), service_id=NETFLIX)
+
+    results = {}
+    for genre in ("Comedy", "Horror"):
+        headers = register(client, email=f"{genre}@example.com", streaming_services=[NETFLIX], preferences={"genres": [genre]})
+        response = client.get("/api/recommendations", headers=headers)
+        assert response.status_code == 200
+        results[genre] = response.get_json()
+
+    def horror_in_top(items):
+        return sum(item["genre_names"] == ["Horror"] for item in items[:10])
+
+    assert all(len(items) == 20 for items in results.values())
+    assert horror_in_top(results["Horror"]) > horror_in_top(results["Comedy"])
+
+
+def test_fetch_ranked_results_caps_the_fanout(app_module, monkeypatch):
+    called = []
+    lock = threading.Lock()
+
+    def fake_request(path):
+        with lock:
+            called.append(path)
+        return {"results": [{"imdbId": path}]}
+
+    monkeypatch.setattr(app_module, "make_api_request", fake_request)
+    paths = [f"/search/basic?page={page}" for page in range(30)]
+    ranked_lists = app_module.fetch_ranked_results(paths, max_searches=8)
+
+    assert sorted(called) == sorted(paths[:8])
+    assert len(ranked_lists) == 30
+    assert [results[0]["imdbId"] for results in ranked_lists[:8]] == paths[:8]
+    assert ranked_lists[8:] == [[]] * 22
+
+
+def test_cold_recommendations_are_cached_with_one_bulk_write(client, app_module, monkeypatch):
+    headers = register(client, streaming_services=[NETFLIX, "26"], preferences={"genres": ["Action"]})
+    writes = []
+    upsert_summaries = app_module.catalog.upsert_summaries
+    monkeypatch.setattr(app_module.catalog, "upsert_summaries", lambda items, service_id=None: writes.append(len(items)) or upsert_summaries(items, service_id))
+    monkeypatch.setattr(app_module.catalog, "upsert_summary", lambda *args, **kwargs: pytest.fail("cached one title at a time"))
+    # Too little cached content for the cached path
+    monkeypatch.setattr(StreamingService, "get_content_for_services", staticmethod(lambda *args, **kwargs: []))
+
+    response = client.get("/api/recommendations", headers=headers)
+
+    assert response.status_code == 200
+    items = response.get_json()
+    assert len(items) == 20
+    assert writes == [20]
+    assert all("genre_names" in item for item in items)
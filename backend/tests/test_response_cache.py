@@ -0,0 +1,115 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+from conftest import register
+from utils.json_provider import FastJSONProvider
+from utils.response_cache import ResponseCache, brotli
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    return app
+
+
+def put(app, cache, key, obj, **kwargs):
+    with app.app_context():
+        return cache.put(key, obj, **kwargs)
+
+
+def test_streaming_services_revalidate_with_304(client):
+    response = client.get("/api/streaming_services", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "max-age" in response.headers["Cache-Control"]
+    assert response.headers["Vary"] == "Accept-Encoding"
+    etag = response.headers["ETag"]
+
+    revalidated = client.get("/api/streaming_services", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+    assert revalidated.headers["ETag"] == etag
+    changed = client.get("/api/streaming_services", headers={"If-None-Match": '"something-else"'})
+    assert changed.status_code == 200 and changed.get_json() == response.get_json()
+
+
+
+def test_content_details_revalidate_with_304(client):
+    headers = register(client)
+    response = client.get("/api/content/tt0000031", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"].startswith("private")
+
+    revalidated = client.get("/api/content/tt0000031", headers=dict(headers, **{"If-None-Match": response.headers["ETag"]}))
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+def test_any_encodings_tag_matches(app):
+    cache = ResponseCache(min_compress_bytes=16)
+    entry = put(app, cache, ("list",), [{"title": "Same title"}] * 50)
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = cache.respond(entry)
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["ETag"] == f'"{entry.etag}-gz"'
+        gzip_tag = response.headers["ETag"]
+    with app.test_request_context(headers={"Accept-Encoding": "identity", "If-None-Match": gzip_tag}):
+        response = cache.respond(entry)
+        assert response.status_code == 304
+        assert response.headers["ETag"] == f'"{entry.etag}"'
+    with app.test_request_context(headers={"If-None-Match": "*"}):
+        assert cache.respond(entry).status_code == 304
+    assert cache.stats()["not_modified"] == 2
+
+
+def test_compressed_variants_decode_to_the_body(app):
+    cache = ResponseCache(min_compress_bytes=16)
+    entry = put(app, cache, ("list",), [{"title": "Same title"}] * 50)
+    assert gzip.decompress(entry.variants["gzip"]) == entry.body
+    if brotli is not None:
+        assert brotli.decompress(entry.variants["br"]) == entry.body
+    small = put(app, cache, ("small",), {"a": 1})
+    assert small.variants == {}
+
+
+def test_expired_entries_miss(app, monkeypatch):
+    cache = ResponseCache()
+    put(app, cache, ("content", "tt1"), {"a": 1}, ttl=10)
+    assert cache.get(("content", "tt1")) is not None
+    monkeypatch.setattr("utils.response_cache.time.monotonic", lambda: 10 ** 9)
+    assert cache.get(("content", "tt1")) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(app):
+    cache = ResponseCache(min_compress_bytes=10 ** 6)
+    size = put(app, cache, ("content", "tt0"), {"n": 0}).size
+    cache.max_bytes = size * 3
+    put(app, cache, ("content", "tt1"), {"n": 1})
+    put(app, cache, ("content", "tt2"), {"n": 2})
+    cache.get(("content", "tt0"))
+    put(app, cache, ("content", "tt3"), {"n": 3})
+    assert list(cache._entries) == [("content", "tt2"), ("content", "tt0"), ("content", "tt3")]
+    assert cache._prefixes[("content",)] == set(cache._entries)
+    assert ("content", "tt1") not in cache._prefixes
+
+
+def test_invalidate_route_only_touches_matching_entries(app):
+    cache = ResponseCache()
+    keys = [("content", "tt1", ("203",)), ("content", "tt1", ()), ("content", "tt2", ()), ("trending", (), 1), ("streaming_services",)]
+    for key in keys:
+        put(app, cache, key, {"key": str(key)})
+
+    cache.invalidate_route("content", "tt1", ())
+    assert ("content", "tt1", ()) not in cache._entries
+    cache.invalidate_route("content", "tt1")
+    assert set(cache._entries) == set(keys[2:])
+    assert ("content", "tt1") not in cache._prefixes
+    cache.invalidate_route("content")
+    cache.invalidate_route("streaming_services")
+    assert list(cache._entries) == [("trending", (), 1)]
+    assert set(cache._prefixes) == {("trending",), ("trending", ())}
+    assert cache.stats()["invalidations"] == 4
+    cache.clear()
+    assert cache._prefixes == {}
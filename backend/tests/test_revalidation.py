@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.catalog import Catalog
+from utils.revalidation import EXPIRED, FRESH, STALE, DetailsRevalidator
+
+
+class Fetcher:
+    """Stand-in for hydrate_content_details that stamps the refreshed copy."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.calls = []
+        self.missing = set()
+
+    def __call__(self, content_id, content_type):
+        self.calls.append((content_id, content_type))
+        if content_id in self.missing:
+            return None
+        details = {"id": content_id, "content_type": content_type, "details_refreshed_at": datetime.utcnow()}
+        self.catalog.upsert_details(details)
+        return details
+
+
+@pytest.fixture
+def catalog(mongo_db):
+    return Catalog(mongo_db.catalog)
+
+
+@pytest.fixture
+def fetcher(catalog):
+    return Fetcher(catalog)
+
+
+def store(catalog, content_id, age_seconds, content_type="movie"):
+    catalog.upsert_details({
+        "id": content_id,
+        "content_type": content_type,
+        "details_refreshed_at": datetime.utcnow() - timedelta(seconds=age_seconds)
+    })
+
+
+def revalidator(catalog, fetcher, mongo_db=None, **kwargs):
+    kwargs.setdefault("max_age", 100)
+    kwargs.setdefault("max_stale", 1000)
+    watchlist = mongo_db.watchlist if mongo_db is not None else None
+    return DetailsRevalidator(catalog, fetcher, watchlist_collection=watchlist, **kwargs)
+
+
+def test_freshness_by_age(catalog, fetcher):
+    details = revalidator(catalog, fetcher)
+    now = datetime.utcnow()
+    assert details.freshness({"details_refreshed_at": now}) == FRESH
+    assert details.freshness({"details_refreshed_at": now - timedelta(seconds=500)}) == STALE
+    assert details.freshness({"details_refreshed_at": now - timedelta(seconds=5000)}) == EXPIRED
+    # Stored before the timestamp existed
+    assert details.freshness({}) == STALE
+
+
+def test_requested_and_watchlisted_titles_go_first(catalog, fetcher, mongo_db):
+    for content_id in ("tt1", "tt2", "tt3"):
+        store(catalog, content_id, 500)
+    store(catalog, "tt4", 10)
+    mongo_db.watchlist.insert_many([{"content_id": "tt3"}, {"content_id": "tt3"}])
+    details = revalidator(catalog, fetcher, mongo_db)
+    details.record_access("tt2")
+
+    assert [content_id for content_id, _ in details.candidates()] == ["tt3", "tt2", "tt1"]
+
+
+def test_budget_limits_each_pass(catalog, fetcher):
+    for index in range(5):
+        store(catalog, f"tt{index}", 500, content_type="series")
+    details = revalidator(catalog, fetcher, budget_per_hour=1, burst=2)
+
+    assert details.revalidate() == 2
+    assert all(content_type == "series" for _, content_type in fetcher.calls)
+    # The bucket refills by one call an hour
+    assert details.revalidate() == 0
+    stats = details.stats()
+    assert stats["refreshed"] == 2 and stats["deferred"] == 3 + 3
+
+
+def test_failed_titles_back_off(catalog, fetcher):
+    store(catalog, "tt1", 500)
+    fetcher.missing.add("tt1")
+    details = revalidator(catalog, fetcher, burst=5)
+
+    assert details.revalidate() == 0
+    assert details.candidates() == []
+    assert details.stats()["failed"] == 1 and fetcher.calls == [("tt1", "movie")]
+
+
+def test_served_stale_titles_are_refreshed(catalog, fetcher):
+    refreshed = []
+    # A zero budget keeps the background thread from starting; the initial burst still applies
+    details = revalidator(catalog, fetcher, on_refresh=refreshed.append, budget_per_hour=0)
+    details.serve_stale("tt9", "movie")
+
+    assert details.revalidate() == 1
+    assert refreshed == ["tt9"]
+    assert details.stats()["pending"] == 0
+    assert details.freshness(catalog.get_details("tt9")) == FRESH
@@ -0,0 +1,105 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import fake_rapidapi
+from utils.search_cache import SearchResultCache, normalize_query
+
+
+def test_queries_normalize_to_one_key():
+    assert normalize_query("  The   MATRIX!! ") == normalize_query("the matrix") == "the matrix"
+    assert normalize_query("Amélie") == "amelie"
+    assert normalize_query("?!") == ""
+
+
+def test_equivalent_queries_share_one_fetch():
+    cache = SearchResultCache()
+    calls = []
+    fetch = lambda: calls.append(1) or [{"id": "tt1"}]
+    assert cache.get_or_fetch("The Matrix", fetch) == [{"id": "tt1"}]
+    assert cache.get_or_fetch("the  matrix.", fetch) == [{"id": "tt1"}]
+    assert calls == [1]
+    assert cache.get_or_fetch("", fetch) == []
+
+
+def test_empty_results_use_the_negative_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utils.search_cache.time.monotonic", lambda: now[0])
+    cache = SearchResultCache(ttl=3600, negative_ttl=60)
+    cache.set("nothing", [])
+    cache.set("something", [{"id": "tt1"}])
+    assert cache.get("nothing") == []
+    now[0] += 120
+    assert cache.get("nothing") is None
+    assert cache.get("something") == [{"id": "tt1"}]
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_failed_fetches_are_not_cached():
+    cache = SearchResultCache()
+    assert cache.get_or_fetch("matrix", lambda: None) is None
+    assert cache.get_or_fetch("matrix", lambda: [{"id": "tt1"}]) == [{"id": "tt1"}]
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("inception", lambda: (_ for _ in ()).throw(RuntimeError("upstream down")))
+    assert cache.get("inception") is None
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = SearchResultCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return [{"id": "tt1"}]
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_fetch("matrix", slow_fetch)))
+    leader.start()
+    started.wait(2)
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("Matrix", slow_fetch))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    deadline = time.monotonic() + 2
+    while cache.stats()["coalesced"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(2)
+    assert calls == [1]
+    assert results == [[{"id": "tt1"}]] * 4
+
+
+def test_entries_survive_in_mongodb(mongo_db):
+    SearchResultCache(mongo_db.search_cache).set("matrix", [{"id": "tt1"}])
+    # A fresh process only has the persisted copy
+    cache = SearchResultCache(mongo_db.search_cache)
+    assert cache.get("matrix") == [{"id": "tt1"}]
+    assert cache.stats()["persistent_hits"] == 1
+
+    mongo_db.search_cache.update_one({"_id": "matrix"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    assert SearchResultCache(mongo_db.search_cache).get("matrix") is None
+
+
+def test_memory_entries_are_bounded():
+    cache = SearchResultCache(max_entries=2)
+    for query in ("a", "b", "c"):
+        cache.set(query, [{"id": query}])
+    assert cache.get("a") is None and cache.get("c") == [{"id": "c"}]
+
+
+def test_search_route_calls_upstream_once_per_normalized_query(client):
+    def upstream_calls():
+        return fake_rapidapi.stats()["calls"].get("/search/title", 0)
+
+    before = upstream_calls()
+    first = client.get("/api/search?query=Quiet%20Harbor")
+    assert first.status_code == 200 and first.get_json()
+    assert client.get("/api/search?query=quiet%20%20harbor!").status_code == 200
+    assert upstream_calls() == before + 1
+    assert client.get("/api/search").status_code == 400
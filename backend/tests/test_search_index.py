@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from utils.search_index import SearchIndex, edit_distance
+
+TITLES = ["The Matrix", "Inception", "Matilda", "Interstellar", "Mad Max: Fury Road", "Amélie"]
+
+
+def documents():
+    return [
+        {"id": f"tt{index:07d}", "title": title, "year": 2000 + index, "content_type": "movie", "cast": [{"name": "Keanu Reeves"}] if index == 0 else []}
+        for index, title in enumerate(TITLES)
+    ]
+
+
+@pytest.fixture
+def index():
+    search_index = SearchIndex()
+    search_index.build(documents)
+    return search_index
+
+
+def titles(results):
+    return [result["title"] for result in results]
+
+
+def test_exact_prefix_and_accent_matches(index):
+    assert titles(index.search("inception")) == ["Inception"]
+    assert titles(index.search("inter")) == ["Interstellar"]
+    assert titles(index.search("amelie")) == ["Amélie"]
+    assert titles(index.search("keanu")) == ["The Matrix"]
+    assert index.search("") == []
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("matrx", "The Matrix"),
+    ("matirx", "The Matrix"),
+    ("mtrix", "The Matrix"),
+    ("inceptoin", "Inception"),
+    ("intersteller", "Interstellar")
+])
+def test_fuzzy_matches_typos(index, query, expected):
+    assert titles(index.search(query))[:1] == [expected]
+
+
+def test_fuzzy_matching_stays_bounded(index):
+    assert index.search("zzzz") == []
+    # Two edits are too many for a five-letter token
+    assert index.search("mtrxi") == []
+
+
+def test_edit_distance():
+    assert edit_distance("matirx", "matrix", 2) == 1
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("abc", "xyz", 1) == 2
+    assert edit_distance("a", "abcd", 2) == 3
+
+
+def test_add_updates_and_merges(index):
+    index.add({"id": "tt0000001", "title": "Inception (2010)"})
+    assert titles(index.search("2010")) == ["Inception (2010)"]
+    assert index.search("2010")[0]["year"] == 2001
+    index.add({"id": "tt0000001", "title": "Inception"})
+    assert index.search("2010") == []
+
+
+def test_failed_build_backs_off():
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("catalog unavailable")
+
+    search_index = SearchIndex(retry_interval=0.2)
+    for _ in range(5):
+        search_index.ensure_built(failing)
+    assert len(calls) == 1 and not search_index.built
+
+    time.sleep(0.25)
+    search_index.ensure_built(documents)
+    assert search_index.built
+    assert titles(search_index.search("matrix")) == ["The Matrix"]
+
+
+def test_build_does_not_block_searches_or_adds():
+    search_index = SearchIndex()
+    search_index.add({"id": "tt9999999", "title": "Old Title"})
+    during_build = {}
+
+    def slow_documents():
+        yield from documents()[:3]
+        # Another request searches and caches a title while the catalog is being scanned
+        def other_request():
+            during_build["results"] = titles(search_index.search("old"))
+            search_index.add({"id": "tt8888888", "title": "Added Meanwhile"})
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        thread.join(timeout=2)
+        during_build["finished"] = not thread.is_alive()
+        yield from documents()[3:]
+
+    assert search_index.build(slow_documents) == len(TITLES) + 1
+    assert during_build == {"results": ["Old Title"], "finished": True}
+    assert titles(search_index.search("added meanwhile")) == ["Added Meanwhile"]
+    assert search_index.search("old") == []
+    assert titles(search_index.search("interstellar")) == ["Interstellar"]
+
+
+def test_only_one_build_runs_at_a_time():
+    search_index = SearchIndex()
+    started = threading.Event()
+    release = threading.Event()
+    builds = []
+
+    def blocking_documents():
+        builds.append(1)
+        started.set()
+        release.wait(2)
+        return documents()
+
+    thread = threading.Thread(target=search_index.ensure_built, args=(blocking_documents,))
+    thread.start()
+    started.wait(2)
+    search_index.ensure_built(blocking_documents)
+    release.set()
+    thread.join(2)
+    assert builds == [1] and search_index.built
@@ -0,0 +1,92 @@
+import pytest
+
+from conftest import register
+from utils.shelves import ShelfStore, decode_cursor, encode_cursor, paginate, resolve_shelf
+from utils.streaming_services import SERVICE_MAPPING
+
+NETFLIX = "203"
+
+
+def shelf_items(prefix, count):
+    return [{"id": f"{prefix}{index:05d}", "title": f"{prefix} {index}", "content_type": "movie"} for index in range(count)]
+
+
+def test_categories_resolve_to_shelves():
+    assert resolve_shelf("TV Shows") == "shows"
+    assert resolve_shelf("Action & Adventure") == "action"
+    assert resolve_shelf("horror") == "horror"
+    assert resolve_shelf("westerns") is None
+
+
+def test_cursors_round_trip_and_stay_on_their_shelf():
+    cursor = encode_cursor("comedy", 40)
+    assert decode_cursor(cursor, "comedy") == 40
+    assert decode_cursor(cursor, "drama") == 0
+    assert decode_cursor("not a cursor", "comedy") == 0
+    assert decode_cursor(None, "comedy") == 0
+
+
+def test_paginate_walks_the_whole_shelf():
+    items = shelf_items("tt", 45)
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = paginate(items, "comedy", cursor=cursor, page_size=20)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert seen == items
+
+
+def test_shelves_merge_across_services(mongo_db):
+    store = ShelfStore(mongo_db.shelves, fetch=None, service_mapping=SERVICE_MAPPING)
+    netflix, prime = SERVICE_MAPPING[NETFLIX], SERVICE_MAPPING["26"]
+    store._store((netflix, "comedy"), shelf_items("a", 3))
+    store._store((prime, "comedy"), shelf_items("b", 2) + shelf_items("a", 1))
+    merged = store.get_shelf([NETFLIX, "26"], "comedy")
+    assert [item["id"] for item in merged] == ["a00000", "b00000", "a00001", "b00001", "a00002"]
+
+
+@pytest.fixture
+def warm_shelf(app_module, monkeypatch):
+    store = app_module.shelf_store
+    monkeypatch.setattr(store, "ensure_started", lambda: None)
+    monkeypatch.setattr(store, "_items", {(SERVICE_MAPPING[NETFLIX], "comedy"): shelf_items("tt", 45)})
+    return store
+
+
+def test_category_returns_the_whole_shelf_by_default(client, warm_shelf):
+    headers = register(client, streaming_services=[NETFLIX])
+    response = client.get("/api/discover/category/comedy", headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == 45
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_category_pages_when_asked(client, warm_shelf):
+    headers = register(client, streaming_services=[NETFLIX])
+    first = client.get("/api/discover/category/comedy?limit=20", headers=headers)
+    assert [item["id"] for item in first.get_json()] == [f"tt{index:05d}" for index in range(20)]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(f"/api/discover/category/comedy?cursor={cursor}", headers=headers)
+    assert [item["id"] for item in second.get_json()] == [f"tt{index:05d}" for index in range(20, 40)]
+    last = client.get(f"/api/discover/category/comedy?cursor={second.headers['X-Next-Cursor']}&limit=0", headers=headers)
+    assert [item["id"] for item in last.get_json()] == ["tt00040"]
+
+
+def test_cold_category_returns_the_whole_shelf(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module.shelf_store, "ensure_started", lambda: None)
+    monkeypatch.setattr(app_module.shelf_store, "_items", {})
+    monkeypatch.setattr(app_module.shelf_store, "request_refresh", lambda services, shelf: None)
+    results = [
+        {"imdbId": f"tt{index:05d}", "title": f"Title {index}", "type": "movie", "genres": [{"name": "Comedy"}]}
+        for index in range(60)
+    ]
+    monkeypatch.setattr(app_module, "fetch_ranked_results", lambda paths, max_searches=None: [results] + [[]] * (len(paths) - 1))
+
+    headers = register(client, streaming_services=[NETFLIX])
+    response = client.get("/api/discover/category/comedy", headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()) == app_module.config.SHELF_ITEMS_PER_SHELF
+    assert "X-Next-Cursor" not in response.headers
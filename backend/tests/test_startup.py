@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from utils.startup import StartupReport
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_report_times_new_imports_and_phases():
+    report = StartupReport()
+    report.track_imports()
+    try:
+        sys.modules.pop("colorsys", None)
+        import colorsys  # noqa: F401  (any small module not loaded yet)
+        with report.phase("warm up"):
+            time.sleep(0.01)
+    finally:
+        report.finish()
+    stats = report.as_dict()
+    assert "colorsys" in stats["imports_ms"]
+    assert stats["phases_ms"]["warm up"] >= 10
+    assert stats["finished"]
+    # Tracking is off again once startup has finished
+    sys.modules.pop("colorsys", None)
+    import colorsys  # noqa: F401,F811
+    assert report.as_dict()["imports_ms"] == stats["imports_ms"]
+
+
+def test_importing_the_app_stays_light():
+    # A fresh interpreter with an unreachable MongoDB: nothing may connect or pull in the ML stack
+    script = (
+        "import sys, json, app\n"
+        "print(json.dumps({"
+        "'heavy': sorted(m for m in ('pandas', 'sklearn', 'scipy') if m in sys.modules),"
+        "'connected': app.mongo.connected,"
+        "'phases': sorted(app.startup_report.as_dict()['phases_ms'])}))"
+    )
+    env = dict(os.environ, MONGO_URI="mongodb://127.0.0.1:1/media_recommender", INVALIDATION_MODE="off")
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    assert loaded == {"heavy": [], "connected": False, "phases": ["create_app"]}
@@ -0,0 +1,94 @@
+import contextvars
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils import tracing
+
+
+class MemoryWriter:
+    path = "memory"
+
+    def __init__(self):
+        self.records = []
+        self.written = 0
+
+    def write(self, record):
+        self.records.append(record)
+        self.written += 1
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    return tracing.Tracer(MemoryWriter(), sample_rate=0.0, debug_token="secret", profile_dir=str(tmp_path / "profiles"))
+
+
+def spans_by_name(record):
+    return {span["name"]: span for span in record["spans"]}
+
+
+def test_unsampled_requests_record_nothing(tracer):
+    assert tracer.start_request("GET /api/status", {}) is None
+    assert tracing.span("work") is tracing._NULL_SPAN
+    tracing.record_span("upstream", 0.0)
+    assert tracing.current_trace() is None
+
+
+def test_spans_nest_across_threads(tracer):
+    state = tracer.start_request("GET /api/recommendations", {"X-Trace": "1", "X-Debug-Token": "secret"})
+    assert state is not None
+
+    @tracing.traced("transform")
+    def transform():
+        return 1
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with tracing.span("fetch", lists=2) as fetch:
+            futures = [pool.submit(contextvars.copy_context().run, transform) for _ in range(2)]
+            assert [future.result() for future in futures] == [1, 1]
+            fetch.set("done", True)
+    headers = tracer.finish_request(state, status=200)
+
+    record = tracer.writer.records[0]
+    assert headers == {"X-Trace-Id": record["trace_id"]}
+    assert record["status"] == 200 and record["name"] == "GET /api/recommendations"
+    fetch_span = spans_by_name(record)["fetch"]
+    assert fetch_span["attrs"] == {"lists": 2, "done": True}
+    children = [span for span in record["spans"] if span["name"] == "transform"]
+    assert len(children) == 2 and all(span["parent"] == fetch_span["id"] for span in children)
+    assert tracing.current_trace() is None
+
+
+def test_forcing_a_trace_needs_the_token(tracer):
+    assert tracer.start_request("GET /", {"X-Trace": "1", "X-Debug-Token": "wrong"}) is None
+    assert not tracing.Tracer(MemoryWriter(), sample_rate=0.0).is_admin({"X-Debug-Token": ""})
+
+
+def test_profiles_are_written_for_admins(tracer):
+    state = tracer.start_request("GET /api/content/<content_id>", {"X-Profile": "1", "X-Debug-Token": "secret"})
+    sum(range(1000))
+    headers = tracer.finish_request(state)
+    profile = tracer.writer.records[0]["profile"]
+    assert os.path.exists(profile) and headers["X-Profile-File"] == os.path.basename(profile)
+    # Route placeholders don't end up in the file name
+    assert "<" not in os.path.basename(profile)
+
+
+def test_trace_writer_appends_json_lines(tmp_path):
+    writer = tracing.TraceWriter(str(tmp_path / "traces.jsonl"))
+    writer.write({"trace_id": "a"})
+    writer.write({"trace_id": "b"})
+    with open(tmp_path / "traces.jsonl") as trace_file:
+        assert [json.loads(line)["trace_id"] for line in trace_file] == ["a", "b"]
+
+
+def test_forced_trace_through_the_app(client, app_module, monkeypatch):
+    writer = MemoryWriter()
+    monkeypatch.setattr(app_module.tracer, "writer", writer)
+    monkeypatch.setattr(app_module.tracer, "debug_token", "secret")
+    response = client.get("/api/status", headers={"X-Trace": "1", "X-Debug-Token": "secret"})
+    assert response.headers["X-Trace-Id"] == writer.records[0]["trace_id"]
+    assert writer.records[0]["name"] == "GET /api/status" and writer.records[0]["status"] == 200
+    assert "X-Trace-Id" not in client.get("/api/status").headers
@@ -0,0 +1,126 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import register
+from utils.streaming_services import SERVICE_MAPPING
+from utils.trending import TrendingStore, compact_item, merge_ranked_lists
+
+NETFLIX = "203"
+PRIME = "26"
+SERVICES = {NETFLIX: SERVICE_MAPPING[NETFLIX], PRIME: SERVICE_MAPPING[PRIME]}
+
+
+def upstream_item(imdb_id, title="Title"):
+    return {"imdbId": imdb_id, "title": title, "year": 2020, "posterURLs": {"500": "poster.jpg"}, "genres": [{"name": "Drama"}]}
+
+
+class Upstream:
+    """Stand-in for make_api_request that can fail for chosen services."""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+
+    def __call__(self, path):
+        self.calls.append(path)
+        service = path.split("service=")[1].split("&")[0]
+        if service in self.failing:
+            return {}
+        content_type = path.split("type=")[1].split("&")[0]
+        return {"results": [upstream_item(f"{service}-{content_type}-{rank}") for rank in range(3)]}
+
+
+@pytest.fixture
+def upstream():
+    return Upstream()
+
+
+@pytest.fixture
+def store(mongo_db, upstream):
+    return TrendingStore(mongo_db.trending, upstream, SERVICES, items_per_list=2, refresh_interval=3600, retry_interval=60)
+
+
+def test_compact_item_keeps_the_api_fields():
+    item = compact_item(upstream_item("tt1", "Heat"), "series")
+    assert item["id"] == "tt1" and item["content_type"] == "show" and item["poster_url"] == "poster.jpg"
+    assert item["genre_names"] == ["Drama"]
+
+
+def test_merge_interleaves_and_deduplicates():
+    merged = merge_ranked_lists([[{"id": "a"}, {"id": "b"}], [{"id": "a"}, {"id": "c"}, {"id": "d"}]], limit=3)
+    assert [item["id"] for item in merged] == ["a", "b", "c"]
+
+
+def test_refresh_fills_every_list_once(store, upstream):
+    store.refresh_stale()
+    assert len(upstream.calls) == 4
+    assert store.stats()["lists"] == 4 and store.version == 4
+    trending = store.get_trending([NETFLIX, PRIME], limit=10)
+    assert len(trending) == 8
+    # Every list's top item comes before any list's second
+    assert all(item["id"].endswith("-0") for item in trending[:4])
+
+    # Fresh lists aren't fetched again
+    store.refresh_stale()
+    assert len(upstream.calls) == 4
+
+
+def test_failed_lists_back_off_without_blocking_the_others(store, upstream, monkeypatch):
+    upstream.failing.add(SERVICES[PRIME])
+    store.refresh_stale()
+    assert store.stats()["lists"] == 2 and store.stats()["failed_refreshes"] == 2
+    assert store.stats()["retrying"] == 2
+
+    # Within the retry interval the failed lists are left alone
+    upstream.calls.clear()
+    store.refresh_stale()
+    assert upstream.calls == []
+
+    real_monotonic = time.monotonic
+    monkeypatch.setattr("utils.trending.time.monotonic", lambda: real_monotonic() + 61)
+    upstream.failing.clear()
+    store.refresh_stale()
+    assert len(upstream.calls) == 2
+    assert store.stats()["lists"] == 4 and store.stats()["retrying"] == 0
+
+
+def test_stale_lists_are_refreshed_stalest_first(store):
+    store.refresh_stale()
+    keys = store.all_keys()
+    with store._lock:
+        store._refreshed_at[keys[2]] = datetime.utcnow() - timedelta(hours=3)
+        store._refreshed_at[keys[1]] = datetime.utcnow() - timedelta(hours=2)
+    assert store.due_keys() == [keys[2], keys[1]]
+
+
+def test_workers_adopt_each_others_snapshots(store, mongo_db, upstream):
+    store.refresh_stale()
+    other_worker = TrendingStore(mongo_db.trending, upstream, SERVICES, items_per_list=2)
+    other_worker.load()
+    assert other_worker.get_trending([NETFLIX], limit=10) == store.get_trending([NETFLIX], limit=10)
+
+    calls = len(upstream.calls)
+    # Syncing first means the second worker doesn't refetch what the first just stored
+    other_worker.refresh_stale()
+    assert len(upstream.calls) == calls
+
+
+def test_refresh_caches_the_titles(mongo_db, upstream):
+    cached = []
+    store = TrendingStore(mongo_db.trending, upstream, SERVICES, items_per_list=2, on_refresh=lambda items, service: cached.extend(items))
+    store.refresh(SERVICES[NETFLIX], "movie")
+    assert [item["id"] for item in cached] == [f"{SERVICES[NETFLIX]}-movie-0", f"{SERVICES[NETFLIX]}-movie-1"]
+
+
+def test_trending_route_serves_the_snapshot(client, app_module, store, monkeypatch):
+    monkeypatch.setattr(app_module, "trending_store", store)
+    monkeypatch.setattr(store, "ensure_started", lambda: None)
+    store.refresh_stale()
+    headers = register(client, streaming_services=[NETFLIX])
+
+    response = client.get("/api/trending", headers=headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.get_json()] == [item["id"] for item in store.get_trending([NETFLIX], limit=app_module.config.TRENDING_LIMIT)]
+    assert client.get("/api/trending", headers=dict(headers, **{"If-None-Match": response.headers["ETag"]})).status_code == 304
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from benchmarks.fake_rapidapi import synthetic_item
+from utils import upstream
+from utils.upstream import UpstreamParser, compact_item
+
+
+@pytest.fixture(params=["orjson", "json"])
+def parser(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(upstream, "orjson", None)
+    elif upstream.orjson is None:
+        pytest.skip("orjson is not installed")
+    return UpstreamParser()
+
+
+def test_compact_item_keeps_only_what_the_transforms_read():
+    item = synthetic_item(7)
+    item["streamingInfo"]["ca"] = {"netflix": [{"type": "subscription", "link": "ca-link"}]}
+    record = compact_item(item)
+
+    assert set(record) <= set(upstream.ITEM_FIELDS) | {"posterURLs", "streamingInfo"}
+    assert record["imdbId"] == "tt0000007" and record["genres"] == item["genres"]
+    assert set(record["posterURLs"]) == {"original", "500"}
+    assert list(record["streamingInfo"]) == ["us"]
+    for service, options in record["streamingInfo"]["us"].items():
+        assert options == [{"type": "subscription", "link": f"https://www.{service}.example.com/title/7"}]
+
+
+def test_search_pages_keep_paging_fields(parser):
+    body = json.dumps({"results": [synthetic_item(1), synthetic_item(2)], "total_pages": 20, "extra": {"a": 1}}).encode("utf-8")
+    payload = parser.parse(body, "/search/basic?service=netflix&type=movie&page=1")
+
+    assert payload["total_pages"] == 20 and "extra" not in payload
+    assert [item["imdbId"] for item in payload["results"]] == ["tt0000001", "tt0000002"]
+    assert "backdropURLs" not in payload["results"][0]
+
+    stats = parser.stats()["families"]["/search/basic"]
+    assert stats["calls"] == 1 and stats["items"] == 2 and stats["bytes"] == len(body)
+
+
+def test_get_bodies_are_one_title_unless_they_are_errors(parser):
+    assert parser.parse(json.dumps(synthetic_item(3, "series")).encode("utf-8"), "/get/series/id/tt0000003")["imdbId"] == "tt0000003"
+    assert parser.parse(b'{"message": "Not found"}', "/get/movie/id/tt9") == {"message": "Not found"}
+
+
+def test_invalid_json_raises_value_error(parser):
+    with pytest.raises(ValueError):
+        parser.parse(b"<html>Bad gateway</html>", "/search/title?title=x")
@@ -0,0 +1,109 @@
+import threading
+
+from conftest import register
+from utils.user_cache import UserProfileCache
+
+
+class RacingCollection:
+    """Wraps a users collection so an update can land in the middle of a cache fill."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.during_read = None
+
+    def find_one(self, *args, **kwargs):
+        profile = self.collection.find_one(*args, **kwargs)
+        if self.during_read is not None:
+            during_read, self.during_read = self.during_read, None
+            during_read()
+        return profile
+
+
+def test_hits_after_first_read(mongo_db):
+    user_id = mongo_db.users.insert_one({"email": "a@example.com", "password": "x", "streaming_services": ["203"]}).inserted_id
+    cache = UserProfileCache(mongo_db.users)
+    assert cache.get(user_id)["streaming_services"] == ["203"]
+    assert "password" not in cache.get(user_id)
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidate_drops_the_cached_profile(mongo_db):
+    user_id = mongo_db.users.insert_one({"streaming_services": ["203"]}).inserted_id
+    cache = UserProfileCache(mongo_db.users)
+    cache.get(user_id)
+    mongo_db.users.update_one({"_id": user_id}, {"$set": {"streaming_services": ["26"]}})
+    cache.invalidate(user_id)
+    assert cache.get(user_id)["streaming_services"] == ["26"]
+
+
+def test_update_during_a_miss_is_not_cached_stale(mongo_db):
+    user_id = mongo_db.users.insert_one({"streaming_services": ["203"]}).inserted_id
+    users = RacingCollection(mongo_db.users)
+    cache = UserProfileCache(users, ttl=300)
+
+    def update():
+        mongo_db.users.update_one({"_id": user_id}, {"$set": {"streaming_services": ["26"]}})
+        cache.invalidate(user_id)
+
+    # The first read loads the old profile, then the update and its invalidation land
+    users.during_read = update
+    assert cache.get(user_id)["streaming_services"] == ["203"]
+    assert cache.get(user_id)["streaming_services"] == ["26"]
+    assert cache.stats()["stale_fills"] == 1
+
+
+def test_clear_during_a_miss_is_not_cached_stale(mongo_db):
+    user_id = mongo_db.users.insert_one({"streaming_services": ["203"]}).inserted_id
+    users = RacingCollection(mongo_db.users)
+    cache = UserProfileCache(users, ttl=300)
+
+    def update():
+        mongo_db.users.update_one({"_id": user_id}, {"$set": {"streaming_services": ["26"]}})
+        cache.clear()
+
+    users.during_read = update
+    cache.get(user_id)
+    assert cache.get(user_id)["streaming_services"] == ["26"]
+
+
+def test_forgotten_invalidations_stay_conservative(mongo_db):
+    user_id = mongo_db.users.insert_one({"streaming_services": ["203"]}).inserted_id
+    users = RacingCollection(mongo_db.users)
+    cache = UserProfileCache(users, ttl=300, max_entries=2)
+
+    def update():
+        mongo_db.users.update_one({"_id": user_id}, {"$set": {"streaming_services": ["26"]}})
+        cache.invalidate(user_id)
+        # Push the user's invalidation out of the bounded record
+        for other in ("a" * 24, "b" * 24, "c" * 24):
+            cache.invalidate(other)
+
+    users.during_read = update
+    cache.get(user_id)
+    assert cache.get(user_id)["streaming_services"] == ["26"]
+
+
+def test_concurrent_reads_and_updates_end_fresh(mongo_db):
+    user_id = mongo_db.users.insert_one({"version": 0}).inserted_id
+    cache = UserProfileCache(mongo_db.users, ttl=300, projection={"version": 1})
+
+    def reader():
+        for _ in range(200):
+            cache.get(user_id)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for version in range(1, 51):
+        mongo_db.users.update_one({"_id": user_id}, {"$set": {"version": version}})
+        cache.invalidate(user_id)
+    for thread in threads:
+        thread.join()
+    assert cache.get(user_id)["version"] == 50
+
+
+def test_saving_preferences_is_visible_immediately(client):
+    headers = register(client, streaming_services=["203"], preferences={"genres": ["Drama"]})
+    assert client.get("/api/user/streaming_services", headers=headers).get_json() == {"streaming_services": ["203"]}
+    assert client.put("/api/user/streaming_services", json={"streaming_services": ["26"]}, headers=headers).status_code == 200
+    assert client.get("/api/user/streaming_services", headers=headers).get_json() == {"streaming_services": ["26"]}
@@ -0,0 +1,56 @@
+import gc
+import os
+import runpy
+
+import pytest
+
+from utils import database
+
+
+@pytest.fixture
+def wsgi(app_module, monkeypatch):
+    import wsgi
+
+    # A frozen heap would outlive the test
+    monkeypatch.setattr(gc, "freeze", lambda: None)
+    return wsgi
+
+
+def test_preload_loads_shared_data_and_drops_the_client(wsgi, app_module):
+    app_module.catalog.upsert_summaries([{"id": "tt0000001", "title": "Heat", "content_type": "movie"}])
+    wsgi.preload()
+
+    assert app_module.content_index.built
+    assert [result["id"] for result in app_module.content_index.search("heat")] == ["tt0000001"]
+    assert not database.connection.connected
+    assert "preload" in wsgi.startup_report.phases
+
+
+def test_worker_hooks_start_and_stop_every_component(wsgi, monkeypatch):
+    calls = []
+    for component in (wsgi.trending_store, wsgi.shelf_store, wsgi.invalidation_bus, wsgi.details_revalidator):
+        name = type(component).__name__
+        monkeypatch.setattr(component, "ensure_started", lambda name=name: calls.append(("start", name)))
+        monkeypatch.setattr(component, "stop", lambda name=name: calls.append(("stop", name)))
+    database.get_client()
+
+    wsgi.init_worker()
+    assert not database.connection.connected
+    wsgi.shutdown_worker()
+    assert sorted(calls) == sorted(
+        (action, name)
+        for action in ("start", "stop")
+        for name in ("TrendingStore", "ShelfStore", "InvalidationBus", "DetailsRevalidator")
+    )
+
+
+def test_gunicorn_settings_come_from_config(monkeypatch, tmp_path):
+    monkeypatch.setenv("GUNICORN_THREADS", "4")
+    monkeypatch.chdir(tmp_path)
+    settings = runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py"))
+
+    assert settings["worker_class"] == "gthread"
+    assert settings["threads"] == settings["settings"].GUNICORN_THREADS
+    assert settings["preload_app"] is settings["settings"].GUNICORN_PRELOAD
+    assert all(callable(settings[hook]) for hook in ("when_ready", "post_fork", "worker_exit"))
+    assert (tmp_path / "logs").is_dir()
@@ -0,0 +1,273 @@
+"""
+Darick Le
+October 19 2026
+Canonical content catalog.
+Every title we know about is stored once in the catalog collection, replacing the
+overlapping content, content_cache and content_details collections. Summary reads use a
+projection that leaves out the detail-only fields (cast, directors, sources), and detail
+reads return the whole document. Both app.py and StreamingService go through this module.
+Documents can optionally be stored in the compact encoding from catalog_codec; callers
+always see the API field names. New titles are stored with their content id as _id, so change
+events name the title without a document lookup.
+
+The module can also be run as a migration tool that merges the old collections, or that
+rewrites every document in the configured encoding:
+
+    python -m utils.catalog migrate [--drop]
+    python -m utils.catalog recode
+
+recode also moves titles stored before they were keyed on their content id.
+"""
+
+from datetime import datetime
+
+from pymongo import ASCENDING, DeleteOne, IndexModel, InsertOne, ReplaceOne, UpdateOne
+
+try:
+    from backend.utils.catalog_codec import CatalogCodec
+except ImportError:
+    from utils.catalog_codec import CatalogCodec
+
+# Fields only present once full details have been fetched (genre names are on summaries too,
+# since recommendations rerank cached titles by genre)
+DETAIL_ONLY_FIELDS = ("cast", "directors", "sources", "details_cached", "details_refreshed_at")
+
+# Projection for list views: everything except the detail-only fields
+SUMMARY_PROJECTION = {"_id": 0, **{field: 0 for field in DETAIL_ONLY_FIELDS}}
+
+# Projection for detail views
+DETAIL_PROJECTION = {"_id": 0}
+
+# Projection for picking titles to revalidate
+REVALIDATION_PROJECTION = {"_id": 0, "id": 1, "content_type": 1, "details_refreshed_at": 1}
+
+# Projection used to build the local search index
+SEARCH_PROJECTION = {
+    "_id": 0, "id": 1, "title": 1, "year": 1, "poster_url": 1,
+    "content_type": 1, "cast": 1, "directors": 1
+}
+
+# Legacy collections merged by the migration, lowest precedence first
+LEGACY_COLLECTIONS = ("content", "content_cache", "content_details")
+
+
+class Catalog:
+    """Data access layer for the canonical catalog collection."""
+
+    def __init__(self, collection, meta_collection=None, codec=None):
+        self.collection = collection
+        self.meta_collection = meta_collection
+        self.codec = codec or CatalogCodec({})
+        self._indexes_ready = False
+        # Stored-shape projections for the configured encoding
+        self._summary_projection = self.codec.encode_projection(SUMMARY_PROJECTION)
+        self._search_projection = self.codec.encode_projection(SEARCH_PROJECTION)
+        self._revalidation_projection = self.codec.encode_projection(REVALIDATION_PROJECTION)
+
+    def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        content_type = self.codec.field("content_type")
+        service_ids = self.codec.field("service_ids")
+        if self.codec.compact:
+            # $bitsAnySet can't use index bounds, so lead with the content type
+            service_index = [(content_type, ASCENDING), (service_ids, ASCENDING)]
+        else:
+            service_index = [(service_ids, ASCENDING), (content_type, ASCENDING)]
+        try:
+            self.collection.create_indexes([
+                IndexModel([("id", ASCENDING)], unique=True),
+                IndexModel(service_index),
+                IndexModel([(content_type, ASCENDING)]),
+                IndexModel([(self.codec.field("details_refreshed_at"), ASCENDING)])
+            ])
+            self._indexes_ready = True
+        except Exception as e:
+            print(f"Error creating catalog indexes: {str(e)}")
+
+    def _summary_update(self, item, service_id=None):
+        # Only set fields we actually have so summaries never wipe out stored details
+        update = self.codec.summary_update(item, service_id)
+        update["$setOnInsert"] = {"_id": item["id"]}
+        return update
+
+    def upsert_summary(self, item, service_id=None):
+        """Insert or update the summary fields of one title."""
+        if not item or not item.get("id"):
+            return
+        self.ensure_indexes()
+        self.collection.update_one({"id": item["id"]}, self._summary_update(item, service_id), upsert=True)
+
+    def upsert_summaries(self, items, service_id=None):
+        """Insert or update many titles with a single bulk write."""
+        operations = [
+            UpdateOne({"id": item["id"]}, self._summary_update(item, service_id), upsert=True)
+            for item in items if item and item.get("id")
+        ]
+        if not operations:
+            return 0
+        self.ensure_indexes()
+        self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def upsert_details(self, details):
+        """Store the full details of one title, stamped with when availability was fetched."""
+        if not details or not details.get("id"):
+            return
+        self.ensure_indexes()
+        fields = {key: value for key, value in details.items() if key not in ("_id", "service_ids")}
+        fields["details_cached"] = True
+        fields.setdefault("details_refreshed_at", datetime.utcnow())
+        self.collection.update_one(
+            {"id": details["id"]},
+            {"$set": self.codec.encode(fields), "$setOnInsert": {"_id": details["id"]}},
+            upsert=True
+        )
+
+    def get_summary(self, content_id):
+        return self.codec.decode(self.collection.find_one({"id": content_id}, self._summary_projection))
+
+    def get_details(self, content_id):
+        """Return the whole catalog document for a title (details may not be cached yet)."""
+        return self.codec.decode(self.collection.find_one({"id": content_id}, DETAIL_PROJECTION))
+
+    def get_many(self, content_ids, detail=False):
+        """Fetch several titles with one $in query; returns a dict keyed by content id."""
+        if not content_ids:
+            return {}
+        projection = DETAIL_PROJECTION if detail else self._summary_projection
+        cursor = self.collection.find({"id": {"$in": list(content_ids)}}, projection)
+        return {doc["id"]: self.codec.decode(doc) for doc in cursor}
+
+    def find(self, query=None, limit=0, detail=False):
+        """Return titles matching a query (on API field names) as a list."""
+        query = self.codec.encode_query(query or {})
+        query.setdefault("id", {"$exists": True, "$ne": None})
+        projection = DETAIL_PROJECTION if detail else self._summary_projection
+        cursor = self.collection.find(query, projection)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [self.codec.decode(doc) for doc in cursor]
+
+    def find_for_services(self, service_ids, content_type=None, limit=0):
+        """Return titles available on any of the given services."""
+        query = {"service_ids": {"$in": [str(sid) for sid in service_ids]}}
+        if content_type:
+            query["content_type"] = content_type
+        return self.find(query, limit=limit)
+
+    def find_stale_details(self, refreshed_before, limit=500):
+        """Titles with details last fetched before `refreshed_before` (or never stamped), oldest first."""
+        refreshed_at = self.codec.field("details_refreshed_at")
+        query = {
+            self.codec.field("details_cached"): True,
+            "$or": [{refreshed_at: {"$lt": refreshed_before}}, {refreshed_at: {"$exists": False}}]
+        }
+        cursor = self.collection.find(query, self._revalidation_projection).sort(refreshed_at, ASCENDING).limit(limit)
+        return [self.codec.decode(doc) for doc in cursor]
+
+    def search_documents(self):
+        """Iterate over the fields the local search index needs for every title."""
+        cursor = self.collection.find({"id": {"$exists": True, "$ne": None}}, self._search_projection)
+        return (self.codec.decode(doc) for doc in cursor)
+
+    def get_meta(self, key):
+        if self.meta_collection is None:
+            return None
+        doc = self.meta_collection.find_one({"_id": key})
+        return doc.get("value") if doc else None
+
+    def set_meta(self, key, value):
+        if self.meta_collection is None:
+            return
+        self.meta_collection.update_one({"_id": key}, {"$set": {"value": value}}, upsert=True)
+
+    def migrate(self, db, batch_size=500, drop=False):
+        """
+        Merge the legacy content, content_cache and content_details collections into the catalog.
+
+        Collections are applied from least to most detailed so detail documents win on
+        conflicting fields. The migration is idempotent; with drop=True the legacy
+        collections are dropped afterwards.
+        """
+        self.ensure_indexes()
+        counts = {}
+        for name in LEGACY_COLLECTIONS:
+            collection = db[name]
+            operations = []
+            count = 0
+            for doc in collection.find({"id": {"$exists": True, "$ne": None}}, {"_id": 0}):
+                doc.pop("type", None)
+                if name == "content_details" or doc.get("details_cached"):
+                    doc["details_cached"] = True
+                operations.append(UpdateOne({"id": doc["id"]}, self._summary_update(doc), upsert=True))
+                count += 1
+                if len(operations) >= batch_size:
+                    self.collection.bulk_write(operations, ordered=False)
+                    operations = []
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+            counts[name] = count
+
+        # Carry over the StreamingService refresh timestamp
+        last_update = db.content_cache.find_one({"type": "last_update"})
+        if last_update and last_update.get("timestamp"):
+            self.set_meta("last_update", last_update["timestamp"])
+
+        if drop:
+            for name in LEGACY_COLLECTIONS:
+                db.drop_collection(name)
+
+        return counts
+
+    def recode(self, batch_size=500):
+        """
+        Rewrite every document in the configured encoding (either encoding can be read).
+
+        Documents written before titles were keyed on their content id are moved to that _id,
+        so change events for them name the title.
+        """
+        reader = CatalogCodec(self.codec.services.service_mapping, compact=True)
+        operations = []
+        count = 0
+        for doc in self.collection.find({"id": {"$exists": True, "$ne": None}}):
+            stored = self.codec.encode(reader.decode(doc))
+            if doc["_id"] == doc["id"]:
+                operations.append(ReplaceOne({"_id": doc["_id"]}, stored))
+            else:
+                # The unique id index only allows the new document once the old one is gone
+                stored["_id"] = doc["id"]
+                operations.extend([DeleteOne({"_id": doc["_id"]}), InsertOne(stored)])
+            count += 1
+            if len(operations) >= batch_size:
+                self.collection.bulk_write(operations)
+                operations = []
+        if operations:
+            self.collection.bulk_write(operations)
+        # Indexes name the stored keys, so rebuild them for the new encoding
+        self._indexes_ready = False
+        self.ensure_indexes()
+        return count
+
+
+if __name__ == "__main__":
+    import sys
+
+    import config
+    from utils.database import db
+    from utils.streaming_services import SERVICE_MAPPING
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("migrate", "recode"):
+        print("Usage: python -m utils.catalog migrate [--drop] | recode")
+        sys.exit(1)
+
+    catalog = Catalog(db.catalog, db.catalog_meta, CatalogCodec(SERVICE_MAPPING, compact=config.CATALOG_COMPACT_STORAGE))
+    started_at = datetime.utcnow()
+    if sys.argv[1] == "recode":
+        count = catalog.recode()
+        print(f"Rewrote {count} documents ({'compact' if catalog.codec.compact else 'standard'} encoding)")
+        sys.exit(0)
+    counts = catalog.migrate(db, drop="--drop" in sys.argv)
+    for name, count in counts.items():
+        print(f"Merged {count} documents from {name}")
+    print(f"Catalog now holds {db.catalog.count_documents({})} titles ({(datetime.utcnow() - started_at).total_seconds():.1f}s)")
@@ -0,0 +1,168 @@
+"""
+Darick Le
+October 19 2026
+Storage encoding for catalog documents.
+The compact encoding stores every field under a short key and replaces the service_ids
+string array with an integer bitmask of the services a title is available on, so
+availability checks become a single $bitsAnySet query in MongoDB or an integer AND in
+Python. The codec translates documents, queries and projections between the stored shape
+and the shape the API returns, so callers never see the short keys.
+"""
+
+# Long field name -> short stored key
+FIELD_CODES = {
+    "title": "t",
+    "year": "y",
+    "content_type": "ct",
+    "runtime_minutes": "rt",
+    "us_rating": "r",
+    "poster_url": "p",
+    "plot_overview": "o",
+    "streaming_service": "ss",
+    "service_ids": "sm",
+    "genre_names": "g",
+    "cast": "c",
+    "directors": "d",
+    "sources": "src",
+    "details_cached": "dc",
+    "details_refreshed_at": "dr",
+    "cached_at": "ca"
+}
+FIELD_NAMES = {code: name for name, code in FIELD_CODES.items()}
+
+# Source fields; the provider name is rebuilt from the source id so it isn't stored
+SOURCE_FIELD_CODES = {
+    "source_id": "s",
+    "type": "ty",
+    "web_url": "u"
+}
+SOURCE_FIELD_NAMES = {code: name for name, code in SOURCE_FIELD_CODES.items()}
+
+
+class ServiceBitmask:
+    """
+    Maps streaming service ids to bit positions.
+
+    Bits follow the order of SERVICE_MAPPING, so new services must be appended to the
+    mapping rather than inserted, or stored masks would point at the wrong services.
+    """
+
+    def __init__(self, service_mapping):
+        self.service_mapping = dict(service_mapping)
+        self.bits = {service_id: 1 << position for position, service_id in enumerate(self.service_mapping)}
+
+    def bit(self, service_id):
+        return self.bits.get(str(service_id), 0)
+
+    def mask(self, service_ids):
+        """Combine service ids into one integer bitmask (unknown ids are ignored)."""
+        mask = 0
+        for service_id in service_ids or ():
+            mask |= self.bit(service_id)
+        return mask
+
+    def service_ids(self, mask):
+        """Expand a bitmask back into the list of service ids."""
+        return [service_id for service_id, bit in self.bits.items() if mask & bit]
+
+    def name(self, service_id):
+        return self.service_mapping.get(str(service_id), "")
+
+
+class CatalogCodec:
+    """Translates catalog documents between the API shape and the stored shape."""
+
+    def __init__(self, service_mapping, compact=False):
+        self.compact = compact
+        self.services = ServiceBitmask(service_mapping)
+
+    def field(self, name):
+        """Stored key for an API field name."""
+        return FIELD_CODES.get(name, name) if self.compact else name
+
+    def encode(self, doc):
+        """API-shaped document -> stored document."""
+        if not self.compact:
+            return dict(doc)
+        encoded = {}
+        for key, value in doc.items():
+            if key == "service_ids":
+                value = self.services.mask(value)
+            elif key == "sources":
+                value = [self._encode_source(source) for source in value or []]
+            encoded[FIELD_CODES.get(key, key)] = value
+        return encoded
+
+    def decode(self, doc):
+        """Stored document -> API-shaped document (long-key documents pass through untouched)."""
+        if doc is None or not self.compact:
+            return doc
+        decoded = {}
+        for key, value in doc.items():
+            name = FIELD_NAMES.get(key, key)
+            if name == "service_ids" and isinstance(value, int):
+                value = self.services.service_ids(value)
+            elif name == "sources":
+                value = [self._decode_source(source) for source in value or []]
+            decoded[name] = value
+        return decoded
+
+    def _encode_source(self, source):
+        return {
+            SOURCE_FIELD_CODES[key]: value
+            for key, value in source.items()
+            if key in SOURCE_FIELD_CODES
+        }
+
+    def _decode_source(self, source):
+        if "source_id" in source:
+            return source
+        decoded = {name: source.get(code, "") for code, name in SOURCE_FIELD_NAMES.items()}
+        decoded["name"] = self.services.name(decoded["source_id"])
+        return decoded
+
+    def encode_projection(self, projection):
+        if not self.compact:
+            return projection
+        return {FIELD_CODES.get(key, key): value for key, value in projection.items()}
+
+    def encode_query(self, query):
+        """Translate a top-level query on API field names to the stored keys."""
+        if not self.compact:
+            return dict(query)
+        encoded = {}
+        for key, condition in query.items():
+            if key == "service_ids":
+                encoded[FIELD_CODES[key]] = self._service_condition(condition)
+            else:
+                encoded[FIELD_CODES.get(key, key)] = condition
+        return encoded
+
+    def _service_condition(self, condition):
+        # {"$in": [...]} or a single id -> any of those service bits set
+        if isinstance(condition, dict) and "$in" in condition:
+            return {"$bitsAnySet": self.services.mask(condition["$in"])}
+        if isinstance(condition, (str, int)):
+            return {"$bitsAnySet": self.services.bit(condition)}
+        return condition
+
+    def service_query(self, service_ids):
+        """Query matching titles available on any of the given services."""
+        return self.encode_query({"service_ids": {"$in": [str(sid) for sid in service_ids]}})
+
+    def summary_update(self, item, service_id=None):
+        """Update document that merges a summary without wiping out stored details."""
+        fields = {
+            key: value for key, value in item.items()
+            if key not in ("_id", "service_ids") and value is not None
+        }
+        update = {"$set": self.encode(fields)}
+        service_ids = [str(sid) for sid in item.get("service_ids") or [] if sid]
+        if service_id:
+            service_ids.append(str(service_id))
+        if service_ids:
+            if self.compact:
+                update["$bit"] = {FIELD_CODES["service_ids"]: {"or": self.services.mask(service_ids)}}
+            else:
+                update["$addToSet"] = {"service_ids": {"$each": service_ids}}
+        return update
@@ -0,0 +1,221 @@
+"""
+Darick Le
+October 19 2026
+Shared MongoDB access.
+Every module in a process goes through one MongoClient, so there is a single connection pool
+and one set of monitoring threads per worker instead of one per module. The client is created
+lazily: creating it resolves DNS (SRV records for mongodb+srv URIs) and starts background
+threads, so doing it at import time slows down every worker start. LazyDatabase and
+LazyCollection stand in for the pymongo objects until first use, so module-level code can still
+write `db.catalog` without connecting.
+
+Two database handles are exported:
+    db        primary reads and acknowledged writes, for user data
+    cache_db  configurable read preference and write concern, for cached upstream data
+              (catalog, trending, shelves, search results) that can tolerate stale reads
+
+The client is dropped in forked children so pre-forking servers never share sockets with
+the parent; each worker connects again on first use.
+"""
+
+import os
+import threading
+
+import certifi
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.read_preferences import ReadPreference
+from pymongo.server_api import ServerApi
+from pymongo.write_concern import WriteConcern
+
+try:
+    from backend import config
+    from backend.utils.metrics import mongo_listener
+    from backend.utils import tracing
+except ImportError:
+    import config
+    from utils.metrics import mongo_listener
+    from utils import tracing
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST
+}
+
+
+class LazyConnection:
+    """Creates a MongoClient from a factory on first use."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+        self._databases = []
+        self.created = 0
+        self.db = self.database()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self.factory()
+                    self.created += 1
+        return self._client
+
+    @property
+    def connected(self):
+        """Whether the client has been created yet."""
+        return self._client is not None
+
+    def database(self, **options):
+        """Lazy handle on the default database; options go to MongoClient.get_database()."""
+        database = LazyDatabase(self, options)
+        self._databases.append(database)
+        return database
+
+    def get_database(self, **options):
+        return self.client.get_database(**options)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+        self.reset()
+
+    def reset(self):
+        """Forget the client without closing it (used in forked children)."""
+        self._client = None
+        self._lock = threading.Lock()
+        for database in self._databases:
+            database._reset()
+
+
+class LazyDatabase:
+    """Stands in for a pymongo Database; collections are resolved when first used."""
+
+    def __init__(self, connection, options=None):
+        self._connection = connection
+        self._options = options or {}
+        self._database = None
+        self._collections = {}
+
+    def _resolve(self):
+        if self._database is None:
+            self._database = self._connection.get_database(**self._options)
+        return self._database
+
+    def _reset(self):
+        self._database = None
+        for collection in self._collections.values():
+            collection._reset()
+
+    def _collection(self, name):
+        if name not in self._collections:
+            self._collections[name] = LazyCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        # Database methods (command, drop_collection, ...) need the real database
+        if name.startswith("_") or hasattr(Database, name):
+            return getattr(self._resolve(), name)
+        return self._collection(name)
+
+    def __getitem__(self, name):
+        return self._collection(name)
+
+
+class LazyCollection:
+    """Stands in for a pymongo Collection until the first operation on it."""
+
+    def __init__(self, database, name):
+        self._database = database
+        self._name = name
+        self._resolved = None
+
+    def _resolve(self):
+        if self._resolved is None:
+            self._resolved = self._database._resolve()[self._name]
+        return self._resolved
+
+    def _reset(self):
+        self._resolved = None
+
+    @property
+    def name(self):
+        return self._name
+
+    def __getattr__(self, name):
+        if name.startswith("_") and not hasattr(Collection, name):
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+
+def create_client():
+    """Create the process-wide MongoClient with the configured pool settings."""
+    options = {}
+    if config.MONGO_TLS:
+        # pymongo rejects TLS options when TLS is off (local and replica-set setups)
+        options["tlsCAFile"] = certifi.where()
+    return MongoClient(
+        config.MONGO_URI,
+        server_api=ServerApi('1'),
+        tls=config.MONGO_TLS,
+        maxPoolSize=config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=config.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=config.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        appname=config.MONGO_APP_NAME,
+        event_listeners=[mongo_listener, tracing.mongo_listener],  # Command latency for /metrics and traces
+        **options
+    )
+
+
+def cache_write_concern():
+    w = config.MONGO_CACHE_WRITE_CONCERN
+    return WriteConcern(w=int(w) if w.isdigit() else w)
+
+
+def cache_read_preference():
+    return READ_PREFERENCES.get(config.MONGO_CACHE_READ_PREFERENCE, ReadPreference.PRIMARY)
+
+
+# One client per process, shared by app.py, StreamingService and the maintenance tools
+connection = LazyConnection(create_client)
+db = connection.db
+cache_db = connection.database(
+    read_preference=cache_read_preference(),
+    write_concern=cache_write_concern()
+)
+
+
+def get_client():
+    return connection.client
+
+
+def reset_after_fork():
+    """Drop the parent's client in a forked child; the child reconnects on first use."""
+    connection.reset()
+
+
+def stats():
+    return {
+        "connected": connection.connected,
+        "clients_created": connection.created,
+        "max_pool_size": config.MONGO_MAX_POOL_SIZE,
+        "min_pool_size": config.MONGO_MIN_POOL_SIZE,
+        "max_idle_time_ms": config.MONGO_MAX_IDLE_TIME_MS,
+        "cache_read_preference": config.MONGO_CACHE_READ_PREFERENCE,
+        "cache_write_concern": config.MONGO_CACHE_WRITE_CONCERN
+    }
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_after_fork)
@@ -0,0 +1,180 @@
+"""
+Darick Le
+October 19 2026
+Request-scoped deadline propagation for the media recommender API.
+Every request handler gets an overall time budget. Upstream RapidAPI calls clip their
+per-attempt timeouts to the remaining budget and skip retries that cannot finish in time,
+and MongoDB operations issued during the request inherit the same deadline through
+pymongo's client-side operation timeout. The remaining budget at the end of each request
+is recorded in a histogram so the budget can be tuned.
+"""
+
+import contextvars
+import threading
+import time
+
+try:
+    import pymongo
+except ImportError:  # pragma: no cover - pymongo is a hard dependency of the backend
+    pymongo = None
+
+# Upper bounds (in seconds) of the remaining-budget histogram buckets
+BUDGET_BUCKETS = (0.0, 0.25, 0.5, 1.0, 2.0, 3.0, 4.0, 5.0, 7.5, 10.0)
+
+# Minimum time an upstream attempt needs to have a realistic chance of finishing
+MIN_ATTEMPT_SECONDS = 1.0
+
+_current_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class Deadline:
+    """A fixed point in time by which the current request must be finished."""
+
+    def __init__(self, budget):
+        self.budget = float(budget)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.budget
+        self._mongo_timeout = None
+        self._token = None
+
+    def remaining(self):
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def can_afford(self, seconds, min_attempt=None):
+        """Check whether waiting `seconds` still leaves time for one more attempt."""
+        if min_attempt is None:
+            min_attempt = MIN_ATTEMPT_SECONDS
+        return self.remaining() >= seconds + min_attempt
+
+
+class BudgetHistogram:
+    """Thread-safe cumulative histogram of remaining request budget."""
+
+    def __init__(self, buckets=BUDGET_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+            self.exhausted = 0
+            self.skipped_calls = 0
+            self.skipped_retries = 0
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self._sum += value
+            self._count += 1
+            if value <= 0.0:
+                self.exhausted += 1
+
+    def record_skipped_call(self):
+        with self._lock:
+            self.skipped_calls += 1
+
+    def record_skipped_retry(self):
+        with self._lock:
+            self.skipped_retries += 1
+
+    def snapshot(self):
+        """Return the histogram as a JSON-serializable dictionary."""
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = cumulative + self._counts[-1]
+            return {
+                "buckets": buckets,
+                "count": self._count,
+                "sum": round(self._sum, 6),
+                "exhausted": self.exhausted,
+                "skipped_upstream_calls": self.skipped_calls,
+                "skipped_retries": self.skipped_retries,
+            }
+
+
+remaining_budget_histogram = BudgetHistogram()
+
+
+def start(budget):
+    """Start a deadline for the current request and bind MongoDB operations to it."""
+    request_deadline = Deadline(budget)
+    request_deadline._token = _current_deadline.set(request_deadline)
+    if pymongo is not None and hasattr(pymongo, "timeout"):
+        request_deadline._mongo_timeout = pymongo.timeout(budget)
+        request_deadline._mongo_timeout.__enter__()
+    return request_deadline
+
+
+def finish():
+    """End the current request's deadline and record how much budget was left."""
+    request_deadline = _current_deadline.get()
+    if request_deadline is None:
+        return None
+    if request_deadline._mongo_timeout is not None:
+        request_deadline._mongo_timeout.__exit__(None, None, None)
+        request_deadline._mongo_timeout = None
+    try:
+        _current_deadline.reset(request_deadline._token)
+    except ValueError:
+        # Token was created in a different context; just clear it
+        _current_deadline.set(None)
+    remaining_budget_histogram.observe(request_deadline.remaining())
+    return request_deadline
+
+
+def current():
+    """Return the deadline of the current request, or None outside a request."""
+    return _current_deadline.get()
+
+
+def remaining(default=None):
+    request_deadline = _current_deadline.get()
+    if request_deadline is None:
+        return default
+    return request_deadline.remaining()
+
+
+def attempt_timeout(timeout):
+    """
+    Clip a per-attempt timeout to the remaining request budget.
+
+    Returns None when there is not enough budget left to start an attempt.
+    """
+    request_deadline = _current_deadline.get()
+    if request_deadline is None:
+        return timeout
+    left = request_deadline.remaining()
+    if left < MIN_ATTEMPT_SECONDS:
+        remaining_budget_histogram.record_skipped_call()
+        return None
+    return min(timeout, left)
+
+
+def can_retry_after(backoff):
+    """Check whether a retry after sleeping `backoff` seconds can still finish in time."""
+    request_deadline = _current_deadline.get()
+    if request_deadline is None:
+        return True
+    if request_deadline.can_afford(backoff):
+        return True
+    remaining_budget_histogram.record_skipped_retry()
+    return False
@@ -0,0 +1,127 @@
+"""
+Darick Le
+October 19 2026
+Diversity reranking for merged candidate lists.
+Candidates gathered from several services and content types are reordered with maximal
+marginal relevance (MMR): each pick is the candidate with the best
+    (1 - diversity) * relevance - diversity * (highest similarity to anything already picked)
+so a run of near-identical titles (same genres, same type) is broken up by the next most
+relevant title that differs from them.
+
+Titles are described by one-hot genre and content type features, L2-normalized so the
+similarity of two titles is the cosine of their feature rows. All pairwise similarities come
+from matrix-vector products with the picked titles' rows, and every pick updates the running
+maximum similarity with a single vector operation, so reranking a few hundred candidates takes
+a couple of milliseconds (see benchmarks/rerank_bench.py). numpy is imported on the first
+rerank rather than at startup, since it's the slowest import in the app.
+
+Relevance combines the candidate's merged rank, the share of its genres the user prefers and,
+when given, its Bayesian user-rating score (see utils.ratings).
+"""
+
+try:
+    from backend.utils.ratings import MAX_RATING, MIN_RATING
+except ImportError:
+    from utils.ratings import MAX_RATING, MIN_RATING
+
+
+def item_genres(item):
+    """Genre names of an upstream record ("genres") or a stored document ("genre_names")."""
+    names = item.get("genre_names")
+    if names is not None:
+        return names
+    return [genre["name"] for genre in item.get("genres") or () if "name" in genre]
+
+
+def item_type(item):
+    content_type = item.get("type") or item.get("content_type") or ""
+    return "movie" if content_type == "movie" else "show"
+
+
+def feature_matrix(items):
+    """
+    Row-normalized genre and content type features.
+
+    Returns (features, genre_columns): an (n, d) float32 matrix and the column of each
+    lowercased genre name.
+    """
+    import numpy as np
+
+    # Column 0 marks movies, column 1 shows; genres (as named upstream) follow
+    columns = {}
+    rows, cols = [], []
+    for row, item in enumerate(items):
+        rows.append(row)
+        cols.append(0 if (item.get("type") or item.get("content_type")) == "movie" else 1)
+        for name in item_genres(item):
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = len(columns) + 2
+            rows.append(row)
+            cols.append(column)
+
+    features = np.zeros((len(items), len(columns) + 2), dtype=np.float32)
+    features[rows, cols] = 1.0
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    features /= np.maximum(norms, 1e-12)
+    return features, {name.lower(): column for name, column in columns.items()}
+
+
+def relevance_scores(items, features, genre_columns, preferred_genres=(), rating_scores=None,
+                     genre_weight=0.3, rating_weight=0.2):
+    """Relevance in [0, 1] from merged rank, preferred genres and user-rating scores."""
+    import numpy as np
+
+    n = len(items)
+    # Earlier in the merged (interleaved popularity) order is better
+    relevance = 1.0 - np.arange(n, dtype=np.float32) / max(n, 1)
+    weight = 1.0
+
+    preferred = [genre_columns[genre.lower()] for genre in preferred_genres if genre.lower() in genre_columns]
+    if preferred and genre_weight:
+        genre_hits = (features[:, preferred] > 0).sum(axis=1)
+        genre_counts = np.maximum((features[:, 2:] > 0).sum(axis=1), 1)
+        relevance = relevance + genre_weight * genre_hits / genre_counts
+        weight += genre_weight
+
+    if rating_scores and rating_weight:
+        scores = np.array([rating_scores.get(item.get("imdbId") or item.get("id"), 0.0) for item in items], dtype=np.float32)
+        scores = np.clip((scores - MIN_RATING) / (MAX_RATING - MIN_RATING), 0.0, 1.0)
+        relevance = relevance + rating_weight * scores
+        weight += rating_weight
+    return relevance / weight
+
+
+def mmr_order(features, relevance, limit, diversity=0.3):
+    """Indices of up to `limit` rows in MMR order."""
+    import numpy as np
+
+    n = features.shape[0]
+    limit = min(limit, n)
+    if limit <= 0:
+        return []
+    # Only the similarity rows of picked titles are ever needed, so they're computed per pick
+    # (limit matrix-vector products) instead of as the full n x n matrix
+    max_similarity = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    weighted_relevance = (1.0 - diversity) * relevance
+    order = []
+    for _ in range(limit):
+        marginal = np.where(available, weighted_relevance - diversity * max_similarity, -np.inf)
+        pick = int(np.argmax(marginal))
+        order.append(pick)
+        available[pick] = False
+        np.maximum(max_similarity, features @ features[pick], out=max_similarity)
+    return order
+
+
+def rerank(items, limit, preferred_genres=(), rating_scores=None, diversity=0.3, genre_weight=0.3, rating_weight=0.2):
+    """Return up to `limit` of the merged candidates, reordered for relevance and variety."""
+    if not items:
+        return []
+    features, genre_columns = feature_matrix(items)
+    relevance = relevance_scores(
+        items, features, genre_columns, preferred_genres, rating_scores,
+        genre_weight=genre_weight, rating_weight=rating_weight
+    )
+    return [items[index] for index in mmr_order(features, relevance, limit, diversity)]
@@ -0,0 +1,238 @@
+"""
+Darick Le
+October 19 2026
+User interactions (likes and dislikes) stored in their own indexed collection.
+Each interaction is a small document (user_id, content_id, signal, timestamp) instead of an
+element of an ever-growing array inside the user document. For discover exclusion, each
+user's seen titles are loaded once into a compact Bloom filter kept in memory.
+
+The module can also be run as a migration tool that moves the legacy liked_content and
+disliked_content arrays out of the users collection:
+
+    python -m utils.interactions migrate [--unset]
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+
+# Interaction signals and the legacy user-document arrays they replace
+SIGNALS = {
+    "like": "liked_content",
+    "dislike": "disliked_content"
+}
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string ids using double hashing."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_ids(cls, ids, error_rate=0.01, headroom=64):
+        ids = list(ids)
+        # Leave room for ids added after the filter was built
+        bloom = cls(len(ids) + headroom, error_rate)
+        for item_id in ids:
+            bloom.add(item_id)
+        return bloom
+
+    def _positions(self, item_id):
+        digest = hashlib.blake2b(str(item_id).encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item_id):
+        for position in self._positions(item_id):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item_id):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item_id))
+
+
+class InteractionStore:
+    """Data access for the interactions collection plus cached per-user seen filters."""
+
+    def __init__(self, collection, seen_ttl=300, max_cached_users=10000):
+        self.collection = collection
+        self.seen_ttl = seen_ttl
+        self.max_cached_users = max_cached_users
+        self._seen = OrderedDict()  # user id -> (expires_at, BloomFilter)
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        try:
+            self.collection.create_indexes([
+                IndexModel([("user_id", ASCENDING), ("content_id", ASCENDING)], unique=True),
+                IndexModel([("user_id", ASCENDING), ("signal", ASCENDING), ("timestamp", DESCENDING)])
+            ])
+            self._indexes_ready = True
+        except Exception as e:
+            print(f"Error creating interaction indexes: {str(e)}")
+
+    def record(self, user_id, content_id, signal, timestamp=None):
+        """Record (or replace) a user's signal for a title."""
+        if signal not in SIGNALS:
+            raise ValueError(f"Invalid signal: {signal}")
+        self.ensure_indexes()
+        self.collection.update_one(
+            {"user_id": str(user_id), "content_id": content_id},
+            {"$set": {"signal": signal, "timestamp": timestamp or datetime.utcnow()}},
+            upsert=True
+        )
+        self._mark_seen(user_id, [content_id])
+
+    def record_many(self, user_id, interactions):
+        """Record several (content_id, signal) pairs for a user with one bulk write."""
+        timestamp = datetime.utcnow()
+        operations = []
+        content_ids = []
+        for content_id, signal in interactions:
+            if signal not in SIGNALS:
+                raise ValueError(f"Invalid signal: {signal}")
+            operations.append(UpdateOne(
+                {"user_id": str(user_id), "content_id": content_id},
+                {"$set": {"signal": signal, "timestamp": timestamp}},
+                upsert=True
+            ))
+            content_ids.append(content_id)
+        if not operations:
+            return 0
+        self.ensure_indexes()
+        self.collection.bulk_write(operations, ordered=False)
+        self._mark_seen(user_id, content_ids)
+        return len(operations)
+
+    def get_content_ids(self, user_id, signal=None, limit=0):
+        """Return the ids of titles a user interacted with, most recent first."""
+        query = {"user_id": str(user_id)}
+        if signal:
+            query["signal"] = signal
+        cursor = self.collection.find(query, {"_id": 0, "content_id": 1}).sort("timestamp", DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [doc["content_id"] for doc in cursor]
+
+    def seen_filter(self, user_id):
+        """Return a Bloom filter of every title the user has liked or disliked."""
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and entry[0] > now:
+                self._seen.move_to_end(key)
+                return entry[1]
+
+        bloom = BloomFilter.from_ids(self.get_content_ids(key))
+
+        with self._lock:
+            self._seen[key] = (now + self.seen_ttl, bloom)
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_cached_users:
+                self._seen.popitem(last=False)
+        return bloom
+
+    def has_seen(self, user_id, content_id):
+        return content_id in self.seen_filter(user_id)
+
+    def _mark_seen(self, user_id, content_ids):
+        with self._lock:
+            entry = self._seen.get(str(user_id))
+        if entry is None:
+            return
+        bloom = entry[1]
+        if bloom.count + len(content_ids) > bloom.size // 10:
+            # Filter is getting full; rebuild it on the next read
+            self.invalidate(user_id)
+            return
+        for content_id in content_ids:
+            bloom.add(content_id)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._seen.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._seen.clear()
+
+    def migrate_user_arrays(self, users_collection, batch_size=500, unset=False):
+        """
+        Copy legacy liked_content/disliked_content arrays into the interactions collection.
+
+        Existing interactions are never overwritten, so the migration can be re-run safely.
+        When unset is True the arrays are removed from the user documents afterwards, batch by
+        batch and only once that batch's interactions have been written, so an interrupted
+        run never loses a user's likes or dislikes.
+        """
+        self.ensure_indexes()
+        migrated_users = 0
+        migrated_interactions = 0
+        operations = []
+        batch_user_ids = []
+        query = {"$or": [{field: {"$exists": True}} for field in SIGNALS.values()]}
+        projection = {field: 1 for field in SIGNALS.values()}
+        timestamp = datetime.utcnow()
+
+        def flush():
+            if operations:
+                # Raises on write errors, leaving this batch's users untouched
+                self.collection.bulk_write(operations, ordered=False)
+            if unset and batch_user_ids:
+                users_collection.update_many(
+                    {"_id": {"$in": batch_user_ids}},
+                    {"$unset": {field: "" for field in SIGNALS.values()}}
+                )
+            operations.clear()
+            batch_user_ids.clear()
+
+        for user in users_collection.find(query, projection):
+            user_id = str(user["_id"])
+            liked = set(user.get("liked_content") or [])
+            for signal, field in SIGNALS.items():
+                for content_id in user.get(field) or []:
+                    # A title in both arrays counts as liked, matching record_preference
+                    if signal == "dislike" and content_id in liked:
+                        continue
+                    operations.append(UpdateOne(
+                        {"user_id": user_id, "content_id": content_id},
+                        {"$setOnInsert": {"signal": signal, "timestamp": timestamp}},
+                        upsert=True
+                    ))
+                    migrated_interactions += 1
+            batch_user_ids.append(user["_id"])
+            migrated_users += 1
+            if len(operations) >= batch_size:
+                flush()
+
+        flush()
+
+        return {"users": migrated_users, "interactions": migrated_interactions}
+
+
+if __name__ == "__main__":
+    import sys
+
+    from utils.database import db
+
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python -m utils.interactions migrate [--unset]")
+        sys.exit(1)
+
+    result = InteractionStore(db.interactions).migrate_user_arrays(db.users, unset="--unset" in sys.argv)
+    print(f"Migrated {result['interactions']} interactions for {result['users']} users")
@@ -0,0 +1,304 @@
+"""
+Darick Le
+October 19 2026
+Cross-worker cache invalidation.
+Each worker process keeps its own caches (user profiles, seen-content filters, serialized
+responses), so a write handled by one worker leaves the others serving old data until their
+TTLs run out. The invalidation bus follows writes made by any worker and evicts the affected
+keys in every process:
+
+    change_stream  one database-level change stream on the watched collections (needs a replica
+                   set; a single-node replica set is enough for local testing). Writes are seen
+                   no matter which code path made them.
+    polling        fallback for standalone servers: publish() also appends the key to an outbox
+                   collection (with a TTL index) that every worker polls. Only writes announced
+                   through publish() are seen.
+
+In "auto" mode the change stream is tried first and polling is used if the server doesn't
+support change streams. A lost resume position clears every subscribed cache instead of
+risking missed invalidations. Lag between the write and the eviction is exported as
+invalidation_lag_seconds.
+
+Run from the backend directory to print invalidation events as they arrive:
+
+    python -m utils.invalidation tail
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+try:
+    from backend.utils import metrics
+except ImportError:
+    from utils import metrics
+
+# Server error codes meaning change streams can't be used or resumed
+CHANGE_STREAMS_UNSUPPORTED = (40573,)  # $changeStream needs a replica set or sharded cluster
+CHANGE_STREAM_HISTORY_LOST = (136, 280, 286)
+# Outbox entries are re-read this far back so slightly out-of-order writes aren't missed
+POLL_OVERLAP_SECONDS = 2.0
+POLL_BATCH = 1000
+
+
+def event_time(change):
+    """When a change happened: wallTime (MongoDB 6.0+) or the cluster time (second precision)."""
+    wall_time = change.get("wallTime")
+    if isinstance(wall_time, datetime):
+        return wall_time.replace(tzinfo=None)
+    cluster_time = change.get("clusterTime")
+    if cluster_time is not None:
+        return cluster_time.as_datetime().astimezone(timezone.utc).replace(tzinfo=None)
+    return None
+
+
+class InvalidationBus:
+    """Dispatches invalidations for watched collections to the caches subscribed to them."""
+
+    def __init__(self, database, outbox=None, mode="auto", poll_interval=1.0, outbox_ttl=3600, retry_interval=5.0):
+        self.database = database
+        self.outbox = outbox
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.outbox_ttl = outbox_ttl
+        self.retry_interval = retry_interval
+        self.active = None  # "change_stream" or "polling" once running
+        self._topics = {}  # collection -> (key field, operations or None for all, [handlers])
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._resume_token = None
+        self._poll_from = None
+        self._seen_ids = set()
+        self._seen_order = deque()
+        self._outbox_ready = False
+        self.events = 0
+        self.published = 0
+        self.errors = 0
+        self.resyncs = 0
+        self.last_lag = None
+        self.max_lag = 0.0
+
+    def subscribe(self, collection, handler, key_field="_id", operations=None):
+        """
+        Call handler(key) when a document in `collection` changes; key is None for "everything".
+
+        Change events carry no document lookup, so a key_field other than _id is only known from
+        insert and replace events (which include the document) or updates that set it. Pass
+        operations to ignore the event types a cache doesn't depend on.
+        """
+        topic = self._topics.setdefault(collection, (key_field, operations, []))
+        topic[2].append(handler)
+
+    def _dispatch(self, collection, key, source, happened_at=None):
+        topic = self._topics.get(collection)
+        if topic is None:
+            return
+        for handler in topic[2]:
+            try:
+                handler(key)
+            except Exception as e:
+                print(f"Error invalidating {collection} {key}: {str(e)}")
+        metrics.invalidations.inc(collection, source)
+        if happened_at is not None:
+            lag = max(0.0, (datetime.utcnow() - happened_at).total_seconds())
+            metrics.invalidation_lag.observe(lag, source)
+            with self._lock:
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+
+    def _resync(self):
+        """Clear every subscribed cache after invalidations may have been missed."""
+        self.resyncs += 1
+        for collection in self._topics:
+            self._dispatch(collection, None, "resync")
+
+    def publish(self, collection, key, apply_locally=True):
+        """Announce a write: evict locally now, and tell other workers when they poll."""
+        key = str(key) if key is not None else None
+        if apply_locally:
+            self._dispatch(collection, key, "local")
+        self.published += 1
+        if self.mode == "off" or self.active == "change_stream" or self.outbox is None:
+            # Other workers see the write itself on their change streams
+            return
+        try:
+            self._ensure_outbox()
+            self.outbox.insert_one({"collection": collection, "key": key, "at": datetime.utcnow(), "origin": self._origin()})
+        except Exception as e:
+            self.errors += 1
+            print(f"Error publishing invalidation for {collection} {key}: {str(e)}")
+
+    def _origin(self):
+        # The pid changes in forked workers, so it is read on every call
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _ensure_outbox(self):
+        if self._outbox_ready:
+            return
+        self.outbox.create_index([("at", ASCENDING)], expireAfterSeconds=self.outbox_ttl)
+        self._outbox_ready = True
+
+    def ensure_started(self):
+        """Start following writes (safe to call on every request)."""
+        if self.mode == "off" or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.mode in ("auto", "change_stream") and self.active != "polling":
+                    self._follow_change_stream()
+                else:
+                    self._poll()
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED and self.mode == "auto":
+                    print("Change streams are not supported by this MongoDB deployment, polling the invalidation outbox")
+                    self.active = "polling"
+                    continue
+                if e.code in CHANGE_STREAM_HISTORY_LOST:
+                    print("Invalidation change stream can't resume, clearing caches")
+                    self._resume_token = None
+                    self._resync()
+                    continue
+                self.errors += 1
+                print(f"Invalidation bus error: {str(e)}")
+                self._stop.wait(self.retry_interval)
+            except (NotImplementedError, TypeError):
+                # Test doubles such as mongomock have no watch() (it resolves to a collection)
+                if self.mode != "auto":
+                    raise
+                print("This MongoDB client has no change streams, polling the invalidation outbox")
+                self.active = "polling"
+            except PyMongoError as e:
+                self.errors += 1
+                print(f"Invalidation bus error: {str(e)}")
+                self._stop.wait(self.retry_interval)
+
+    def _stream_pipeline(self):
+        projection = {"operationType": 1, "ns": 1, "documentKey": 1, "clusterTime": 1, "wallTime": 1}
+        for key_field, _, _ in self._topics.values():
+            if key_field != "_id":
+                # Present on inserts and replaces, and on updates that change the key
+                projection[f"fullDocument.{key_field}"] = 1
+                projection[f"updateDescription.updatedFields.{key_field}"] = 1
+        return [{"$match": {"ns.coll": {"$in": list(self._topics)}}}, {"$project": projection}]
+
+    def _follow_change_stream(self):
+        # No full_document lookup: keys come from documentKey or the event itself
+        with self.database.watch(
+            self._stream_pipeline(),
+            resume_after=self._resume_token,
+            max_await_time_ms=1000
+        ) as stream:
+            if self.active != "change_stream":
+                print("Following writes with a MongoDB change stream")
+            self.active = "change_stream"
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                self._resume_token = stream.resume_token
+                if change is not None:
+                    self._handle_change(change)
+
+    def _handle_change(self, change):
+        self.events += 1
+        collection = (change.get("ns") or {}).get("coll")
+        if collection not in self._topics:
+            return
+        key_field, operations, _ = self._topics[collection]
+        operation = change.get("operationType")
+        key = None
+        if operation in ("insert", "update", "replace", "delete"):
+            if operations is not None and operation not in operations:
+                return
+            for source in (
+                change.get("documentKey"),
+                change.get("fullDocument"),
+                (change.get("updateDescription") or {}).get("updatedFields")
+            ):
+                if source and source.get(key_field) is not None:
+                    key = source[key_field]
+                    break
+        # Events whose key can't be read from the event, drops and renames evict everything
+        self._dispatch(collection, str(key) if key is not None else None, "change_stream", event_time(change))
+
+    def _poll(self):
+        self.active = "polling"
+        if self.outbox is None:
+            self._stop.wait(self.retry_interval)
+            return
+        self._ensure_outbox()
+        if self._poll_from is None:
+            self._poll_from = datetime.utcnow()
+        origin = self._origin()
+        while not self._stop.is_set():
+            since = self._poll_from - timedelta(seconds=POLL_OVERLAP_SECONDS)
+            for doc in self.outbox.find({"at": {"$gte": since}}).sort("at", ASCENDING).limit(POLL_BATCH):
+                if doc["_id"] in self._seen_ids:
+                    continue
+                self._remember(doc["_id"])
+                self._poll_from = max(self._poll_from, doc["at"])
+                self.events += 1
+                if doc.get("origin") == origin:
+                    continue  # Applied when it was published
+                self._dispatch(doc.get("collection"), doc.get("key"), "polling", doc["at"])
+            self._stop.wait(self.poll_interval)
+
+    def _remember(self, doc_id):
+        self._seen_ids.add(doc_id)
+        self._seen_order.append(doc_id)
+        while len(self._seen_order) > POLL_BATCH * 10:
+            self._seen_ids.discard(self._seen_order.popleft())
+
+    def stats(self):
+        with self._lock:
+            last_lag, max_lag = self.last_lag, self.max_lag
+        return {
+            "mode": self.mode,
+            "active": self.active,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "collections": sorted(self._topics),
+            "events": self.events,
+            "published": self.published,
+            "errors": self.errors,
+            "resyncs": self.resyncs,
+            "last_lag_seconds": round(last_lag, 3) if last_lag is not None else None,
+            "max_lag_seconds": round(max_lag, 3)
+        }
+
+
+if __name__ == "__main__":
+    import sys
+
+    import config
+    from utils.database import db
+
+    if len(sys.argv) < 2 or sys.argv[1] != "tail":
+        print("Usage: python -m utils.invalidation tail")
+        sys.exit(1)
+
+    bus = InvalidationBus(db, db.cache_invalidations, mode=config.INVALIDATION_MODE, poll_interval=config.INVALIDATION_POLL_INTERVAL)
+    for collection, key_field in (("users", "_id"), ("interactions", "user_id"), ("catalog", "_id")):
+        bus.subscribe(collection, lambda key, collection=collection: print(f"{datetime.utcnow().isoformat()} {collection}: {key or '*'}"), key_field=key_field)
+    bus.ensure_started()
+    try:
+        while True:
+            time.sleep(5)
+            print(bus.stats())
+    except KeyboardInterrupt:
+        bus.stop()
@@ -0,0 +1,145 @@
+"""
+Darick Le
+October 19 2026
+Flask JSON provider for API responses.
+Encodes with orjson when it is installed and falls back to the standard library otherwise.
+MongoDB and pandas values are encoded directly, so routes can return documents as they come
+from the database instead of converting them by hand:
+    ObjectId                    its hex string
+    datetime, date, time        ISO 8601 (pandas Timestamp included; NaT becomes null);
+                                naive datetimes are UTC and UTC is written as "Z"
+    Decimal128, Decimal, UUID   strings
+    numpy scalars and arrays    numbers and lists
+    set, frozenset              lists
+pandas is never imported here; its values are recognized by type name.
+
+Lists with at least `stream_min_items` elements are encoded in chunks as the response body is
+sent, so a large response never exists as one string in memory.
+"""
+
+import dataclasses
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson errors (e.g. integers beyond 64 bits) are retried with the standard library
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+    if orjson else 0
+)
+
+
+def encode_value(o):
+    """`default` hook for values neither encoder supports natively."""
+    if isinstance(o, ObjectId):
+        return str(o)
+    type_name = type(o).__name__
+    if type_name == "NaTType":
+        return None
+    if isinstance(o, datetime):
+        # Reached for subclasses such as pandas Timestamp, or always with the standard library;
+        # written the same way orjson writes them with _ORJSON_OPTIONS
+        offset = o.utcoffset()
+        if offset is None:
+            return o.isoformat() + "Z"
+        if not offset:
+            return o.replace(tzinfo=None).isoformat() + "Z"
+        return o.isoformat()
+    if isinstance(o, (date, time)):
+        return o.isoformat()
+    if isinstance(o, (Decimal128, Decimal, uuid.UUID)):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if type(o).__module__ == "numpy" and hasattr(o, "tolist"):
+        return o.tolist()
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type_name} is not JSON serializable")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Drop-in replacement for Flask's DefaultJSONProvider; install with `app.json = FastJSONProvider(app)`."""
+
+    def __init__(self, app, stream_min_items=1000, stream_chunk_items=200):
+        super().__init__(app)
+        self.stream_min_items = stream_min_items
+        self.stream_chunk_items = stream_chunk_items
+        self.encoder = "orjson" if orjson else "json"
+        self.fallbacks = 0
+        self.streamed = 0
+
+    def _pretty(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def dump_bytes(self, obj, pretty=False):
+        """Encode obj to UTF-8 JSON bytes."""
+        if orjson is not None:
+            option = _ORJSON_OPTIONS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=encode_value, option=option)
+            except TypeError:
+                self.fallbacks += 1
+        if pretty:
+            text = json.dumps(obj, default=encode_value, sort_keys=self.sort_keys, indent=2, ensure_ascii=self.ensure_ascii)
+        else:
+            text = json.dumps(obj, default=encode_value, sort_keys=self.sort_keys, separators=(",", ":"), ensure_ascii=self.ensure_ascii)
+        return text.encode("utf-8")
+
+    def dumps(self, obj, **kwargs):
+        # Callers passing json.dumps options get exactly that behavior
+        if kwargs:
+            kwargs.setdefault("default", encode_value)
+            kwargs.setdefault("sort_keys", self.sort_keys)
+            kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+            return json.dumps(obj, **kwargs)
+        return self.dump_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def _stream_list(self, items, pretty):
+        """Yield a JSON array chunk by chunk."""
+        if pretty:
+            # Indented output isn't worth chunking; it's only used in debug mode
+            yield self.dump_bytes(items, pretty=True) + b"\n"
+            return
+        yield b"["
+        for start in range(0, len(items), self.stream_chunk_items):
+            chunk = self.dump_bytes(items[start:start + self.stream_chunk_items])
+            yield (b"," if start else b"") + chunk[1:-1]
+        yield b"]\n"
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self._pretty()
+        if isinstance(obj, list) and self.stream_min_items and len(obj) >= self.stream_min_items:
+            self.streamed += 1
+            return self._app.response_class(self._stream_list(obj, pretty), mimetype=self.mimetype)
+        return self._app.response_class(self.dump_bytes(obj, pretty) + b"\n", mimetype=self.mimetype)
+
+    def stats(self):
+        return {
+            "encoder": self.encoder,
+            "stream_min_items": self.stream_min_items,
+            "streamed_responses": self.streamed,
+            "fallbacks": self.fallbacks
+        }
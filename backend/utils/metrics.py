@@ -0,0 +1,304 @@
+"""
+Darick Le
+October 19 2026
+Prometheus-style metrics.
+Counters and histograms are aggregated per thread: each thread writes only to its own shard,
+so recording a sample takes no locks on the request path. Shards are merged when /metrics is
+scraped and rendered in the Prometheus text exposition format. Values that already live
+elsewhere (cache hit counts, pool sizes) are exported through collectors that are only
+called at scrape time.
+
+Instrumented here and in app.py:
+    http_request_duration_seconds      per route, method and status
+    upstream_request_duration_seconds  RapidAPI calls per endpoint family and status
+    upstream_response_bytes_total      bytes received from RapidAPI per endpoint family
+    upstream_parse_duration_seconds    time spent parsing those responses
+    mongo_command_duration_seconds     MongoDB commands per collection and command
+    content_revalidations_total        background refreshes of stale content details by outcome
+    invalidations_total                cache invalidations per collection and source
+    invalidation_lag_seconds           time from a write to its eviction in this worker
+    cache_* gauges                     hit/miss counts and hit ratios per cache
+"""
+
+import bisect
+import threading
+import time
+
+from pymongo import monitoring
+
+# Latency histogram bucket upper bounds (in seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class holding one shard of samples per thread."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []        # (thread, shard) for every thread that has recorded samples
+        self._retired = {}       # samples from threads that have exited
+        self._shards_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            # Only taken once per thread
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _merge(self, target, shard):
+        raise NotImplementedError
+
+    def collect(self):
+        """Merge every thread's shard; shards of exited threads are folded into one."""
+        with self._shards_lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = live
+            totals = {}
+            self._merge(totals, self._retired)
+        for _, shard in live:
+            self._merge(totals, shard)
+        return totals
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, target, shard):
+        for labels, value in list(shard.items()):
+            target[labels] = target.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, seconds, *labels):
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # Per-bucket counts (non-cumulative, last slot is +Inf), then sum and count
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, seconds)] += 1
+        series[-2] += seconds
+        series[-1] += 1
+
+    def time(self, *labels):
+        """Context manager that observes the duration of its block."""
+        return _Timer(self, labels)
+
+    def _merge(self, target, shard):
+        for labels, series in list(shard.items()):
+            merged = target.get(labels)
+            if merged is None:
+                target[labels] = list(series)
+            else:
+                for i, value in enumerate(series):
+                    merged[i] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="' + _format_value(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{label_text} {series[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started_at, *self.labels)
+        return False
+
+
+class Registry:
+    """Holds metrics and scrape-time collectors and renders the /metrics page."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """
+        Register a function called at scrape time.
+
+        It returns (name, type, documentation, [(labels dict, value), ...]) tuples.
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def endpoint_family(path):
+    """Group an upstream path into a low-cardinality family (/search/basic, /search/title, /get)."""
+    path = path.split("?", 1)[0]
+    parts = [part for part in path.split("/") if part]
+    if not parts:
+        return "/"
+    if parts[0] == "get":
+        return "/get"
+    return "/" + "/".join(parts[:2])
+
+
+def record_upstream(path, status, started_at):
+    """Record one RapidAPI attempt that started at started_at (a perf_counter value)."""
+    upstream_request_duration.observe(time.perf_counter() - started_at, endpoint_family(path), str(status))
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records MongoDB command latency per collection; register it when creating the client."""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self._collections = {}   # (connection id, request id) -> collection name
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = ""
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def _finish(self, event, outcome):
+        collection = self._collections.pop((event.connection_id, event.request_id), "")
+        self.histogram.observe(event.duration_micros / 1e6, collection, event.command_name, outcome)
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+
+def cache_collector(caches):
+    """Scrape-time collector for caches exposing stats() with hits/misses (name -> cache)."""
+    def collect():
+        hits, misses, ratios = [], [], []
+        for name, cache in caches.items():
+            stats = cache.stats()
+            cache_hits = stats.get("hits", 0) + stats.get("persistent_hits", 0)
+            hits.append(({"cache": name}, cache_hits))
+            misses.append(({"cache": name}, stats.get("misses", 0)))
+            ratios.append(({"cache": name}, stats.get("hit_ratio", 0.0)))
+        return [
+            ("cache_hits_total", "counter", "Cache lookups answered from the cache.", hits),
+            ("cache_misses_total", "counter", "Cache lookups that had to fetch.", misses),
+            ("cache_hit_ratio", "gauge", "Hits divided by lookups since the process started.", ratios)
+        ]
+    return collect
+
+
+# Process-wide registry and the metrics shared across modules
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "API request latency by route.", ("route", "method", "status")
+)
+upstream_request_duration = registry.histogram(
+    "upstream_request_duration_seconds", "RapidAPI call latency by endpoint family.", ("family", "status")
+)
+upstream_response_bytes = registry.counter(
+    "upstream_response_bytes_total", "Bytes received from RapidAPI by endpoint family.", ("family",)
+)
+upstream_parse_duration = registry.histogram(
+    "upstream_parse_duration_seconds", "Time spent parsing RapidAPI responses by endpoint family.", ("family",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+mongo_command_duration = registry.histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency by collection.", ("collection", "command", "outcome")
+)
+mongo_listener = MongoCommandListener(mongo_command_duration)
+content_revalidations = registry.counter(
+    "content_revalidations_total", "Background refreshes of stale content details by outcome.", ("outcome",)
+)
+invalidations = registry.counter(
+    "invalidations_total", "Cache invalidations applied by collection and source.", ("collection", "source")
+)
+invalidation_lag = registry.histogram(
+    "invalidation_lag_seconds", "Time from a write to its cache eviction in this worker.", ("source",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
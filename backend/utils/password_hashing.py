@@ -0,0 +1,183 @@
+"""
+Darick Le
+October 19 2026
+Password hashing off the request thread.
+bcrypt is deliberately slow, so hashing and verification run on a small dedicated thread
+pool (bcrypt releases the GIL while it works). Admission control caps how many operations
+may be running or queued at once; beyond that callers get PasswordHasherBusy immediately so
+the API can answer 503 instead of letting a login burst starve every other endpoint.
+Hashes created with an outdated cost factor are transparently upgraded after a successful login.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+try:
+    from backend.utils import deadline
+except ImportError:
+    from utils import deadline
+
+# Latency histogram bucket upper bounds (in seconds)
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+_COST_RE = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool is saturated or can't finish before the request deadline."""
+
+    def __init__(self, retry_after):
+        super().__init__("Password hashing is temporarily overloaded")
+        self.retry_after = retry_after
+
+
+class LatencyStats:
+    """Thread-safe latency histogram for a single operation."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = cumulative + self._counts[-1]
+            return {
+                "buckets": buckets,
+                "count": self.count,
+                "sum": round(self.total, 6),
+                "max": round(self.max, 6),
+                "mean": round(self.total / self.count, 6) if self.count else 0.0
+            }
+
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt hashing and verification."""
+
+    def __init__(self, rounds=12, max_workers=2, max_queue=16, retry_after=2):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.rejected = 0
+        self.rehashed = 0
+        self.latency = {
+            "hash": LatencyStats(),
+            "verify": LatencyStats(),
+            "queue_wait": LatencyStats()
+        }
+
+    def _submit(self, operation, func, *args):
+        # Admission control: fail fast instead of queueing without bound
+        if not self._slots.acquire(blocking=False):
+            with self._pending_lock:
+                self.rejected += 1
+            raise PasswordHasherBusy(self.retry_after)
+
+        with self._pending_lock:
+            self._pending += 1
+        submitted_at = time.monotonic()
+
+        def run():
+            started_at = time.monotonic()
+            self.latency["queue_wait"].observe(started_at - submitted_at)
+            try:
+                return func(*args)
+            finally:
+                self.latency[operation].observe(time.monotonic() - started_at)
+                with self._pending_lock:
+                    self._pending -= 1
+                self._slots.release()
+
+        return self._executor.submit(run)
+
+    def _wait(self, future):
+        try:
+            return future.result(timeout=deadline.remaining())
+        except FutureTimeoutError:
+            raise PasswordHasherBusy(self.retry_after)
+
+    def hash(self, password):
+        """Hash a password with the configured cost factor."""
+        future = self._submit("hash", self._hash, password)
+        return self._wait(future)
+
+    def verify(self, password, hashed):
+        """Check a password against a stored hash."""
+        future = self._submit("verify", self._verify, password, hashed)
+        return self._wait(future)
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=self.rounds)).decode("utf-8")
+
+    @staticmethod
+    def _verify(password, hashed):
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed):
+        """Check whether a stored hash was created with a different cost factor."""
+        match = _COST_RE.match(hashed or "")
+        return not match or int(match.group(1)) != self.rounds
+
+    def rehash_in_background(self, password, on_done):
+        """Re-hash a password with the current cost factor and pass the result to on_done."""
+        def rehash():
+            on_done(self._hash(password))
+            with self._pending_lock:
+                self.rehashed += 1
+
+        try:
+            future = self._submit("hash", rehash)
+        except PasswordHasherBusy:
+            # Not urgent; we'll upgrade the hash on a later login
+            return None
+
+        def report_error(done_future):
+            if done_future.exception():
+                print(f"Error re-hashing password: {str(done_future.exception())}")
+
+        future.add_done_callback(report_error)
+        return future
+
+    def stats(self):
+        with self._pending_lock:
+            pending = self._pending
+            rejected = self.rejected
+            rehashed = self.rehashed
+        return {
+            "rounds": self.rounds,
+            "workers": self.max_workers,
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "rejected": rejected,
+            "rehashed": rehashed,
+            "latency": {operation: stats.snapshot() for operation, stats in self.latency.items()}
+        }
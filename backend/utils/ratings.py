@@ -0,0 +1,367 @@
+"""
+Darick Le
+October 19 2026
+User ratings and per-title rating aggregates.
+Every title someone rated has one document in the rating_aggregates collection holding the
+count, sum and sum of squares of its ratings. The aggregate is updated with $inc on every
+rating write, so reading a title's average never scans the ratings collection:
+    new rating        count + 1, sum + r, sum_sq + r²
+    changed rating    sum + (r - old), sum_sq + (r² - old²)
+The previous value comes from the same atomic find_one_and_update that stores the rating, so
+concurrent changes to one user's rating can't apply the same old value twice. A reserved
+document (GLOBAL_ID) holds the totals over every title.
+
+Averages of a handful of ratings are noisy, so titles are ranked on a Bayesian average that
+starts at the prior mean and moves toward the title's own mean as ratings come in:
+    score = (prior_weight * prior_mean + sum) / (prior_weight + count)
+The prior mean is the mean of all ratings (once there are enough of them), re-read at most
+every cache_ttl seconds. Summaries are cached per title in memory.
+
+When an aggregate update fails, the title is queued and its aggregate (and the global totals)
+are recomputed from the ratings collection on the next read. If an update is lost outright
+(a crash between the two writes), or ratings were written before the aggregates existed,
+rebuild them all:
+
+    python -m utils.ratings rebuild
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo import ASCENDING, DeleteOne, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+GLOBAL_ID = "__all__"
+MIN_RATING = 1
+MAX_RATING = 5
+# The global mean replaces the configured prior once this many ratings exist
+MIN_GLOBAL_COUNT = 50
+REBUILD_BATCH = 1000
+# Seconds to wait after a failed repair before trying again
+REPAIR_RETRY_INTERVAL = 30
+DUPLICATE_KEY = 11000
+AGGREGATE_FIELDS = ("count", "sum", "sum_sq")
+
+
+def valid_rating(value):
+    """True for a number on the 1-5 scale (booleans aren't ratings)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and MIN_RATING <= value <= MAX_RATING
+
+
+class RatingStore:
+    """Data access for ratings plus incrementally maintained per-title aggregates."""
+
+    def __init__(self, collection, aggregates, prior_weight=10.0, prior_mean=3.0, cache_ttl=300, max_cached=50000):
+        self.collection = collection
+        self.aggregates = aggregates
+        self.prior_weight = prior_weight
+        self.prior_mean = prior_mean
+        self.cache_ttl = cache_ttl
+        self.max_cached = max_cached
+        self._cache = OrderedDict()  # content id -> (expires_at, aggregate document or None)
+        self._prior = None  # (expires_at, prior mean)
+        self._lock = threading.Lock()
+        self._dirty = set()  # content ids whose aggregate update failed
+        self._repair_failed_at = None
+        self._indexes_ready = False
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.errors = 0
+        self.repairs = 0
+
+    def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        try:
+            self.collection.create_indexes([
+                IndexModel([("user_id", ASCENDING), ("content_id", ASCENDING)], unique=True),
+                IndexModel([("content_id", ASCENDING)])
+            ])
+            self._indexes_ready = True
+        except Exception as e:
+            print(f"Error creating rating indexes: {str(e)}")
+
+    def record(self, user_id, content_id, rating, review="", date=None):
+        """Store (or change) a user's rating and fold the difference into the title's aggregate."""
+        if not valid_rating(rating):
+            raise ValueError(f"Rating must be a number from {MIN_RATING} to {MAX_RATING}")
+        self.ensure_indexes()
+        query = {"user_id": user_id, "content_id": content_id}
+        update = {"$set": {
+            "user_id": user_id,
+            "content_id": content_id,
+            "rating": rating,
+            "review": review,
+            "date": date or datetime.utcnow()
+        }}
+        try:
+            previous = self.collection.find_one_and_update(
+                query,
+                update,
+                projection={"_id": 0, "rating": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # A concurrent request inserted this rating first; change it like any existing rating
+            previous = self.collection.find_one_and_update(
+                query,
+                update,
+                projection={"_id": 0, "rating": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+        old = previous.get("rating") if previous else None
+        if valid_rating(old):
+            delta = (0, rating - old, rating * rating - old * old)
+        else:
+            # New rating (or a stored value the aggregates never counted)
+            delta = (1, rating, rating * rating)
+        if delta[0] or delta[1]:
+            self._apply(content_id, *delta)
+        return delta[0] == 1
+
+    def _apply(self, content_id, count, total, total_sq):
+        increments = {"count": count, "sum": total, "sum_sq": total_sq}
+        now = datetime.utcnow()
+        update = {"$inc": increments, "$set": {"updated_at": now}}
+        keys = (content_id, GLOBAL_ID)
+        operations = [UpdateOne({"_id": key}, update, upsert=True) for key in keys]
+        try:
+            try:
+                self.aggregates.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if not errors or any(error.get("code") != DUPLICATE_KEY for error in errors):
+                    raise
+                # Another first rating of the title created the aggregate between our lookup and
+                # insert; the document exists now, so retry the failed increments without upsert
+                retries = [UpdateOne({"_id": keys[error["index"]]}, update) for error in errors]
+                self.aggregates.bulk_write(retries, ordered=False)
+            self.updates += 1
+        except Exception as e:
+            # The rating itself is stored; the next read recomputes the aggregate from it
+            self.errors += 1
+            with self._lock:
+                self._dirty.add(content_id)
+            print(f"Error updating rating aggregate for {content_id}: {str(e)}")
+        self.invalidate(content_id)
+
+    def _rating_groups(self, match=None):
+        """Count, sum and sum of squares of the valid ratings of each title."""
+        return self.collection.aggregate([
+            {"$match": dict(match or {}, rating={"$gte": MIN_RATING, "$lte": MAX_RATING})},
+            {"$group": {
+                "_id": "$content_id",
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$rating"},
+                "sum_sq": {"$sum": {"$multiply": ["$rating", "$rating"]}}
+            }}
+        ])
+
+    def repair(self):
+        """
+        Recompute the aggregates of titles whose update failed, then the global totals.
+
+        Returns the number of titles repaired. Titles stay queued if the repair fails, and it is
+        retried after REPAIR_RETRY_INTERVAL seconds.
+        """
+        with self._lock:
+            if not self._dirty:
+                return 0
+            if self._repair_failed_at is not None and time.monotonic() - self._repair_failed_at < REPAIR_RETRY_INTERVAL:
+                return 0
+            pending = list(self._dirty)
+        now = datetime.utcnow()
+        try:
+            groups = {group["_id"]: group for group in self._rating_groups({"content_id": {"$in": pending}})}
+            operations = [
+                UpdateOne(
+                    {"_id": content_id},
+                    {"$set": dict({key: groups[content_id][key] for key in AGGREGATE_FIELDS}, updated_at=now)},
+                    upsert=True
+                ) if content_id in groups else DeleteOne({"_id": content_id})
+                for content_id in pending
+            ]
+            self.aggregates.bulk_write(operations, ordered=False)
+            # The global increment may have failed too, so total the (now correct) title aggregates
+            totals = next(self.aggregates.aggregate([
+                {"$match": {"_id": {"$ne": GLOBAL_ID}}},
+                {"$group": {"_id": None, **{key: {"$sum": f"${key}"} for key in AGGREGATE_FIELDS}}}
+            ]), None)
+            fields = {key: totals[key] if totals else 0 for key in AGGREGATE_FIELDS}
+            self.aggregates.update_one({"_id": GLOBAL_ID}, {"$set": dict(fields, updated_at=now)}, upsert=True)
+        except Exception as e:
+            with self._lock:
+                self._repair_failed_at = time.monotonic()
+            print(f"Error repairing rating aggregates: {str(e)}")
+            return 0
+
+        with self._lock:
+            self._dirty.difference_update(pending)
+            self._repair_failed_at = None
+            self.repairs += len(pending)
+        for content_id in pending:
+            self.invalidate(content_id)
+        self.invalidate(GLOBAL_ID)
+        return len(pending)
+
+    def prior(self):
+        """Mean the Bayesian score starts from: the global mean once there are enough ratings."""
+        now = time.monotonic()
+        with self._lock:
+            if self._prior is not None and self._prior[0] > now:
+                return self._prior[1]
+        prior_mean = self.prior_mean
+        try:
+            totals = self.aggregates.find_one({"_id": GLOBAL_ID})
+            if totals and totals.get("count", 0) >= MIN_GLOBAL_COUNT:
+                prior_mean = totals["sum"] / totals["count"]
+        except Exception as e:
+            print(f"Error reading global rating totals: {str(e)}")
+        with self._lock:
+            self._prior = (now + self.cache_ttl, prior_mean)
+        return prior_mean
+
+    def summarize(self, doc, prior_mean=None):
+        """Public rating summary of an aggregate document (None means no ratings yet)."""
+        if prior_mean is None:
+            prior_mean = self.prior()
+        count = doc.get("count", 0) if doc else 0
+        total = doc.get("sum", 0) if doc else 0
+        score = (self.prior_weight * prior_mean + total) / (self.prior_weight + count) if self.prior_weight + count else prior_mean
+        if count <= 0:
+            return {"count": 0, "average": None, "stddev": None, "score": round(score, 4)}
+        mean = total / count
+        # Rounding in the running sums can make the variance slightly negative
+        variance = max(0.0, doc.get("sum_sq", 0) / count - mean * mean)
+        return {
+            "count": count,
+            "average": round(mean, 4),
+            "stddev": round(math.sqrt(variance), 4),
+            "score": round(score, 4)
+        }
+
+    def get_many(self, content_ids):
+        """Return {content_id: summary} for every id, with one $in query for uncached titles."""
+        if self._dirty:
+            self.repair()
+        now = time.monotonic()
+        docs = {}
+        missing = []
+        with self._lock:
+            for content_id in dict.fromkeys(content_ids):
+                entry = self._cache.get(content_id)
+                if entry is not None and entry[0] > now:
+                    self._cache.move_to_end(content_id)
+                    docs[content_id] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(content_id)
+                    self.misses += 1
+
+        if missing:
+            try:
+                found = {doc["_id"]: doc for doc in self.aggregates.find({"_id": {"$in": missing}}, {"updated_at": 0})}
+            except Exception as e:
+                print(f"Error reading rating aggregates: {str(e)}")
+                found = None
+            if found is not None:
+                with self._lock:
+                    for content_id in missing:
+                        docs[content_id] = found.get(content_id)
+                        self._cache[content_id] = (now + self.cache_ttl, docs[content_id])
+                        self._cache.move_to_end(content_id)
+                    while len(self._cache) > self.max_cached:
+                        self._cache.popitem(last=False)
+
+        prior_mean = self.prior()
+        return {content_id: self.summarize(docs.get(content_id), prior_mean) for content_id in content_ids}
+
+    def get(self, content_id):
+        return self.get_many([content_id])[content_id]
+
+    def scores(self, content_ids):
+        """Bayesian scores for ranking ({content_id: score}); unrated titles get the prior."""
+        return {content_id: summary["score"] for content_id, summary in self.get_many(content_ids).items()}
+
+    def invalidate(self, content_id):
+        with self._lock:
+            self._cache.pop(content_id, None)
+            if content_id == GLOBAL_ID:
+                self._prior = None
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._prior = None
+
+    def rebuild(self):
+        """
+        Recompute every aggregate from the ratings collection.
+
+        Aggregates of titles that no longer have ratings are removed. Ratings written while
+        the rebuild runs may be counted twice or not at all, so run it when traffic is low.
+        """
+        groups = self._rating_groups()
+        now = datetime.utcnow()
+        operations = []
+        titles = set()
+        totals = {key: 0 for key in AGGREGATE_FIELDS}
+        for group in groups:
+            if group["_id"] is None:
+                continue
+            titles.add(group["_id"])
+            fields = {key: group[key] for key in totals}
+            for key in totals:
+                totals[key] += group[key]
+            operations.append(UpdateOne({"_id": group["_id"]}, {"$set": dict(fields, updated_at=now)}, upsert=True))
+            if len(operations) >= REBUILD_BATCH:
+                self.aggregates.bulk_write(operations, ordered=False)
+                operations = []
+        operations.append(UpdateOne({"_id": GLOBAL_ID}, {"$set": dict(totals, updated_at=now)}, upsert=True))
+        self.aggregates.bulk_write(operations, ordered=False)
+
+        removed = 0
+        orphans = [doc["_id"] for doc in self.aggregates.find({}, {"_id": 1}) if doc["_id"] != GLOBAL_ID and doc["_id"] not in titles]
+        if orphans:
+            removed = self.aggregates.delete_many({"_id": {"$in": orphans}}).deleted_count
+        with self._lock:
+            self._dirty.clear()
+        self.clear()
+        return {"titles": len(titles), "ratings": totals["count"], "removed": removed}
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached_titles": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "updates": self.updates,
+                "errors": self.errors,
+                "pending_repairs": len(self._dirty),
+                "repairs": self.repairs,
+                "prior_weight": self.prior_weight,
+                "prior_mean": round(self._prior[1], 4) if self._prior else None
+            }
+
+
+if __name__ == "__main__":
+    import sys
+
+    import config
+    from utils.database import db
+
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Usage: python -m utils.ratings rebuild")
+        sys.exit(1)
+
+    store = RatingStore(db.ratings, db.rating_aggregates, prior_weight=config.RATING_PRIOR_WEIGHT, prior_mean=config.RATING_PRIOR_MEAN)
+    store.ensure_indexes()
+    result = store.rebuild()
+    print(f"Rebuilt rating aggregates for {result['titles']} titles from {result['ratings']} ratings ({result['removed']} stale aggregates removed)")
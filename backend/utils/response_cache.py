@@ -0,0 +1,220 @@
+"""
+Darick Le
+October 19 2026
+Cache of serialized API responses.
+Responses that many requests share (the streaming service list, trending lists, cached content
+details) are encoded to JSON once and stored as bytes together with gzip and, when the brotli
+package is installed, brotli variants, keyed by route and the parameters the response varies on.
+A hit sends the stored bytes in the best encoding the client accepts, with no serialization or
+compression on the request path.
+
+Every entry has a strong ETag derived from its JSON bytes. Each encoding gets its own tag
+('"<hash>"', '"<hash>-gz"', '"<hash>-br"') since their bytes differ, and any of them in
+If-None-Match matches the entry, so a client revalidating gets a 304 with no body. Entries
+carry the Cache-Control policy of their route and are evicted least recently used once the
+cache holds more than `max_bytes`. Keys are indexed by route and by (route, first part) so
+invalidating one title's responses only touches that title's entries.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first when a client accepts several with the same quality
+ENCODINGS = ("br", "gzip")
+ETAG_SUFFIXES = {"identity": "", "gzip": "-gz", "br": "-br"}
+
+
+class CachedResponse:
+    """Serialized body, its compressed variants and the headers sent with it."""
+
+    __slots__ = ("body", "variants", "etag", "mimetype", "cache_control", "expires_at", "size")
+
+    def __init__(self, body, variants, mimetype, cache_control, expires_at):
+        self.body = body
+        self.variants = variants  # encoding -> compressed bytes, only when smaller than the body
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.expires_at = expires_at
+        self.size = len(body) + sum(len(data) for data in variants.values())
+
+    def expired(self, now):
+        return self.expires_at is not None and self.expires_at <= now
+
+    def matches(self, if_none_match):
+        """True if an If-None-Match header names any encoding of this entry."""
+        if not if_none_match:
+            return False
+        if if_none_match.star_tag:
+            return True
+        return any(if_none_match.contains(f"{self.etag}{suffix}") for suffix in ETAG_SUFFIXES.values())
+
+
+class ResponseCache:
+    """Size-bounded LRU of serialized responses keyed on (route, vary parameters...)."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, min_compress_bytes=512, gzip_level=6, brotli_quality=5):
+        self.max_bytes = max_bytes
+        self.min_compress_bytes = min_compress_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._entries = OrderedDict()  # key -> CachedResponse
+        self._prefixes = {}  # (route,) and (route, first part) -> keys starting with them
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.sent = {"identity": 0, "gzip": 0, "br": 0}
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
+
+    def compress(self, body):
+        """Compressed variants of a body worth sending instead of it."""
+        variants = {}
+        if len(body) < self.min_compress_bytes:
+            return variants
+        compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        if len(compressed) < len(body):
+            variants["gzip"] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+            if len(compressed) < len(body):
+                variants["br"] = compressed
+        return variants
+
+    def get(self, key):
+        """Return the live entry for a key, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry.expired(now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+        return None
+
+    def put(self, key, obj, ttl=None, cache_control="no-cache"):
+        """Serialize obj with the app's JSON provider and store it; returns the entry."""
+        body = current_app.json.dump_bytes(obj) + b"\n"
+        entry = CachedResponse(
+            body,
+            self.compress(body),
+            current_app.json.mimetype,
+            cache_control,
+            time.monotonic() + ttl if ttl else None
+        )
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for prefix in (key[:1], key[:2]):
+                self._prefixes.setdefault(prefix, set()).add(key)
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def get_or_put(self, key, build, ttl=None, cache_control="no-cache"):
+        """Return the entry for a key, building and storing the object on a miss."""
+        entry = self.get(key)
+        if entry is None:
+            entry = self.put(key, build(), ttl=ttl, cache_control=cache_control)
+        return entry
+
+    def _remove(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for prefix in (key[:1], key[:2]):
+            keys = self._prefixes.get(prefix)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._prefixes[prefix]
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_route(self, route, *parts):
+        """Drop every entry whose key starts with (route, *parts)."""
+        prefix = (route,) + parts
+        with self._lock:
+            keys = self._prefixes.get(prefix[:2], ())
+            keys = [key for key in keys if key[:len(prefix)] == prefix]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._prefixes.clear()
+            self._bytes = 0
+
+    def choose_encoding(self, entry):
+        accepted = request.accept_encodings
+        best, best_quality = "identity", 0
+        for encoding in ENCODINGS:
+            quality = accepted[encoding]
+            if encoding in entry.variants and quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def respond(self, entry, status=200):
+        """Build the response for an entry: a 304 if the client's copy is current, else the body."""
+        encoding = self.choose_encoding(entry)
+        headers = {
+            "ETag": f'"{entry.etag}{ETAG_SUFFIXES[encoding]}"',
+            "Cache-Control": entry.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if entry.matches(request.if_none_match):
+            with self._lock:
+                self.not_modified += 1
+            return current_app.response_class(status=304, headers=headers)
+
+        body = entry.variants.get(encoding, entry.body)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        with self._lock:
+            self.sent[encoding] += 1
+            self.bytes_sent += len(body)
+            self.bytes_uncompressed += len(entry.body)
+        return current_app.response_class(body, status=status, mimetype=entry.mimetype, headers=headers)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "invalidations": self.invalidations,
+                "sent_by_encoding": dict(self.sent),
+                "bytes_sent": self.bytes_sent,
+                "bytes_uncompressed": self.bytes_uncompressed,
+                "brotli": brotli is not None
+            }
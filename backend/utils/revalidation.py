@@ -0,0 +1,218 @@
+"""
+Darick Le
+October 19 2026
+Background revalidation of cached content details.
+Streaming availability changes, so every stored details document carries the time its sources
+were fetched (details_refreshed_at). Routes classify a document by that age:
+    fresh      younger than max_age; served as is
+    stale      younger than max_stale; served as is and queued for revalidation
+    expired    older than that; refetched before serving, falling back to the stored copy
+               if upstream has nothing
+Documents stored before the timestamp existed count as stale.
+A background thread refreshes stale titles, most wanted first: titles are ranked by how often
+they were recently requested (an exponentially decaying count kept in memory) and by how many
+watchlists hold them. Upstream calls are limited by a token bucket of `budget_per_hour` calls
+with bursts of at most `burst`, so revalidation can't eat the RapidAPI quota that user
+requests need. The budget applies per worker process.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    from backend.utils import metrics
+    from backend.utils.trending import PeriodicRefresher
+except ImportError:
+    from utils import metrics
+    from utils.trending import PeriodicRefresher
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+# A title upstream returned nothing for isn't retried for this long
+FAILURE_BACKOFF_SECONDS = 3600
+# One watchlist entry counts as much as this many recent requests
+WATCHLIST_WEIGHT = 2.0
+
+
+class DetailsRevalidator:
+    """Serves freshness decisions for details documents and refreshes stale ones in the background."""
+
+    def __init__(self, catalog, fetch, watchlist_collection=None, max_age=86400, max_stale=604800,
+                 budget_per_hour=120, burst=10, tick_interval=60, candidate_limit=500,
+                 access_half_life=3600, max_tracked=50000, on_refresh=None):
+        self.catalog = catalog
+        self.fetch = fetch  # (content_id, content_type) -> stored details or None
+        self.watchlist_collection = watchlist_collection
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.budget_per_hour = budget_per_hour
+        self.burst = burst
+        self.candidate_limit = candidate_limit
+        self.access_half_life = access_half_life
+        self.max_tracked = max_tracked
+        self.on_refresh = on_refresh
+        self._lock = threading.Lock()
+        self._access = {}   # content id -> (decayed request count, monotonic time of last update)
+        self._pending = {}  # content id -> content type, stale titles that were just served
+        self._failed = {}   # content id -> monotonic time of the last failed refresh
+        self._tokens = float(burst)
+        self._tokens_at = time.monotonic()
+        self.refreshed = 0
+        self.failed = 0
+        self.served_stale = 0
+        self.refetched_expired = 0
+        self.deferred = 0  # Candidates left for a later pass by the budget
+        self._refresher = PeriodicRefresher("details-revalidation", self.revalidate, tick_interval)
+
+    def ensure_started(self):
+        if self.budget_per_hour > 0:
+            self._refresher.start()
+
+    def stop(self):
+        self._refresher.stop()
+
+    def age(self, doc, now=None):
+        refreshed_at = doc.get("details_refreshed_at")
+        if not isinstance(refreshed_at, datetime):
+            return float("inf")
+        return ((now or datetime.utcnow()) - refreshed_at).total_seconds()
+
+    def freshness(self, doc):
+        """FRESH, STALE or EXPIRED for a stored details document."""
+        age = self.age(doc)
+        if age < self.max_age:
+            return FRESH
+        if age < self.max_stale or "details_refreshed_at" not in doc:
+            return STALE
+        return EXPIRED
+
+    def record_access(self, content_id):
+        now = time.monotonic()
+        with self._lock:
+            self._access[content_id] = (self._decayed(content_id, now) + 1.0, now)
+            if len(self._access) > self.max_tracked:
+                self._prune(now)
+
+    def _decayed(self, content_id, now):
+        # Caller holds the lock
+        entry = self._access.get(content_id)
+        if entry is None:
+            return 0.0
+        count, updated_at = entry
+        return count * 0.5 ** ((now - updated_at) / self.access_half_life)
+
+    def _prune(self, now):
+        # Keep the most requested half
+        ranked = sorted(self._access, key=lambda content_id: self._decayed(content_id, now), reverse=True)
+        for content_id in ranked[self.max_tracked // 2:]:
+            del self._access[content_id]
+
+    def serve_stale(self, content_id, content_type):
+        """Note that a stale copy was served; it is refreshed on the next pass."""
+        with self._lock:
+            self._pending[content_id] = content_type
+            self.served_stale += 1
+        self.ensure_started()
+
+    def record_expired_refetch(self):
+        with self._lock:
+            self.refetched_expired += 1
+
+    def _take_tokens(self, wanted):
+        # Caller holds the lock
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._tokens_at) * self.budget_per_hour / 3600.0)
+        self._tokens_at = now
+        granted = min(wanted, int(self._tokens))
+        self._tokens -= granted
+        return granted
+
+    def _watchlist_counts(self, content_ids):
+        if self.watchlist_collection is None or not content_ids:
+            return {}
+        try:
+            cursor = self.watchlist_collection.aggregate([
+                {"$match": {"content_id": {"$in": content_ids}}},
+                {"$group": {"_id": "$content_id", "count": {"$sum": 1}}}
+            ])
+            return {doc["_id"]: doc["count"] for doc in cursor}
+        except Exception as e:
+            print(f"Error counting watchlist entries for revalidation: {str(e)}")
+            return {}
+
+    def candidates(self):
+        """Stale titles ranked by recent requests and watchlist presence, then by age."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.max_age)
+        stale = self.catalog.find_stale_details(cutoff, limit=self.candidate_limit)
+        content_types = {doc["id"]: doc.get("content_type") for doc in stale if doc.get("id")}
+        ages = {doc["id"]: self.age(doc) for doc in stale if doc.get("id")}
+        now = time.monotonic()
+        with self._lock:
+            for content_id, content_type in self._pending.items():
+                content_types.setdefault(content_id, content_type)
+            self._failed = {
+                content_id: failed_at for content_id, failed_at in self._failed.items()
+                if now - failed_at < FAILURE_BACKOFF_SECONDS
+            }
+            content_ids = [content_id for content_id in content_types if content_id not in self._failed]
+            demand = {content_id: self._decayed(content_id, now) for content_id in content_ids}
+
+        watchers = self._watchlist_counts(content_ids)
+        priority = {
+            content_id: demand[content_id] + WATCHLIST_WEIGHT * watchers.get(content_id, 0)
+            for content_id in content_ids
+        }
+        content_ids.sort(key=lambda content_id: (priority[content_id], ages.get(content_id, float("inf"))), reverse=True)
+        return [(content_id, content_types[content_id]) for content_id in content_ids]
+
+    def revalidate(self):
+        """One pass: refresh as many of the top candidates as the budget allows."""
+        candidates = self.candidates()
+        if not candidates:
+            return 0
+        with self._lock:
+            granted = self._take_tokens(len(candidates))
+            self.deferred += len(candidates) - granted
+
+        refreshed = 0
+        for content_id, content_type in candidates[:granted]:
+            upstream_type = "movie" if content_type == "movie" else "series"
+            try:
+                details = self.fetch(content_id, upstream_type)
+            except Exception as e:
+                print(f"Error revalidating {content_id}: {str(e)}")
+                details = None
+            with self._lock:
+                self._pending.pop(content_id, None)
+                if details:
+                    self.refreshed += 1
+                else:
+                    self.failed += 1
+                    self._failed[content_id] = time.monotonic()
+            metrics.content_revalidations.inc("refreshed" if details else "failed")
+            if details:
+                refreshed += 1
+                if self.on_refresh:
+                    self.on_refresh(content_id)
+        return refreshed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_age": self.max_age,
+                "max_stale": self.max_stale,
+                "budget_per_hour": self.budget_per_hour,
+                "tokens": round(self._tokens, 2),
+                "pending": len(self._pending),
+                "tracked_titles": len(self._access),
+                "backing_off": len(self._failed),
+                "served_stale": self.served_stale,
+                "refetched_expired": self.refetched_expired,
+                "refreshed": self.refreshed,
+                "failed": self.failed,
+                "deferred": self.deferred,
+                "running": self._refresher.running
+            }
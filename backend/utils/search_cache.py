@@ -0,0 +1,197 @@
+"""
+Darick Le
+October 19 2026
+Search result cache for the media recommender API.
+Upstream search results are cached under a normalized form of the query so that searches
+differing only in case, whitespace or punctuation share one entry. Entries live in a
+size-bounded in-memory LRU backed by a MongoDB collection with a TTL index, empty results
+are cached for a shorter time (negative caching), and concurrent misses for the same query
+are coalesced so a burst of identical searches results in a single upstream call.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+try:
+    from backend.utils import deadline
+    from backend.utils.search_index import tokenize
+except ImportError:
+    from utils import deadline
+    from utils.search_index import tokenize
+
+# How long a follower waits for the leader of a coalesced fetch when there is no request deadline
+DEFAULT_COALESCE_WAIT = 10.0
+
+
+def normalize_query(query):
+    """Normalize a search query: lowercase, no accents, punctuation or extra whitespace."""
+    return " ".join(tokenize(query))
+
+
+class _Flight:
+    """An in-progress upstream fetch that other requests can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SearchResultCache:
+    """Two-level (memory + MongoDB) cache of search results keyed on the normalized query."""
+
+    def __init__(self, collection=None, max_entries=1000, ttl=3600, negative_ttl=300):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # key -> (expires_at monotonic, results)
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._indexes_ready = False
+        self.hits = 0
+        self.negative_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _ensure_indexes(self):
+        if self._indexes_ready or self.collection is None:
+            return
+        try:
+            # MongoDB removes expired entries on its own
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_ready = True
+        except Exception as e:
+            print(f"Error creating search cache indexes: {str(e)}")
+
+    def get(self, key):
+        """Return cached results for a normalized query, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, results = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    if not results:
+                        self.negative_hits += 1
+                    return results
+                del self._entries[key]
+
+        if self.collection is None:
+            return None
+
+        try:
+            doc = self.collection.find_one({"_id": key})
+        except Exception as e:
+            print(f"Error reading search cache: {str(e)}")
+            return None
+
+        if not doc or doc.get("expires_at") is None or doc["expires_at"] <= datetime.utcnow():
+            return None
+
+        results = doc.get("results", [])
+        ttl_left = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        self._store_local(key, results, ttl_left)
+        with self._lock:
+            self.persistent_hits += 1
+            if not results:
+                self.negative_hits += 1
+        return results
+
+    def set(self, key, results):
+        """Cache results for a normalized query; empty results use the negative TTL."""
+        ttl = self.ttl if results else self.negative_ttl
+        self._store_local(key, results, ttl)
+
+        if self.collection is None:
+            return
+        self._ensure_indexes()
+        try:
+            self.collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "results": results,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error writing search cache: {str(e)}")
+
+    def _store_local(self, key, results, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_fetch(self, query, fetch):
+        """
+        Return cached results for a query, calling fetch() at most once per burst of misses.
+
+        fetch() must return a list of results to cache, or None when the upstream call
+        failed (failures are not cached).
+        """
+        key = normalize_query(query)
+        if not key:
+            return []
+
+        results = self.get(key)
+        if results is not None:
+            return results
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait(deadline.remaining(DEFAULT_COALESCE_WAIT))
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            results = fetch()
+            if results is not None:
+                self.set(key, results)
+            flight.result = results
+            return results
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, query=None):
+        """Drop one query (or everything) from the in-memory cache."""
+        with self._lock:
+            if query is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(normalize_query(query), None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.persistent_hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,352 @@
+"""
+Darick Le
+October 19 2026
+In-process content search index.
+Keeps an inverted index over every title we have cached (titles, cast and directors) so that
+/api/search and autocomplete can be answered locally with prefix and fuzzy matching. Fuzzy
+candidates are the terms sharing trigrams with a query token; a candidate matches if enough
+trigrams overlap or it is within a small edit distance (typos like "matrx" or "inceptoin"
+share too few trigrams with the real word to pass on overlap alone).
+The index is built lazily from the catalog on first use and updated incrementally whenever a title
+is upserted, so the upstream search endpoint is only needed on a miss. Builds scan the catalog
+into a separate index and swap it in, so searches and updates aren't blocked while they run.
+"""
+
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+# Relative weight of a match in each indexed field
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "cast": 1.0,
+    "directors": 1.0
+}
+
+# Relative weight of each kind of token match
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+FUZZY_MATCH = 0.4
+
+# Minimum trigram similarity for a fuzzy token match
+FUZZY_THRESHOLD = 0.45
+# Terms below this trigram similarity aren't considered fuzzy candidates at all
+FUZZY_CANDIDATE_THRESHOLD = 0.2
+# Longest query token allowed only one edit (insertion, deletion, substitution or swap); longer tokens allow two
+SHORT_TOKEN_LENGTH = 5
+MAX_FUZZY_TERMS = 5
+MAX_PREFIX_TERMS = 50
+
+# Seconds to wait after a failed build before scanning the catalog again
+BUILD_RETRY_INTERVAL = 60
+
+# Fields returned for each search hit, matching the /api/search response shape
+SUMMARY_FIELDS = ("id", "title", "year", "poster_url", "content_type")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """Lowercase and strip accents so that 'Amélie' matches 'amelie'."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return text.lower()
+
+
+def tokenize(text):
+    """Split text into normalized word tokens."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def trigrams(token):
+    """Return the set of padded character trigrams for a token."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(token):
+    return 1 if len(token) <= SHORT_TOKEN_LENGTH else 2
+
+
+def edit_distance(a, b, limit):
+    """
+    Edit distance counting adjacent swaps as one edit (optimal string alignment).
+
+    Returns limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_row = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous_row, row = previous_row, row, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], before[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+    return row[-1]
+
+
+class SearchIndex:
+    """Thread-safe inverted index over cached titles, cast and directors."""
+
+    def __init__(self, retry_interval=BUILD_RETRY_INTERVAL):
+        self._lock = threading.RLock()
+        self._built = False
+        self._failed_at = None  # monotonic time of the last failed build
+        self._pending_adds = None  # titles added while a build runs (None when not building)
+        self.retry_interval = retry_interval
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._docs = {}                         # content id -> summary dict
+            self._doc_terms = {}                    # content id -> {(token, field)}
+            self._postings = defaultdict(dict)      # token -> {content id: weight}
+            self._vocabulary = []                   # sorted list of tokens for prefix lookups
+            self._trigrams = defaultdict(set)       # trigram -> {token}
+            self._titles = {}                       # content id -> normalized title
+
+    def __len__(self):
+        return len(self._docs)
+
+    @property
+    def built(self):
+        return self._built
+
+    def build(self, load_documents):
+        """
+        Build the index from scratch; load_documents() returns an iterable of title documents.
+
+        The catalog is scanned into a separate index without holding the lock, then swapped in.
+        Titles added meanwhile are replayed on top. Returns the number of titles, or None if
+        another thread is already building.
+        """
+        with self._lock:
+            if self._pending_adds is not None:
+                return None
+            self._pending_adds = []
+
+        staging = SearchIndex()
+        try:
+            for doc in load_documents():
+                staging.add(doc)
+        except Exception:
+            with self._lock:
+                self._pending_adds = None
+            raise
+
+        with self._lock:
+            pending, self._pending_adds = self._pending_adds, None
+            self._docs = staging._docs
+            self._doc_terms = staging._doc_terms
+            self._postings = staging._postings
+            self._vocabulary = staging._vocabulary
+            self._trigrams = staging._trigrams
+            self._titles = staging._titles
+            for doc in pending:
+                self.add(doc)
+            self._built = True
+            return len(self._docs)
+
+    def ensure_built(self, load_documents):
+        """Build the index on first use; after a failed build, wait retry_interval before trying again."""
+        if self._built:
+            return
+        with self._lock:
+            # Another request may be building the index, or may have just built it
+            if self._built or self._pending_adds is not None:
+                return
+            if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_interval:
+                return
+        try:
+            self.build(load_documents)
+            with self._lock:
+                self._failed_at = None
+        except Exception as e:
+            with self._lock:
+                self._failed_at = time.monotonic()
+            print(f"Error building search index: {str(e)}")
+
+    def add(self, doc):
+        """Add or update a single title in the index."""
+        content_id = doc.get("id") if doc else None
+        if not content_id or not doc.get("title"):
+            return
+
+        with self._lock:
+            if self._pending_adds is not None:
+                self._pending_adds.append(doc)
+            existing = self._docs.get(content_id, {})
+
+            # Merge with what we already know so partial upserts don't drop fields
+            summary = {field: existing.get(field) for field in SUMMARY_FIELDS}
+            for field in SUMMARY_FIELDS:
+                if doc.get(field) not in (None, ""):
+                    summary[field] = doc[field]
+            people = {
+                "cast": doc.get("cast") or existing.get("_cast") or [],
+                "directors": doc.get("directors") or existing.get("_directors") or []
+            }
+            summary["_cast"] = people["cast"]
+            summary["_directors"] = people["directors"]
+
+            self._remove_terms(content_id)
+
+            terms = {}
+            for token in tokenize(summary["title"]):
+                terms[token] = max(terms.get(token, 0.0), FIELD_WEIGHTS["title"])
+            for field, names in people.items():
+                for name in names:
+                    if isinstance(name, dict):
+                        name = name.get("name", "")
+                    for token in tokenize(name):
+                        terms[token] = max(terms.get(token, 0.0), FIELD_WEIGHTS[field])
+
+            for token, weight in terms.items():
+                if token not in self._postings:
+                    bisect.insort(self._vocabulary, token)
+                    for gram in trigrams(token):
+                        self._trigrams[gram].add(token)
+                self._postings[token][content_id] = weight
+
+            self._docs[content_id] = summary
+            self._doc_terms[content_id] = set(terms)
+            self._titles[content_id] = normalize_text(summary["title"])
+
+    def add_many(self, docs):
+        with self._lock:
+            for doc in docs:
+                self.add(doc)
+
+    def _remove_terms(self, content_id):
+        for token in self._doc_terms.pop(content_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(content_id, None)
+            if not postings:
+                del self._postings[token]
+                index = bisect.bisect_left(self._vocabulary, token)
+                if index < len(self._vocabulary) and self._vocabulary[index] == token:
+                    del self._vocabulary[index]
+                for gram in trigrams(token):
+                    self._trigrams[gram].discard(token)
+
+    def _prefix_terms(self, prefix):
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for token in self._vocabulary[start:start + MAX_PREFIX_TERMS]:
+            if not token.startswith(prefix):
+                break
+            terms.append(token)
+        return terms
+
+    def _fuzzy_terms(self, token):
+        if len(token) < 3:
+            return []
+        query_grams = trigrams(token)
+        overlap = defaultdict(int)
+        for gram in query_grams:
+            for candidate in self._trigrams.get(gram, ()):
+                overlap[candidate] += 1
+        limit = max_edits(token)
+        scored = []
+        for candidate, shared in overlap.items():
+            similarity = shared / (len(query_grams) + len(trigrams(candidate)) - shared)
+            if similarity < FUZZY_CANDIDATE_THRESHOLD:
+                continue
+            edits = edit_distance(token, candidate, limit)
+            if edits <= limit:
+                # Rank typo matches by how little of the token had to change
+                similarity = max(similarity, 1.0 - edits / max(len(token), len(candidate)))
+            elif similarity < FUZZY_THRESHOLD:
+                continue
+            scored.append((similarity, candidate))
+        scored.sort(reverse=True)
+        return scored[:MAX_FUZZY_TERMS]
+
+    def _token_scores(self, token, allow_prefix):
+        """Score every document matching a single query token."""
+        scores = {}
+
+        for content_id, weight in self._postings.get(token, {}).items():
+            scores[content_id] = weight * EXACT_MATCH
+
+        if allow_prefix:
+            for term in self._prefix_terms(token):
+                if term == token:
+                    continue
+                for content_id, weight in self._postings[term].items():
+                    score = weight * PREFIX_MATCH
+                    if score > scores.get(content_id, 0.0):
+                        scores[content_id] = score
+
+        if not scores:
+            for similarity, term in self._fuzzy_terms(token):
+                for content_id, weight in self._postings[term].items():
+                    score = weight * FUZZY_MATCH * similarity
+                    if score > scores.get(content_id, 0.0):
+                        scores[content_id] = score
+
+        return scores
+
+    def search(self, query, limit=20):
+        """
+        Search the index.
+
+        Every query token must match (exactly, by prefix or fuzzily); the last token is
+        treated as a prefix so partially typed queries still match.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            combined = None
+            for position, token in enumerate(tokens):
+                scores = self._token_scores(token, allow_prefix=position == len(tokens) - 1)
+                if not scores:
+                    return []
+                if combined is None:
+                    combined = scores
+                else:
+                    combined = {
+                        content_id: combined[content_id] + score
+                        for content_id, score in scores.items()
+                        if content_id in combined
+                    }
+                    if not combined:
+                        return []
+
+            # Boost titles that start with the query as typed
+            normalized_query = " ".join(tokens)
+            for content_id in combined:
+                if self._titles.get(content_id, "").startswith(normalized_query):
+                    combined[content_id] += FIELD_WEIGHTS["title"]
+
+            ranked = sorted(combined.items(), key=lambda pair: (-pair[1], self._titles.get(pair[0], "")))
+            return [self._summary(content_id) for content_id, _ in ranked[:limit]]
+
+    def autocomplete(self, prefix, limit=10):
+        """Suggest titles for a partially typed query."""
+        return [
+            {"id": item["id"], "title": item["title"], "year": item["year"], "content_type": item["content_type"]}
+            for item in self.search(prefix, limit=limit)
+        ]
+
+    def _summary(self, content_id):
+        doc = self._docs[content_id]
+        return {field: doc.get(field) if doc.get(field) is not None else "" for field in SUMMARY_FIELDS}
+
+
+# Process-wide index shared by the API and the streaming service cache
+content_index = SearchIndex()
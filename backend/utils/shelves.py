@@ -0,0 +1,184 @@
+"""
+Darick Le
+October 19 2026
+Precomputed category shelves for the discover page.
+Each shelf (Movies, TV Shows and one per genre) is fetched per streaming service by a
+background refresher that updates a few of the stalest shelves at a time. Shelves are stored
+in MongoDB and kept in memory, merged across a user's services when read, and paged with
+opaque cursors.
+"""
+
+import base64
+import json
+import time
+
+try:
+    from backend.utils.trending import CONTENT_TYPES, SnapshotStore, compact_item, merge_ranked_lists
+except ImportError:
+    from utils.trending import CONTENT_TYPES, SnapshotStore, compact_item, merge_ranked_lists
+
+# Shelf key -> (upstream content types, upstream genre)
+SHELVES = {
+    "movies": (("movie",), None),
+    "shows": (("series",), None),
+    "action": (CONTENT_TYPES, "action"),
+    "adventure": (CONTENT_TYPES, "adventure"),
+    "comedy": (CONTENT_TYPES, "comedy"),
+    "drama": (CONTENT_TYPES, "drama"),
+    "family": (CONTENT_TYPES, "family"),
+    "sci-fi": (CONTENT_TYPES, "sci-fi"),
+    "thriller": (CONTENT_TYPES, "thriller"),
+    "horror": (CONTENT_TYPES, "horror"),
+    "romance": (CONTENT_TYPES, "romance"),
+    "documentary": (CONTENT_TYPES, "documentary"),
+    "animation": (CONTENT_TYPES, "animation")
+}
+
+# Category names used by the API and frontend -> shelf key
+CATEGORY_ALIASES = {
+    "movies": "movies",
+    "tv": "shows",
+    "tv shows": "shows",
+    "shows": "shows",
+    "action & adventure": "action"
+}
+
+
+def resolve_shelf(category_name):
+    """Map a category name from the API to a shelf key, or None if it's unknown."""
+    name = (category_name or "").lower()
+    name = CATEGORY_ALIASES.get(name, name)
+    return name if name in SHELVES else None
+
+
+def encode_cursor(shelf, offset):
+    raw = json.dumps({"s": shelf, "o": offset}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, shelf):
+    """Return the offset stored in a cursor, or 0 if it's missing or belongs to another shelf."""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data.get("s") != shelf:
+            return 0
+        return max(0, int(data.get("o", 0)))
+    except (ValueError, TypeError):
+        return 0
+
+
+def paginate(items, shelf, cursor=None, page_size=20):
+    """Return the page of a ranked shelf a cursor points at and the cursor for the next page (or None)."""
+    offset = decode_cursor(cursor, shelf)
+    page = items[offset:offset + page_size]
+    next_cursor = encode_cursor(shelf, offset + page_size) if len(items) > offset + page_size else None
+    return page, next_cursor
+
+
+class ShelfStore(SnapshotStore):
+    """Ranked shelves per (service, shelf), refreshed incrementally in the background."""
+
+    key_field = "shelf"
+
+    def __init__(self, collection, fetch, service_mapping, items_per_shelf=50,
+                 refresh_interval=43200, refresh_tick=60, refresh_batch=4, on_refresh=None):
+        # Shelves that failed are retried on a later tick
+        super().__init__(
+            "shelf-refresh", collection, fetch, service_mapping, refresh_interval,
+            tick_interval=refresh_tick, retry_interval=refresh_tick, on_refresh=on_refresh
+        )
+        self.items_per_shelf = items_per_shelf
+        self.refresh_batch = refresh_batch
+        self.refresh_tick = refresh_tick
+        self._requested = []  # shelves a user asked for before they were warm
+
+    def all_keys(self):
+        return [(service, shelf) for service in self.service_mapping.values() for shelf in SHELVES]
+
+    def fetch_items(self, service, shelf):
+        content_types, genre = SHELVES[shelf]
+        genre_query = f"&genre={genre}" if genre else ""
+        ranked_lists = []
+        for content_type in content_types:
+            req_path = f"/search/basic?country=us&service={service}&type={content_type}&page=1&language=en{genre_query}&sort_by=popularity"
+            data = self.fetch(req_path)
+            if "results" not in data:
+                continue
+            ranked_lists.append([
+                compact_item(item, content_type)
+                for item in data["results"]
+                if item.get("imdbId")
+            ])
+        if not ranked_lists:
+            return None
+        # Genre shelves alternate movies and shows
+        return merge_ranked_lists(ranked_lists, limit=self.items_per_shelf)
+
+    def refresh_stale(self):
+        """Refresh a small batch of shelves: ones users asked for first, then the stalest."""
+        # With several worker processes, only refetch shelves no other worker has refreshed yet
+        self.sync()
+        with self._lock:
+            requested = [key for key in dict.fromkeys(self._requested) if key not in self._items]
+            self._requested = requested[self.refresh_batch:]
+
+        batch = requested[:self.refresh_batch]
+        for key in self.due_keys():
+            if len(batch) >= self.refresh_batch:
+                break
+            if key not in batch:
+                batch.append(key)
+
+        for service, shelf in batch:
+            self.refresh(service, shelf)
+
+    def request_refresh(self, services, shelf):
+        """Ask the background refresher to warm a shelf as soon as possible."""
+        now = time.monotonic()
+        with self._lock:
+            keys = [
+                (service, shelf) for service in services
+                if (service, shelf) not in self._items
+                # Don't hammer upstream for shelves that just failed to refresh
+                and now - self._failed_at.get((service, shelf), float("-inf")) >= self.retry_interval
+                and (service, shelf) not in self._requested
+            ]
+            self._requested.extend(keys)
+        if keys:
+            self._refresher.wake()
+
+    def _services(self, service_ids):
+        return [self.service_mapping[str(sid)] for sid in service_ids if str(sid) in self.service_mapping]
+
+    def get_shelf(self, service_ids, shelf, limit=None):
+        """Merge one shelf across a user's services."""
+        services = self._services(service_ids)
+        with self._lock:
+            ranked_lists = [self._items[(service, shelf)] for service in services if self._items.get((service, shelf))]
+            missing = [service for service in services if (service, shelf) not in self._items]
+        if missing:
+            self.request_refresh(missing, shelf)
+        return merge_ranked_lists(ranked_lists, limit=limit)
+
+    def get_page(self, service_ids, shelf, cursor=None, page_size=20):
+        """Return one page of a merged shelf and the cursor for the next page (or None)."""
+        offset = decode_cursor(cursor, shelf)
+        items = self.get_shelf(service_ids, shelf, limit=offset + page_size + 1)
+        return paginate(items, shelf, cursor, page_size)
+
+    def stats(self):
+        with self._lock:
+            shelves = len(self._items)
+            pending = len(self._requested)
+            retrying = len(self._failed_at)
+        return {
+            "shelves": shelves,
+            "pending_requests": pending,
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed_refreshes,
+            "retrying": retrying,
+            "refresher_running": self._refresher.running
+        }
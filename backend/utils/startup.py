@@ -0,0 +1,101 @@
+"""
+Darick Le
+October 19 2026
+Startup timing report.
+Records how long a worker takes to become ready: the wall time of each top-level import made
+while tracking is on (inclusive of everything that import pulled in) and of named startup
+phases such as creating the Flask app. The report is printed once startup finishes and is
+exposed through /api/stats, so slow imports show up without profiling a cold start by hand.
+"""
+
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Imports faster than this are left out of the printed report
+REPORT_MIN_MS = 5.0
+
+
+class StartupReport:
+    """Collects import and phase timings for one process start."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.imports = {}    # module name -> milliseconds
+        self.phases = {}     # phase name -> milliseconds
+        self._original_import = None
+        self._local = threading.local()
+
+    def track_imports(self):
+        """Time every new top-level import until stop_tracking() is called."""
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        original_import = self._original_import
+        local = self._local
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            # Only time the outermost import of a module that isn't loaded yet
+            if level or getattr(local, "depth", 0) or name in sys.modules:
+                return original_import(name, globals, locals, fromlist, level)
+            local.depth = 1
+            started_at = time.perf_counter()
+            try:
+                return original_import(name, globals, locals, fromlist, level)
+            finally:
+                local.depth = 0
+                elapsed = (time.perf_counter() - started_at) * 1000
+                self.imports[name] = self.imports.get(name, 0.0) + elapsed
+
+        builtins.__import__ = timed_import
+
+    def stop_tracking(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    @contextmanager
+    def phase(self, name):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - started_at) * 1000
+
+    def finish(self):
+        """Mark startup as complete (only the first call counts)."""
+        self.stop_tracking()
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+        return self
+
+    @property
+    def total_ms(self):
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return (end - self.started_at) * 1000
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total_ms, 1),
+            "finished": self.finished_at is not None,
+            "imports_ms": {
+                name: round(ms, 1)
+                for name, ms in sorted(self.imports.items(), key=lambda pair: -pair[1])
+            },
+            "phases_ms": {name: round(ms, 1) for name, ms in self.phases.items()}
+        }
+
+    def print_report(self):
+        print(f"Startup finished in {self.total_ms:.0f} ms")
+        for name, ms in sorted(self.imports.items(), key=lambda pair: -pair[1]):
+            if ms >= REPORT_MIN_MS:
+                print(f"  import {name}: {ms:.0f} ms")
+        for name, ms in self.phases.items():
+            print(f"  {name}: {ms:.0f} ms")
+
+
+# Report for the current process, started as soon as this module is imported
+startup_report = StartupReport()
@@ -6,28 +6,42 @@ It includes functions to refresh content, get discover content, and retrieve con
 """
 
 import http.client
-import json
 import ssl  # Import ssl module for certificate handling
-from pymongo import MongoClient
-import certifi
 from datetime import datetime, timedelta
 import os
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 import random
 import time  # Import for retry mechanism
 import socket  # Import for setting socket timeout
 
+# Import the request deadline helpers
+try:
+    from backend.utils import deadline
+    from backend.utils.search_index import content_index
+    from backend.utils.catalog import Catalog
+    from backend.utils.catalog_codec import CatalogCodec
+    from backend.utils.database import cache_db
+    from backend.utils import metrics
+    from backend.utils import tracing
+    from backend.utils import upstream
+except ImportError:
+    from utils import deadline
+    from utils.search_index import content_index
+    from utils.catalog import Catalog
+    from utils.catalog_codec import CatalogCodec
+    from utils.database import cache_db
+    from utils import metrics
+    from utils import tracing
+    from utils import upstream
+
 # Load environment variables
 load_dotenv()
 
-# MongoDB setup
-MONGO_URI = os.getenv('MONGO_URI')
-client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-db = client.get_database()
-
 # RapidAPI configuration
 RAPIDAPI_KEY = os.getenv('RAPIDAPI_KEY', "250f7c809bmshbd07ebdd782a896p1cf5e6jsn9767ca4b28cf")
 RAPIDAPI_HOST = "streaming-availability.p.rapidapi.com"
+RAPIDAPI_BASE_URL = urlparse(os.getenv('RAPIDAPI_BASE_URL', f"https://{RAPIDAPI_HOST}"))
 
 # Create a custom SSL context that doesn't verify certificates
 ssl_context = ssl.create_default_context()
@@ -53,12 +67,20 @@ SERVICE_MAPPING = {
 
 REVERSE_SERVICE_MAPPING = {v: k for k, v in SERVICE_MAPPING.items()}
 
+# Shared catalog, stored in the compact encoding when CATALOG_COMPACT_STORAGE is set
+CATALOG_COMPACT_STORAGE = os.getenv('CATALOG_COMPACT_STORAGE', 'false').lower() == 'true'
+catalog = Catalog(cache_db.catalog, cache_db.catalog_meta, CatalogCodec(SERVICE_MAPPING, compact=CATALOG_COMPACT_STORAGE))
+
 # Helper function to create an HTTP connection with SSL context
-def create_api_connection():
+# (plain HTTP is only used when RAPIDAPI_BASE_URL points at a local stand-in)
+def create_api_connection(timeout=8):
+    if RAPIDAPI_BASE_URL.scheme == "http":
+        return http.client.HTTPConnection(RAPIDAPI_BASE_URL.hostname, RAPIDAPI_BASE_URL.port, timeout=timeout)
     conn = http.client.HTTPSConnection(
-        RAPIDAPI_HOST,
+        RAPIDAPI_BASE_URL.hostname,
+        RAPIDAPI_BASE_URL.port,
         context=ssl_context,  # Use our custom SSL context
-        timeout=8  # 8 seconds timeout
+        timeout=timeout  # 8 seconds timeout by default
     )
     return conn
 
@@ -66,9 +88,16 @@ def create_api_connection():
 def make_api_request(path, max_retries=3, timeout=8):
     retries = 0
     while retries < max_retries:
+        # Clip the attempt to whatever is left of the request deadline
+        attempt_timeout = deadline.attempt_timeout(timeout)
+        if attempt_timeout is None:
+            print(f"Request deadline exhausted, skipping upstream call: {path}")
+            break
+        
         conn = None
+        attempt_started_at = time.perf_counter()
         try:
-            conn = create_api_connection()
+            conn = create_api_connection(timeout=attempt_timeout)
             headers = {
                 'x-rapidapi-key': RAPIDAPI_KEY,
                 'x-rapidapi-host': RAPIDAPI_HOST
@@ -77,11 +106,15 @@ def make_api_request(path, max_retries=3, timeout=8):
             
             # Use a timeout for the response
             start_time = time.time()
-            while time.time() - start_time < timeout:
+            while time.time() - start_time < attempt_timeout:
                 try:
                     response = conn.getresponse()
-                    data = response.read().decode('utf-8')
-                    return json.loads(data)
+                    # Parsed straight from the bytes into compact records of the fields we use
+                    data = response.read()
+                    tracing.record_span("upstream", attempt_started_at, family=metrics.endpoint_family(path), status=response.status, bytes=len(data))
+                    result = upstream.parse(data, path)
+                    metrics.record_upstream(path, response.status, attempt_started_at)
+                    return result
                 except http.client.ResponseNotReady:
                     time.sleep(0.1)  # Small wait before retry
             
@@ -89,14 +122,22 @@ def make_api_request(path, max_retries=3, timeout=8):
             raise TimeoutError("Response timed out")
                 
         except (socket.timeout, TimeoutError) as e:
+            metrics.record_upstream(path, "timeout", attempt_started_at)
+            tracing.record_span("upstream", attempt_started_at, error="timeout", family=metrics.endpoint_family(path))
             print(f"Timeout error (attempt {retries+1}/{max_retries}): {str(e)}")
             retries += 1
             if retries < max_retries:
+                if not deadline.can_retry_after(1):
+                    break
                 time.sleep(1)  # Wait 1 second before retry
         except Exception as e:
+            metrics.record_upstream(path, "error", attempt_started_at)
+            tracing.record_span("upstream", attempt_started_at, error=type(e).__name__, family=metrics.endpoint_family(path))
             print(f"API request failed (attempt {retries+1}/{max_retries}): {str(e)}")
             retries += 1
             if retries < max_retries:
+                if not deadline.can_retry_after(2 ** retries):
+                    break
                 time.sleep(2 ** retries)  # Exponential backoff
         finally:
             if conn:
@@ -110,6 +151,7 @@ def make_api_request(path, max_retries=3, timeout=8):
 
 class StreamingService:
     @staticmethod
+    @tracing.traced("streaming.refresh_content_for_services")
     def refresh_content_for_services(service_ids):
         """Fetch and cache content for specified streaming services."""
         try:
@@ -120,8 +162,8 @@ class StreamingService:
             current_time = datetime.utcnow()
             
             # Check if we need to refresh the cache
-            last_update = db.content_cache.find_one({"type": "last_update"})
-            if last_update and (current_time - last_update["timestamp"]) < timedelta(hours=24):
+            last_update = catalog.get_meta("last_update")
+            if last_update and (current_time - last_update) < timedelta(hours=24):
                 print("Using cached content data")
                 return True
             
@@ -176,14 +218,12 @@ class StreamingService:
                         "service_ids": service_ids_for_movie,
                         "poster_url": movie.get("posterURLs", {}).get("original") or movie.get("posterURLs", {}).get("500"),
                         "plot_overview": movie.get("overview", ""),
+                        "genre_names": [genre.get("name", "") for genre in movie.get("genres") or []],
                         "cached_at": current_time
                     }
                     
-                    db.content_cache.update_one(
-                        {"id": movie_id},
-                        {"$set": formatted_movie},
-                        upsert=True
-                    )
+                    catalog.upsert_summary(formatted_movie)
+                    content_index.add(formatted_movie)
             
             # Now fetch shows if we have time
             if movie_results:  # Only fetch shows if we successfully got movies
@@ -213,21 +253,15 @@ class StreamingService:
                         "service_ids": service_ids_for_show,
                         "poster_url": show.get("posterURLs", {}).get("original") or show.get("posterURLs", {}).get("500"),
                         "plot_overview": show.get("overview", ""),
+                        "genre_names": [genre.get("name", "") for genre in show.get("genres") or []],
                         "cached_at": current_time
                     }
                     
-                    db.content_cache.update_one(
-                        {"id": show_id},
-                        {"$set": formatted_show},
-                        upsert=True
-                    )
+                    catalog.upsert_summary(formatted_show)
+                    content_index.add(formatted_show)
             
             # Update last refresh timestamp
-            db.content_cache.update_one(
-                {"type": "last_update"},
-                {"$set": {"timestamp": current_time}},
-                upsert=True
-            )
+            catalog.set_meta("last_update", current_time)
             
             print(f"Successfully cached {len(movie_results)} movies and {len(show_results)} shows")
             return True
@@ -237,6 +271,7 @@ class StreamingService:
             return False
 
     @staticmethod
+    @tracing.traced("streaming.get_discover_content")
     def get_discover_content(user_services=None):
         """Get content for discover feature with timeout handling, ensuring both movies and shows appear."""
         try:
@@ -252,23 +287,14 @@ class StreamingService:
                 # Try to balance movies and shows
                 for content_type in ["movie", "show"]:
                     if random.choice([True, False]):  # 50% chance to choose this type first
-                        cached_content = list(db.content_cache.find(
-                            {
-                                "service_ids": {"$in": user_services},
-                                "content_type": content_type
-                            },
-                            {"_id": 0}
-                        ).limit(50))
+                        cached_content = catalog.find_for_services(user_services, content_type, limit=50)
                         
                         if cached_content:
                             content_types_seen.append(content_type)
                             return random.choice(cached_content)
                 
                 # If we don't have specific content type or the random check failed, get any type
-                cached_content = list(db.content_cache.find(
-                    {"service_ids": {"$in": user_services}},
-                    {"_id": 0}
-                ).limit(100))
+                cached_content = catalog.find_for_services(user_services, limit=100)
                 
                 if cached_content and len(cached_content) > 5:
                     # We have enough cached content, return a random one
@@ -309,16 +335,14 @@ class StreamingService:
                                 "poster_url": (item.get("posterURLs", {}).get("original") or 
                                               item.get("posterURLs", {}).get("500", "")),
                                 "plot_overview": item.get("overview", ""),
+                                "genre_names": [genre.get("name", "") for genre in item.get("genres") or []],
                                 "service_ids": user_services,
                                 "streaming_service": service
                             }
                             
                             # Cache this item
-                            db.content_cache.update_one(
-                                {"id": item_id},
-                                {"$set": transformed_item},
-                                upsert=True
-                            )
+                            catalog.upsert_summary(transformed_item)
+                            content_index.add(transformed_item)
                             
                             return transformed_item
                     
@@ -342,38 +366,27 @@ class StreamingService:
                                 "poster_url": (item.get("posterURLs", {}).get("original") or 
                                               item.get("posterURLs", {}).get("500", "")),
                                 "plot_overview": item.get("overview", ""),
+                                "genre_names": [genre.get("name", "") for genre in item.get("genres") or []],
                                 "service_ids": user_services,
                                 "streaming_service": service
                             }
                             
                             # Cache this item
-                            db.content_cache.update_one(
-                                {"id": item_id},
-                                {"$set": transformed_item},
-                                upsert=True
-                            )
+                            catalog.upsert_summary(transformed_item)
+                            content_index.add(transformed_item)
                             
                             return transformed_item
             
             # If no services or API call failed, get a random item from cache
             # Try to balance movies and shows
             content_type_to_try = random.choice(["movie", "show"])
-            sample_content = list(db.content_cache.find(
-                {
-                    "id": {"$exists": True, "$ne": "last_update"},
-                    "content_type": content_type_to_try
-                },
-                {"_id": 0}
-            ).limit(30))
+            sample_content = catalog.find({"content_type": content_type_to_try}, limit=30)
             
             if sample_content:
                 return random.choice(sample_content)
             
             # If specific content type search failed, try any type
-            sample_content = list(db.content_cache.find(
-                {"id": {"$exists": True, "$ne": "last_update"}},
-                {"_id": 0}
-            ).limit(30))
+            sample_content = catalog.find(limit=30)
             
             if sample_content:
                 return random.choice(sample_content)
@@ -495,6 +508,7 @@ class StreamingService:
             return random.choice(popular_fallbacks)
 
     @staticmethod
+    @tracing.traced("streaming.get_content_for_services")
     def get_content_for_services(service_ids, content_type=None, limit=50):
         """Retrieve cached content for specified streaming services."""
         try:
@@ -509,10 +523,7 @@ class StreamingService:
                     query["content_type"] = content_type
                 
                 # Get any cached content we have
-                content = list(db.content_cache.find(
-                    query,
-                    {"_id": 0}  # Exclude MongoDB _id
-                ).limit(limit))
+                content = catalog.find(query, limit=limit)
                 
                 if content:
                     return content
@@ -526,10 +537,7 @@ class StreamingService:
                 query["content_type"] = content_type
             
             # Get content from cache
-            content = list(db.content_cache.find(
-                query,
-                {"_id": 0}  # Exclude MongoDB _id
-            ).limit(limit))
+            content = catalog.find(query, limit=limit)
             
             # If we don't have enough content, try refreshing the cache
             if len(content) < 10:
@@ -537,10 +545,7 @@ class StreamingService:
                 StreamingService.refresh_content_for_services(service_ids)
                 
                 # Try again after refreshing
-                content = list(db.content_cache.find(
-                    query,
-                    {"_id": 0}
-                ).limit(limit))
+                content = catalog.find(query, limit=limit)
                 
                 # If still not enough, get popular content
                 if len(content) < 10:
@@ -554,6 +559,7 @@ class StreamingService:
             return []
     
     @staticmethod
+    @tracing.traced("streaming.get_popular_content")
     def get_popular_content(content_type=None, limit=20):
         """Fetch popular content as fallback when cache is empty."""
         try:
@@ -588,7 +594,8 @@ class StreamingService:
                             "service_ids": [],  # No specific service since this is general popular content
                             "poster_url": (item.get("posterURLs", {}).get("original") or 
                                           item.get("posterURLs", {}).get("500")),
-                            "plot_overview": item.get("overview", "")
+                            "plot_overview": item.get("overview", ""),
+                            "genre_names": [genre.get("name", "") for genre in item.get("genres") or []]
                         }
                         
                         content_results.append(transformed_item)
@@ -600,11 +607,12 @@ class StreamingService:
             return []
     
     @staticmethod
+    @tracing.traced("streaming.get_content_details")
     def get_content_details(content_id):
         """Get detailed information for a specific content item."""
         try:
             # First check cache
-            cached_content = db.content_cache.find_one({"id": content_id}, {"_id": 0})
+            cached_content = catalog.get_details(content_id)
             
             if cached_content:
                 # If we have details, return them
@@ -653,11 +661,8 @@ class StreamingService:
                                 })
                     
                     # Update cache with details
-                    db.content_cache.update_one(
-                        {"id": content_id},
-                        {"$set": transformed_details},
-                        upsert=True
-                    )
+                    catalog.upsert_details(transformed_details)
+                    content_index.add(transformed_details)
                     
                     return transformed_details
             
@@ -685,6 +690,7 @@ class StreamingService:
             return None
     
     @staticmethod
+    @tracing.traced("streaming.process_content_details")
     def _process_content_details(details, content_id, content_type):
         """Helper method to process API content details into our format."""
         transformed_details = {
@@ -718,10 +724,7 @@ class StreamingService:
                     })
         
         # Cache the details
-        db.content_cache.update_one(
-            {"id": content_id},
-            {"$set": transformed_details},
-            upsert=True
-        )
+        catalog.upsert_details(transformed_details)
+        content_index.add(transformed_details)
         
         return transformed_details
@@ -0,0 +1,326 @@
+"""
+Darick Le
+October 19 2026
+Sampled request tracing and on-demand profiling.
+A configurable fraction of API requests is traced: upstream RapidAPI calls, JSON parsing,
+every MongoDB command and the main transform functions are recorded as nested spans, and the
+finished trace is appended as one JSON line to a rotating local file. Requests that are not
+sampled only pay for one context variable lookup per span.
+
+Spans may be opened from several threads at once (content fetches run on a thread pool under
+a copy of the request's context), so the innermost open span is tracked per context rather
+than on the shared trace, and the trace's span ids and list are guarded by a lock.
+
+Admins can force a trace with `X-Trace: 1`, or run the whole request under cProfile with
+`X-Profile: 1`, by also sending the configured token in `X-Debug-Token`. Profiles are written
+as .prof files that can be opened with pstats or snakeviz.
+"""
+
+import contextvars
+import cProfile
+import functools
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+from pymongo import monitoring
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)  # id of the innermost open span
+
+_UNSAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self.spans = []
+
+    def offset_ms(self, perf_time=None):
+        return round(((perf_time or time.perf_counter()) - self._started) * 1000, 3)
+
+    def new_span_id(self):
+        with self._lock:
+            span_id = self._next_id
+            self._next_id += 1
+        return span_id
+
+    def append(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def add_span(self, name, started, duration, attrs=None, error=None):
+        """Record a finished span; started is a perf_counter value."""
+        span = {
+            "id": self.new_span_id(),
+            "parent": _current_span.get(),
+            "name": name,
+            "start_ms": self.offset_ms(started),
+            "duration_ms": round(duration * 1000, 3)
+        }
+        if attrs:
+            span["attrs"] = attrs
+        if error:
+            span["error"] = error
+        self.append(span)
+        return span
+
+    def as_dict(self, **fields):
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat() + "Z",
+            "duration_ms": self.offset_ms(),
+            **fields,
+            "spans": spans
+        }
+
+
+class _Span:
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.id = self.trace.new_span_id()
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self.id)
+        return self
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.started
+        _current_span.reset(self._token)
+        span = {
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "start_ms": self.trace.offset_ms(self.started),
+            "duration_ms": round(duration * 1000, 3)
+        }
+        if self.attrs:
+            span["attrs"] = self.attrs
+        if exc_type is not None:
+            span["error"] = exc_type.__name__
+        self.trace.append(span)
+        return False
+
+
+class _NullSpan:
+    """Returned when the current request isn't sampled."""
+
+    def __enter__(self):
+        return self
+
+    def set(self, key, value):
+        pass
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def span(name, **attrs):
+    """Context manager timing a block as a span of the current trace (no-op when not sampled)."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NULL_SPAN
+    return _Span(trace, name, attrs)
+
+
+def record_span(name, started, error=None, **attrs):
+    """Record a span for work that started at `started` (a perf_counter value) and just ended."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, started, time.perf_counter() - started, attrs, error)
+
+
+def traced(name):
+    """Decorator recording every call of a function as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TraceWriter:
+    """Appends finished traces as JSON lines to a size-rotated file."""
+
+    def __init__(self, path, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._logger = None
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def _get_logger(self):
+        if self._logger is None:
+            with self._lock:
+                if self._logger is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count)
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger = logging.getLogger(f"tracing.{self.path}")
+                    logger.setLevel(logging.INFO)
+                    logger.propagate = False
+                    logger.addHandler(handler)
+                    self._logger = logger
+        return self._logger
+
+    def write(self, record):
+        try:
+            self._get_logger().info(json.dumps(record, default=str, separators=(",", ":")))
+            self.written += 1
+        except Exception as e:
+            print(f"Error writing trace: {str(e)}")
+
+
+class Tracer:
+    """Decides which requests are traced or profiled and writes the results."""
+
+    def __init__(self, writer, sample_rate=0.01, debug_token="", profile_dir="profiles"):
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.debug_token = debug_token
+        self.profile_dir = profile_dir
+        self.sampled = 0
+        self.profiled = 0
+
+    def is_admin(self, headers):
+        token = headers.get("X-Debug-Token", "")
+        return bool(self.debug_token) and hmac.compare_digest(token.encode("utf-8"), self.debug_token.encode("utf-8"))
+
+    def start_request(self, name, headers):
+        """
+        Start tracing the current request if it's sampled or forced.
+
+        Returns a state object to pass to finish_request(), or None when the request isn't traced.
+        """
+        admin = (headers.get("X-Trace") == "1" or headers.get("X-Profile") == "1") and self.is_admin(headers)
+        if not admin and random.random() >= self.sample_rate:
+            return None
+
+        trace = Trace(name)
+        state = {"trace": trace, "token": _current_trace.set(trace), "profiler": None}
+        self.sampled += 1
+        if admin and headers.get("X-Profile") == "1":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                state["profiler"] = profiler
+            except ValueError:
+                # Another profiler is already active in this thread
+                pass
+        return state
+
+    def finish_request(self, state, **fields):
+        """Stop tracing, write the trace and return response headers to add."""
+        trace = state["trace"]
+        response_headers = {"X-Trace-Id": trace.trace_id}
+        profiler = state["profiler"]
+        if profiler is not None:
+            profiler.disable()
+            profile_path = self._dump_profile(profiler, trace)
+            if profile_path:
+                fields["profile"] = profile_path
+                response_headers["X-Profile-File"] = os.path.basename(profile_path)
+        _current_trace.reset(state["token"])
+        self.writer.write(trace.as_dict(**fields))
+        return response_headers
+
+    def abandon(self, state):
+        """Drop a trace without writing it (e.g. the request never produced a response)."""
+        if state["profiler"] is not None:
+            state["profiler"].disable()
+        _current_trace.reset(state["token"])
+
+    def _dump_profile(self, profiler, trace):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = _UNSAFE_FILENAME_RE.sub("_", trace.name).strip("_") or "request"
+            path = os.path.join(self.profile_dir, f"{trace.started_at:%Y%m%dT%H%M%S}-{name}-{trace.trace_id}.prof")
+            profiler.dump_stats(path)
+            self.profiled += 1
+            return path
+        except Exception as e:
+            print(f"Error writing profile: {str(e)}")
+            return None
+
+    def stats(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "written": self.writer.written,
+            "profiled": self.profiled,
+            "trace_file": self.writer.path
+        }
+
+
+class MongoTraceListener(monitoring.CommandListener):
+    """Adds a span for every MongoDB command issued while a request is being traced."""
+
+    def __init__(self):
+        self._started = {}   # (connection id, request id) -> (perf_counter, collection)
+        self._lock = threading.Lock()  # commands start and finish on many threads
+
+    def started(self, event):
+        if _current_trace.get() is None:
+            return
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = (
+                time.perf_counter(), collection if isinstance(collection, str) else ""
+            )
+
+    def _finish(self, event, error=None):
+        with self._lock:
+            started = self._started.pop((event.connection_id, event.request_id), None)
+        trace = _current_trace.get()
+        if started is None or trace is None:
+            return
+        trace.add_span(
+            f"mongo.{event.command_name}", started[0], event.duration_micros / 1e6,
+            {"collection": started[1]}, error
+        )
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, error=str(event.failure.get("errmsg", "failed")) if isinstance(event.failure, dict) else "failed")
+
+
+mongo_listener = MongoTraceListener()
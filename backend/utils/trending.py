@@ -0,0 +1,307 @@
+"""
+Darick Le
+October 19 2026
+Pre-warmed trending lists per streaming service.
+A background refresher periodically fetches the most popular movies and shows for every
+supported service, stores each ranked list as one compact document in MongoDB and keeps a
+snapshot in memory. Requests for trending content merge the snapshots for the user's
+services without making any upstream calls.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+# Upstream content types we keep trending lists for
+CONTENT_TYPES = ("movie", "series")
+
+
+def compact_item(item, content_type):
+    """Reduce an upstream search result to the fields our API returns."""
+    poster_urls = item.get("posterURLs") or {}
+    return {
+        "id": item.get("imdbId"),
+        "title": item.get("title", ""),
+        "year": item.get("year", ""),
+        "runtime_minutes": item.get("runtime", 0),
+        "us_rating": item.get("rating", "Not Rated"),
+        "poster_url": poster_urls.get("original") or poster_urls.get("500", ""),
+        "plot_overview": item.get("overview", ""),
+        "content_type": "movie" if content_type == "movie" else "show",
+        # Kept on summaries so recommendations can rerank cached titles by genre
+        "genre_names": [genre.get("name", "") for genre in item.get("genres") or []]
+    }
+
+
+def merge_ranked_lists(ranked_lists, limit=None, key="id"):
+    """
+    Interleave several ranked lists by rank, dropping duplicate ids (items[key]).
+
+    The first item of every list comes before the second item of any list, so each
+    service and content type gets a fair share of the top positions.
+    """
+    merged = []
+    seen = set()
+    longest = max((len(items) for items in ranked_lists), default=0)
+    for rank in range(longest):
+        for items in ranked_lists:
+            if rank >= len(items):
+                continue
+            item = items[rank]
+            if item[key] in seen:
+                continue
+            seen.add(item[key])
+            merged.append(item)
+            if limit and len(merged) >= limit:
+                return merged
+    return merged
+
+
+class PeriodicRefresher:
+    """Daemon thread that calls a function every `interval` seconds until stopped."""
+
+    def __init__(self, name, func, interval):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the thread if it isn't already running (safe to call repeatedly)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        """Run the next refresh now instead of waiting for the interval."""
+        self._wake.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.func()
+            except Exception as e:
+                print(f"Error in background refresh '{self.name}': {str(e)}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+class SnapshotStore:
+    """
+    Ranked item lists keyed on (service, kind), stored in MongoDB and kept in memory.
+
+    Subclasses set `key_field` (the document field holding the kind) and implement
+    fetch_items(service, kind), which returns the new ranked items or None if upstream had
+    nothing. A background refresher wakes every `tick_interval` seconds, adopts lists other
+    worker processes stored, then refreshes lists older than `refresh_interval`, stalest
+    first. A list that fails to refresh is retried after `retry_interval` seconds instead of
+    waiting for the next full interval, and one failing list never stops the others.
+    """
+
+    key_field = None
+
+    def __init__(self, name, collection, fetch, service_mapping, refresh_interval,
+                 tick_interval, retry_interval, on_refresh=None):
+        self.collection = collection
+        self.fetch = fetch
+        self.service_mapping = service_mapping
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.on_refresh = on_refresh
+        self._items = {}         # (service, kind) -> ranked compact items
+        self._refreshed_at = {}  # (service, kind) -> datetime
+        self._failed_at = {}     # (service, kind) -> monotonic time of the last failed refresh
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.version = 0  # Bumped whenever a list changes, so responses built from them can be keyed on it
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self._refresher = PeriodicRefresher(name, self.refresh_stale, tick_interval)
+
+    def _adopt(self, doc):
+        key = (doc["service"], doc[self.key_field])
+        with self._lock:
+            self._items[key] = doc.get("items", [])
+            self._refreshed_at[key] = doc.get("refreshed_at")
+            self.version += 1
+
+    def load(self):
+        """Load previously stored lists from MongoDB into memory."""
+        try:
+            for doc in self.collection.find({}, {"_id": 0}):
+                self._adopt(doc)
+        except Exception as e:
+            print(f"Error loading {self._refresher.name} snapshots: {str(e)}")
+        self._loaded = True
+
+    def sync(self):
+        """Adopt lists another worker process refreshed more recently than this one."""
+        try:
+            newer = []
+            for doc in self.collection.find({}, {"service": 1, self.key_field: 1, "refreshed_at": 1}):
+                with self._lock:
+                    known = self._refreshed_at.get((doc["service"], doc[self.key_field]))
+                if doc.get("refreshed_at") and (known is None or doc["refreshed_at"] > known):
+                    newer.append(doc["_id"])
+            if not newer:
+                return 0
+            for doc in self.collection.find({"_id": {"$in": newer}}, {"_id": 0}):
+                self._adopt(doc)
+            return len(newer)
+        except Exception as e:
+            print(f"Error syncing {self._refresher.name} snapshots: {str(e)}")
+            return 0
+
+    def ensure_started(self):
+        """Load stored lists once and make sure the background refresher is running."""
+        if not self._loaded:
+            self.load()
+        self._refresher.start()
+
+    def stop(self):
+        self._refresher.stop()
+
+    def fetch_items(self, service, kind):
+        raise NotImplementedError
+
+    def refresh(self, service, kind):
+        """Fetch and store one list; failures are counted and retried later, never raised."""
+        key = (service, kind)
+        try:
+            items = self.fetch_items(service, kind)
+            if items is not None:
+                self._store(key, items)
+        except Exception as e:
+            print(f"Error refreshing {self._refresher.name} {service}:{kind}: {str(e)}")
+            items = None
+        with self._lock:
+            if items is None:
+                self._failed_at[key] = time.monotonic()
+                self.failed_refreshes += 1
+                return False
+            self._failed_at.pop(key, None)
+            self.refreshes += 1
+
+        if self.on_refresh:
+            # The list itself is stored; a failure here only affects the catalog copy
+            try:
+                self.on_refresh(items, service)
+            except Exception as e:
+                print(f"Error caching items from {self._refresher.name} {service}:{kind}: {str(e)}")
+        return True
+
+    def _store(self, key, items):
+        refreshed_at = datetime.utcnow()
+        self.collection.update_one(
+            {"_id": f"{key[0]}:{key[1]}"},
+            {"$set": {
+                "service": key[0],
+                self.key_field: key[1],
+                "items": items,
+                "refreshed_at": refreshed_at
+            }},
+            upsert=True
+        )
+        with self._lock:
+            self._items[key] = items
+            self._refreshed_at[key] = refreshed_at
+            self.version += 1
+
+    def all_keys(self):
+        raise NotImplementedError
+
+    def due_keys(self):
+        """Lists older than the refresh interval, stalest first, minus recent failures."""
+        now = datetime.utcnow()
+        monotonic_now = time.monotonic()
+        with self._lock:
+            ages = {}
+            for key in self.all_keys():
+                if monotonic_now - self._failed_at.get(key, float("-inf")) < self.retry_interval:
+                    continue
+                refreshed_at = self._refreshed_at.get(key)
+                ages[key] = (now - refreshed_at).total_seconds() if refreshed_at else float("inf")
+        return [key for key in sorted(ages, key=lambda k: -ages[k]) if ages[key] >= self.refresh_interval]
+
+    def refresh_stale(self):
+        """Refresh every list that is due, stalest first."""
+        # With several worker processes, only refetch lists no other worker has refreshed yet
+        self.sync()
+        for key in self.due_keys():
+            self.refresh(*key)
+
+
+class TrendingStore(SnapshotStore):
+    """Ranked trending lists per (service, content type), served from memory."""
+
+    key_field = "content_type"
+
+    def __init__(self, collection, fetch, service_mapping, items_per_list=20,
+                 refresh_interval=21600, retry_interval=300, on_refresh=None):
+        # Wakes every retry_interval so failed lists are retried; fresh lists are skipped
+        super().__init__(
+            "trending-refresh", collection, fetch, service_mapping, refresh_interval,
+            tick_interval=min(refresh_interval, retry_interval), retry_interval=retry_interval,
+            on_refresh=on_refresh
+        )
+        self.items_per_list = items_per_list
+
+    def all_keys(self):
+        return [
+            (service, content_type)
+            for service in self.service_mapping.values()
+            for content_type in CONTENT_TYPES
+        ]
+
+    def fetch_items(self, service, content_type):
+        req_path = f"/search/basic?country=us&service={service}&type={content_type}&page=1&language=en&sort_by=popularity"
+        data = self.fetch(req_path)
+        if "results" not in data:
+            return None
+        return [
+            compact_item(item, content_type)
+            for item in data["results"][:self.items_per_list]
+            if item.get("imdbId")
+        ]
+
+    def get_trending(self, service_ids, limit=10):
+        """Merge the trending lists for a user's services (no upstream calls)."""
+        services = [self.service_mapping[str(sid)] for sid in service_ids if str(sid) in self.service_mapping]
+        with self._lock:
+            ranked_lists = [
+                self._items[(service, content_type)]
+                for service in services
+                for content_type in CONTENT_TYPES
+                if self._items.get((service, content_type))
+            ]
+        return merge_ranked_lists(ranked_lists, limit=limit)
+
+    def stats(self):
+        with self._lock:
+            lists = len(self._items)
+            oldest = min((refreshed_at for refreshed_at in self._refreshed_at.values() if refreshed_at), default=None)
+            retrying = len(self._failed_at)
+        return {
+            "lists": lists,
+            "version": self.version,
+            "refreshes": self.refreshes,
+            "failed_refreshes": self.failed_refreshes,
+            "retrying": retrying,
+            "oldest_refresh": oldest.isoformat() if oldest else None,
+            "refresher_running": self._refresher.running
+        }
@@ -0,0 +1,169 @@
+"""
+Darick Le
+October 19 2026
+Parsing of RapidAPI response bodies.
+A /search/basic page is a few hundred KB for 25 titles, but the transforms only read about ten
+fields per title. The body is parsed straight from the received bytes (orjson when installed,
+without decoding it to a str first), and every title is cut down right away to a compact record
+holding just those fields, with the same keys, so the transforms work on it unchanged:
+    imdbId, title, year, type, runtime, rating, overview, genres, cast, directors
+    posterURLs         only the "original" and "500" sizes
+    streamingInfo      US options only, with their type and link
+Everything else (other poster and backdrop sizes, other countries, tmdb fields, ...) is freed as
+soon as the call returns instead of staying alive in the transforms and caches.
+
+Bytes received, parse time and titles are counted per endpoint family; with allocation
+tracking on, tracemalloc also reports the peak memory each parse allocated (approximate when
+several threads parse at once).
+"""
+
+import json
+import threading
+import time
+import tracemalloc
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from backend import config
+    from backend.utils import metrics
+    from backend.utils import tracing
+except ImportError:
+    import config
+    from utils import metrics
+    from utils import tracing
+
+COUNTRY = "us"
+# Kept as they are; genres, cast and directors are short lists of small objects
+ITEM_FIELDS = ("imdbId", "title", "year", "type", "runtime", "rating", "overview", "genres", "cast", "directors")
+POSTER_SIZES = ("original", "500")
+ITEM_LIST_KEYS = ("results", "result")
+
+
+def compact_item(item):
+    """Keep only the fields the transforms read from one upstream title."""
+    record = {key: item[key] for key in ITEM_FIELDS if key in item}
+
+    posters = item.get("posterURLs")
+    if isinstance(posters, dict):
+        record["posterURLs"] = {size: posters[size] for size in POSTER_SIZES if size in posters}
+
+    streaming_info = item.get("streamingInfo")
+    if isinstance(streaming_info, dict) and isinstance(streaming_info.get(COUNTRY), dict):
+        record["streamingInfo"] = {COUNTRY: {
+            service: [
+                {"type": option.get("type", ""), "link": option.get("link", "")}
+                for option in options if isinstance(option, dict)
+            ]
+            for service, options in streaming_info[COUNTRY].items() if isinstance(options, list)
+        }}
+    return record
+
+
+def compact_payload(data, family):
+    """Cut a parsed response down to compact records; returns (payload, titles kept)."""
+    if not isinstance(data, dict):
+        return data, 0
+    if family == "/get":
+        # A single title, unless this is an error body
+        if "imdbId" in data or "streamingInfo" in data:
+            return compact_item(data), 1
+        return data, 0
+
+    compact, items = {}, 0
+    for key, value in data.items():
+        if key in ITEM_LIST_KEYS and isinstance(value, list):
+            compact[key] = [compact_item(item) if isinstance(item, dict) else item for item in value]
+            items += len(value)
+        elif not isinstance(value, (dict, list)):
+            # Paging fields and error messages
+            compact[key] = value
+    return compact, items
+
+
+def loads(body):
+    """Parse a JSON body from bytes."""
+    if orjson is not None:
+        return orjson.loads(body)
+    # The standard library detects the encoding of bytes itself
+    return json.loads(body)
+
+
+class UpstreamParser:
+    """Parses response bodies into compact records and keeps per-family statistics."""
+
+    def __init__(self, track_allocations=False):
+        self.track_allocations = track_allocations and hasattr(tracemalloc, "reset_peak")
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def parse(self, body, path):
+        """Parse the raw bytes of a response to `path`; raises ValueError on invalid JSON."""
+        family = metrics.endpoint_family(path)
+        started = time.perf_counter()
+        if self.track_allocations:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+
+        payload, items = compact_payload(loads(body), family)
+
+        alloc_peak = 0
+        if self.track_allocations:
+            alloc_peak = max(0, tracemalloc.get_traced_memory()[1] - before)
+        elapsed = time.perf_counter() - started
+
+        metrics.upstream_response_bytes.inc(family, amount=len(body))
+        metrics.upstream_parse_duration.observe(elapsed, family)
+        self._record(family, len(body), elapsed, items, alloc_peak)
+        if tracing.current_trace() is not None:
+            attrs = {"family": family, "bytes": len(body), "items": items}
+            if orjson is not None:
+                attrs["kept_bytes"] = len(orjson.dumps(payload))
+            if alloc_peak:
+                attrs["alloc_peak_bytes"] = alloc_peak
+            tracing.record_span("upstream.parse", started, **attrs)
+        return payload
+
+    def _record(self, family, size, elapsed, items, alloc_peak):
+        with self._lock:
+            stats = self._stats.get(family)
+            if stats is None:
+                stats = self._stats[family] = {"calls": 0, "bytes": 0, "parse_seconds": 0.0, "items": 0, "alloc_peak_max": 0}
+            stats["calls"] += 1
+            stats["bytes"] += size
+            stats["parse_seconds"] += elapsed
+            stats["items"] += items
+            stats["alloc_peak_max"] = max(stats["alloc_peak_max"], alloc_peak)
+
+    def stats(self):
+        with self._lock:
+            families = {}
+            for family, stats in self._stats.items():
+                calls = stats["calls"]
+                families[family] = {
+                    "calls": calls,
+                    "bytes": stats["bytes"],
+                    "avg_bytes": round(stats["bytes"] / calls),
+                    "avg_parse_ms": round(stats["parse_seconds"] / calls * 1000, 3),
+                    "items": stats["items"]
+                }
+                if self.track_allocations:
+                    families[family]["alloc_peak_max_bytes"] = stats["alloc_peak_max"]
+        return {
+            "parser": "orjson" if orjson is not None else "json",
+            "track_allocations": self.track_allocations,
+            "families": families
+        }
+
+
+# Shared by app.py and StreamingService
+parser = UpstreamParser(track_allocations=config.UPSTREAM_TRACK_ALLOCATIONS)
+
+
+def parse(body, path):
+    return parser.parse(body, path)
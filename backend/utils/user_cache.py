@@ -0,0 +1,106 @@
+"""
+Darick Le
+October 19 2026
+Process-local cache of user profiles for JWT-authenticated endpoints.
+Most routes only need a user's streaming services and preferences, so profiles are loaded
+with a projection (no password hash or interaction history) and kept for a short TTL.
+Routes that change a profile invalidate the cached entry explicitly.
+
+A read that misses the cache can race with an update: it loads the old profile, the update
+invalidates, and then the read would cache the old profile for a whole TTL. Every invalidation
+is stamped with a counter value, and a read only caches what it loaded if the user hasn't been
+invalidated since the read started.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from bson.objectid import ObjectId
+
+# Fields most routes need from a user document
+PROFILE_PROJECTION = {
+    "email": 1,
+    "streaming_services": 1,
+    "preferences": 1
+}
+
+
+class UserProfileCache:
+    """Short-TTL, size-bounded cache of projected user documents."""
+
+    def __init__(self, collection, ttl=30, max_entries=10000, projection=None):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.projection = projection or PROFILE_PROJECTION
+        self._entries = OrderedDict()  # user id -> (expires_at, profile)
+        self._lock = threading.Lock()
+        self._clock = 0  # bumped by every invalidation
+        self._invalidated = OrderedDict()  # user id -> clock value of its last invalidation
+        self._floor = 0  # reads started before this clock value are never cached
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+
+    def get(self, user_id):
+        """Return the projected profile for a user, or None if the user doesn't exist."""
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            self.misses += 1
+            started = self._clock
+
+        profile = self.collection.find_one({"_id": ObjectId(key)}, self.projection)
+        if profile is None:
+            return None
+
+        with self._lock:
+            if self._floor > started or self._invalidated.get(key, 0) > started:
+                # Updated while we were reading; this copy may predate the update
+                self.stale_fills += 1
+                return dict(profile)
+            self._entries[key] = (now + self.ttl, profile)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return dict(profile)
+
+    def invalidate(self, user_id):
+        """Drop a user's cached profile after it has been modified."""
+        key = str(user_id)
+        with self._lock:
+            self._clock += 1
+            self._invalidated[key] = self._clock
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.max_entries:
+                # Forgetting an invalidation means no read older than it may cache anything
+                _, forgotten = self._invalidated.popitem(last=False)
+                self._floor = max(self._floor, forgotten)
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._floor = self._clock
+            self._invalidated.clear()
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "stale_fills": self.stale_fills,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
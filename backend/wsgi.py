@@ -0,0 +1,61 @@
+"""
+Darick Le
+October 19 2026
+WSGI entry point for production serving.
+Run from the backend directory with the settings in gunicorn.conf.py:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+With preloading on, the master process imports the app and loads the data every worker only
+reads (trending snapshots, discover shelves, the local search index) once. It then closes its
+MongoDB client and freezes the garbage collector, so forked workers share those pages
+copy-on-write instead of each building its own copy. init_worker() runs in every worker
+after the fork: it makes sure the worker opens its own MongoDB connections and starts that
+worker's background refreshers and invalidation bus.
+
+`python app.py` is still the development server (single process, debug reloader).
+"""
+
+import gc
+
+import app as app_module
+from app import app, catalog, content_index, details_revalidator, invalidation_bus, shelf_store, startup_report, trending_store
+
+try:
+    from backend.utils import database
+except ImportError:
+    from utils import database
+
+application = app
+
+
+def preload():
+    """Load shared read-only data in the master before workers are forked."""
+    with startup_report.phase("preload"):
+        if app_module.ensure_mongo_connection():
+            trending_store.load()
+            shelf_store.load()
+            content_index.ensure_built(catalog.search_documents)
+        # The client's sockets and monitor threads must not be shared with the workers
+        database.connection.close()
+        # Keep everything allocated so far out of garbage collection, which would otherwise
+        # write to (and so copy) every shared page in each worker
+        gc.collect()
+        gc.freeze()
+    print(f"Preloaded {trending_store.stats()['lists']} trending lists, {shelf_store.stats()['shelves']} shelves "
+          f"and {len(content_index)} indexed titles before forking")
+
+
+def init_worker():
+    """Per-worker setup after the fork."""
+    database.reset_after_fork()
+    trending_store.ensure_started()
+    shelf_store.ensure_started()
+    invalidation_bus.ensure_started()
+    details_revalidator.ensure_started()
+
+
+def shutdown_worker():
+    """Stop the worker's background threads before it exits."""
+    for component in (trending_store, shelf_store, invalidation_bus, details_revalidator):
+        component.stop()
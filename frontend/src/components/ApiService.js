@@ -159,6 +159,11 @@ const ApiService = {
     return handleApiRequest(() => apiClient.get(`/content/${contentId}`));
   },
   
+  // Details for many titles in one request; results come back in the order of contentIds
+  getContentDetailsBatch: (contentIds) => {
+    return handleApiRequest(() => apiClient.post('/content/batch', { ids: contentIds }));
+  },
+  
   // Recommendations
   getRecommendations: () => {
     return handleApiRequest(() => apiClient.get('/recommendations'));